@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_xp_totals",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("xp_total", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("level", sa.Integer, nullable=False, server_default="1"),
+    )
+    # Backfill from the existing event log; level = xp_total // 100 + 1.
+    op.execute(
+        "INSERT INTO user_xp_totals (user_id, xp_total, level) "
+        "SELECT user_id, SUM(xp), SUM(xp) / 100 + 1 FROM xp_events "
+        "WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_xp_totals")
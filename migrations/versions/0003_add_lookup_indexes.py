@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # users.username is already indexed by its unique constraint.
+    op.create_index("ix_contributions_user_id", "contributions", ["user_id"])
+    op.create_index("ix_xp_events_user_id", "xp_events", ["user_id"])
+    # The feedback table is created by the feedback service on startup, so it
+    # may not exist yet in databases managed only by these migrations.
+    if sa.inspect(op.get_bind()).has_table("feedback"):
+        op.create_index("ix_feedback_type_status", "feedback", ["type", "status"])
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("feedback"):
+        op.drop_index("ix_feedback_type_status", table_name="feedback")
+    op.drop_index("ix_xp_events_user_id", table_name="xp_events")
+    op.drop_index("ix_contributions_user_id", table_name="contributions")
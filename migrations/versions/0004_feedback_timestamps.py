@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The feedback table is created by the feedback service on startup (the
+    # counters and rollups come from 0007 and 0008); only an existing feedback
+    # table needs the new columns.
+    if not sa.inspect(op.get_bind()).has_table("feedback"):
+        return
+    op.add_column("feedback", sa.Column("created_at", sa.DateTime))
+    op.add_column("feedback", sa.Column("updated_at", sa.DateTime))
+    # Existing items have no history; date them to the migration.
+    op.execute(
+        "UPDATE feedback SET created_at = CURRENT_TIMESTAMP, "
+        "updated_at = CURRENT_TIMESTAMP"
+    )
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("feedback"):
+        return
+    with op.batch_alter_table("feedback") as batch:
+        batch.drop_column("updated_at")
+        batch.drop_column("created_at")
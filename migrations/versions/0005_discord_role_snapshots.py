@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled by the role-sync worker; requests fall back to Discord until then.
+    op.create_table(
+        "discord_role_snapshots",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("token_digest", sa.String, nullable=False),
+        sa.Column("roles", sa.JSON, nullable=False),
+        sa.Column("profile", sa.JSON, nullable=False),
+        sa.Column("refreshed_at", sa.Float, nullable=False),
+    )
+    op.create_index(
+        "ix_discord_role_snapshots_refreshed_at",
+        "discord_role_snapshots",
+        ["refreshed_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_discord_role_snapshots_refreshed_at", table_name="discord_role_snapshots"
+    )
+    op.drop_table("discord_role_snapshots")
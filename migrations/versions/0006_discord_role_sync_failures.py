@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Failed attempts count as the user's latest sync, so the role-sync worker
+    # moves users whose sync keeps failing to the back of its queue.
+    op.create_table(
+        "discord_role_sync_failures",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("failed_at", sa.Float, nullable=False),
+        sa.Column("failures", sa.Integer, nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("discord_role_sync_failures")
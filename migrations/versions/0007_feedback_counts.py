@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Deployments using INIT_DB_ON_STARTUP already created and reconciled it.
+    if sa.inspect(op.get_bind()).has_table("feedback_counts"):
+        return
+    op.create_table(
+        "feedback_counts",
+        sa.Column("type", sa.String, primary_key=True),
+        sa.Column("status", sa.String, primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False, server_default="0"),
+    )
+    if not sa.inspect(op.get_bind()).has_table("feedback"):
+        return
+    # Backfill from the existing items; the service keeps the counts current.
+    op.execute(
+        "INSERT INTO feedback_counts (type, status, count) "
+        "SELECT type, status, COUNT(*) FROM feedback GROUP BY type, status"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("feedback_counts")
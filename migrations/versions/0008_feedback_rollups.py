@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+ROLLUPS = {"feedback_rollup_hourly": "hour", "feedback_rollup_daily": "day"}
+
+
+def _bucket_start(moment: datetime, interval: str) -> datetime:
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if interval == "day" else moment
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    created = {}
+    for name, interval in ROLLUPS.items():
+        # Deployments using INIT_DB_ON_STARTUP already created the table.
+        if inspector.has_table(name):
+            continue
+        table = op.create_table(
+            name,
+            sa.Column("bucket", sa.DateTime, primary_key=True),
+            sa.Column("type", sa.String, primary_key=True),
+            sa.Column("status", sa.String, primary_key=True),
+            sa.Column("entered", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("exited", sa.Integer, nullable=False, server_default="0"),
+        )
+        created[interval] = table
+    if not created or not inspector.has_table("feedback"):
+        return
+
+    # Backfill like feedback_service.api.rebuild_feedback_rollups(): each item
+    # entered ``open`` at created_at and, unless still open, moved to its
+    # current status at updated_at.
+    feedback = sa.table(
+        "feedback",
+        sa.column("type", sa.String),
+        sa.column("status", sa.String),
+        sa.column("created_at", sa.DateTime),
+        sa.column("updated_at", sa.DateTime),
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    totals: dict[str, dict[tuple, list[int]]] = {interval: {} for interval in created}
+    rows = bind.execute(
+        sa.select(
+            feedback.c.type,
+            feedback.c.status,
+            feedback.c.created_at,
+            feedback.c.updated_at,
+        )
+    )
+    for type_, status, created_at, updated_at in rows:
+        created_at = created_at or updated_at or now
+        moves = [(created_at, "open", 1, 0)]
+        if status != "open":
+            moved_at = updated_at or created_at
+            moves += [(moved_at, "open", 0, 1), (moved_at, status, 1, 0)]
+        for interval, buckets in totals.items():
+            for moment, bucket_status, entered, exited in moves:
+                key = (_bucket_start(moment, interval), type_, bucket_status)
+                counts = buckets.setdefault(key, [0, 0])
+                counts[0] += entered
+                counts[1] += exited
+
+    for interval, table in created.items():
+        op.bulk_insert(
+            table,
+            [
+                {
+                    "bucket": bucket,
+                    "type": type_,
+                    "status": status,
+                    "entered": entered,
+                    "exited": exited,
+                }
+                for (bucket, type_, status), (entered, exited) in totals[
+                    interval
+                ].items()
+            ],
+        )
+
+
+def downgrade() -> None:
+    for name in ROLLUPS:
+        op.drop_table(name)
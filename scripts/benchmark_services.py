@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""In-process throughput benchmarks for the DevOnboarder API services.
+
+Each scenario builds the FastAPI app against a throwaway SQLite database and
+drives it through ``httpx.ASGITransport`` so no network or running server is
+needed. Discord calls are replaced by stubs with a configurable latency.
+
+Usage::
+
+    python scripts/benchmark_services.py user --concurrency 1 10 50
+    python scripts/benchmark_services.py token --requests 2000
+    python scripts/benchmark_services.py xp --events 10 1000 10000 50000
+    python scripts/benchmark_services.py leaderboard --users 100000
+    python scripts/benchmark_services.py batch --items 2000
+    python scripts/benchmark_services.py feedback --rows 100000
+    python scripts/benchmark_services.py analytics --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+_DB_DIR = tempfile.mkdtemp(prefix="devonboarder-bench-")
+os.environ.setdefault("APP_ENV", "development")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-not-for-production")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from devonboarder import auth_service  # noqa: E402
+
+
+async def _drive(
+    send: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]],
+    app: Any,
+    requests: int,
+    concurrency: int,
+) -> tuple[float, list[float], int]:
+    """Send ``requests`` calls from ``concurrency`` workers.
+
+    Returns the achieved requests per second, the sorted latencies and the
+    number of non-2xx responses.
+    """
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                resp = await send(client)
+                latencies.append(time.perf_counter() - start)
+                if resp.is_error:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, sorted(latencies), errors
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def _report(
+    label: str, concurrency: int, rps: float, latencies: list[float], errors: int
+) -> None:
+    print(
+        f"{label:<12} c={concurrency:<4} {rps:>9.1f} req/s   "
+        f"p50={_percentile(latencies, 0.5) * 1000:7.1f} ms   "
+        f"p95={_percentile(latencies, 0.95) * 1000:7.1f} ms   "
+        f"errors={errors}"
+    )
+
+
+def _reset_database() -> None:
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.init_db()
+
+
+def _stub_discord(latency: float) -> None:
+    """Replace Discord lookups with stubs that sleep for ``latency`` seconds."""
+    roles = {"guild": ["role"]}
+    profile = {"id": "1", "username": "bench", "avatar": None}
+
+    def sync_roles(token: str) -> dict:
+        time.sleep(latency)
+        return roles
+
+    def sync_profile(token: str) -> dict:
+        time.sleep(latency)
+        return profile
+
+    async def async_roles(token: str) -> dict:
+        await asyncio.sleep(latency)
+        return roles
+
+    async def async_profile(token: str) -> dict:
+        await asyncio.sleep(latency)
+        return profile
+
+    auth_service.get_user_roles = sync_roles
+    auth_service.get_user_profile = sync_profile
+    auth_service.get_user_roles_async = async_roles
+    auth_service.get_user_profile_async = async_profile
+
+
+def _user_token() -> str:
+    with auth_service.SessionLocal() as db:
+        user = auth_service.User(username="bench", password_hash="", discord_token="t")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return auth_service.create_token(user)
+
+
+def bench_user(args: argparse.Namespace) -> None:
+    """Measure ``GET /api/user`` throughput in sync and async mode."""
+    _reset_database()
+    _stub_discord(args.discord_latency)
+    auth_service.discord_cache.ttl = args.cache_ttl
+    headers = {"Authorization": f"Bearer {_user_token()}"}
+
+    async def send(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/api/user", headers=headers)
+
+    for mode in args.modes:
+        auth_service.ASYNC_MODE = mode == "async"
+        app = auth_service.create_app()
+        for concurrency in args.concurrency:
+            auth_service.discord_cache.clear()
+            # Each run gets a fresh event loop; rebuild the async engine for it.
+            auth_service.AsyncSessionLocal = None
+            result = asyncio.run(_drive(send, app, args.requests, concurrency))
+            _report(mode, concurrency, *result)
+
+
+def bench_token(args: argparse.Namespace) -> None:
+    """Measure ``GET /api/user`` with the verified-token cache off and on.
+
+    Discord state is served from its cache so JWT verification and the user
+    lookup dominate each request.
+    """
+    _reset_database()
+    _stub_discord(0)
+    auth_service.discord_cache.ttl = 3600
+    headers = {"Authorization": f"Bearer {_user_token()}"}
+
+    async def send(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/api/user", headers=headers)
+
+    auth_service.ASYNC_MODE = args.mode == "async"
+    app = auth_service.create_app()
+    for ttl in (0, args.cache_ttl):
+        auth_service.token_cache.ttl = ttl
+        for concurrency in args.concurrency:
+            auth_service.token_cache.clear()
+            auth_service.AsyncSessionLocal = None
+            result = asyncio.run(_drive(send, app, args.requests, concurrency))
+            _report("cached" if ttl else "uncached", concurrency, *result)
+        stats = auth_service.token_cache.stats()
+        print(f"  token cache hits={stats['hits']} misses={stats['misses']}")
+
+
+def _seed_xp_user(username: str, events: int) -> str:
+    """Create ``username`` with ``events`` XP events and contributions."""
+    with auth_service.SessionLocal() as db:
+        user = auth_service.User(username=username, password_hash="", discord_token="t")
+        db.add(user)
+        db.flush()
+        db.execute(
+            insert(auth_service.XPEvent), [{"user_id": user.id, "xp": 1}] * events
+        )
+        db.execute(
+            insert(auth_service.Contribution),
+            [{"user_id": user.id, "description": "seed"}] * events,
+        )
+        db.commit()
+        # Bulk inserts bypass the per-event ledger update; backfill it.
+        auth_service.reconcile_xp_totals(db)
+        return auth_service.create_token(user)
+
+
+def bench_xp(args: argparse.Namespace) -> None:
+    """Measure level and onboarding reads for users with growing XP histories."""
+    from xp.api import create_app as create_xp_app
+
+    _reset_database()
+    _stub_discord(0)
+    auth_service.discord_cache.ttl = 3600
+    auth_app = auth_service.create_app()
+    xp_app = create_xp_app()
+
+    for events in args.events:
+        username = f"user{events}"
+        headers = {"Authorization": f"Bearer {_seed_xp_user(username, events)}"}
+        routes = {
+            "auth level": (auth_app, "/api/user/level", {}),
+            "auth onboard": (auth_app, "/api/user/onboarding-status", {}),
+            "xp level": (xp_app, "/api/user/level", {"username": username}),
+            "xp onboard": (
+                xp_app,
+                "/api/user/onboarding-status",
+                {"username": username},
+            ),
+        }
+        print(f"events={events}")
+        for label, (app, path, params) in routes.items():
+
+            async def send(client: httpx.AsyncClient) -> httpx.Response:
+                return await client.get(path, headers=headers, params=params)
+
+            result = asyncio.run(_drive(send, app, args.requests, 1))
+            _report(label, 1, *result)
+
+
+def bench_leaderboard(args: argparse.Namespace) -> None:
+    """Measure leaderboard pages, rank lookups and contributions at scale."""
+    import random
+
+    from xp import api as xp_api
+
+    _reset_database()
+    _stub_discord(0)
+    auth_service.discord_cache.ttl = 3600
+    rng = random.Random(0)
+    with auth_service.SessionLocal() as db:
+        db.execute(
+            insert(auth_service.User),
+            [
+                {
+                    "id": i,
+                    "username": f"user{i}",
+                    "password_hash": "",
+                    "discord_token": "t",
+                }
+                for i in range(1, args.users + 1)
+            ],
+        )
+        db.execute(
+            insert(auth_service.UserXPTotal),
+            [
+                {"user_id": i, "xp_total": xp, "level": auth_service.level_for_xp(xp)}
+                for i in range(1, args.users + 1)
+                for xp in [rng.randrange(0, 100_000)]
+            ],
+        )
+        db.commit()
+        token = auth_service.create_token(db.get(auth_service.User, 1))
+
+    app = xp_api.create_app()
+    xp_api.ranking.loaded_at = None
+    start = time.perf_counter()
+    with auth_service.SessionLocal() as db:
+        xp_api._ranking(db)
+    print(f"index load   {args.users} users in {time.perf_counter() - start:.2f} s")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    offsets = [0, args.users // 2, max(args.users - 20, 0)]
+    scenarios: dict[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]] = {}
+    for offset in offsets:
+        scenarios[f"page@{offset}"] = lambda c, o=offset: c.get(
+            "/api/leaderboard", params={"offset": o, "limit": 20}
+        )
+    scenarios["rank"] = lambda c: c.get(
+        "/api/user/rank", params={"username": f"user{rng.randrange(1, args.users)}"}
+    )
+    scenarios["contribute"] = lambda c: c.post(
+        "/api/user/contribute", json={"description": "bench"}, headers=headers
+    )
+    for label, send in scenarios.items():
+        result = asyncio.run(_drive(send, app, args.requests, 1))
+        _report(label, 1, *result)
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    """Compare per-item contributions with the batch endpoint."""
+    from xp import api as xp_api
+
+    _reset_database()
+    _stub_discord(0)
+    auth_service.discord_cache.ttl = 3600
+    headers = {"Authorization": f"Bearer {_user_token()}"}
+    app = xp_api.create_app()
+    xp_api.ranking.loaded_at = None
+
+    async def per_item(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post(
+            "/api/user/contribute", json={"description": "bench"}, headers=headers
+        )
+
+    start = time.perf_counter()
+    _, _, errors = asyncio.run(_drive(per_item, app, args.items, 1))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'per-item':<12} {args.items} items in {elapsed:6.2f} s "
+        f"({args.items / elapsed:8.0f} items/s) errors={errors}"
+    )
+
+    for size in args.batch_size:
+        payload = {"contributions": [{"description": "bench"}] * size}
+
+        async def batch(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.post(
+                "/api/user/contributions/batch", json=payload, headers=headers
+            )
+
+        requests = max(args.items // size, 1)
+        start = time.perf_counter()
+        _, _, errors = asyncio.run(_drive(batch, app, requests, 1))
+        elapsed = time.perf_counter() - start
+        items = requests * size
+        print(
+            f"{f'batch={size}':<12} {items} items in {elapsed:6.2f} s "
+            f"({items / elapsed:8.0f} items/s) errors={errors}"
+        )
+
+
+def bench_feedback(args: argparse.Namespace) -> None:
+    """Measure feedback pages and a full NDJSON export at table size."""
+    import tracemalloc
+
+    from feedback_service.api import Feedback, create_app as create_feedback_app
+
+    _reset_database()
+    with auth_service.SessionLocal() as db:
+        db.execute(
+            insert(Feedback),
+            [
+                {
+                    "type": ("bug", "feature")[i % 2],
+                    "status": "open",
+                    "description": "x",
+                }
+                for i in range(args.rows)
+            ],
+        )
+        db.commit()
+    app = create_feedback_app()
+
+    scenarios: dict[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]] = {
+        "first page": lambda c: c.get("/feedback", params={"limit": 100}),
+        "last page": lambda c: c.get(
+            "/feedback", params={"limit": 100, "cursor": args.rows - 100}
+        ),
+        "filtered": lambda c: c.get(
+            "/feedback", params={"limit": 100, "type": "bug", "fields": "id,status"}
+        ),
+    }
+    for label, send in scenarios.items():
+        result = asyncio.run(_drive(send, app, args.requests, 1))
+        _report(label, 1, *result)
+
+    async def export() -> int:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as c:
+            lines = 0
+            async with c.stream(
+                "GET", "/feedback", params={"format": "ndjson"}
+            ) as resp:
+                async for _ in resp.aiter_lines():
+                    lines += 1
+            return lines
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    lines = asyncio.run(export())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{'ndjson':<12} {lines} rows in {elapsed:6.2f} s "
+        f"peak={peak / 1_048_576:.1f} MiB"
+    )
+
+
+def bench_analytics(args: argparse.Namespace) -> None:
+    """Compare rollup-backed time series with a raw-row scan at scale."""
+    import random
+    from datetime import timedelta
+
+    from sqlalchemy import func, select
+
+    from feedback_service import api as feedback_api
+
+    _reset_database()
+    rng = random.Random(0)
+    now = feedback_api._utcnow()
+    start = time.perf_counter()
+    with auth_service.SessionLocal() as db:
+        for offset in range(0, args.rows, 50_000):
+            rows = []
+            for _ in range(min(50_000, args.rows - offset)):
+                created = now - timedelta(seconds=rng.randrange(365 * 86400))
+                closed = rng.random() < 0.6
+                rows.append(
+                    {
+                        "type": rng.choice(("bug", "feature", "question")),
+                        "status": "closed" if closed else "open",
+                        "description": "x",
+                        "created_at": created,
+                        "updated_at": (
+                            created + timedelta(hours=rng.randrange(1, 24 * 30))
+                            if closed
+                            else created
+                        ),
+                    }
+                )
+            db.execute(insert(feedback_api.Feedback), rows)
+        db.commit()
+    print(f"seed         {args.rows} rows in {time.perf_counter() - start:.1f} s")
+
+    # Bulk-loaded rows bypass the counters; reconciling them is not drift.
+    logging.getLogger(feedback_api.__name__).setLevel(logging.ERROR)
+    start = time.perf_counter()
+    with auth_service.SessionLocal() as db:
+        feedback_api.reconcile_feedback_counts(db)
+        feedback_api.rebuild_feedback_rollups(db)
+    print(f"rebuild      rollups in {time.perf_counter() - start:.1f} s")
+
+    app = feedback_api.create_app()
+    scenarios: dict[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]] = {
+        "open/day 90": lambda c: c.get(
+            "/feedback/analytics/timeseries",
+            params={"type": "bug", "status": "open", "periods": 90},
+        ),
+        "new/hour 48": lambda c: c.get(
+            "/feedback/analytics/timeseries",
+            params={"interval": "hour", "periods": 48, "metric": "entered"},
+        ),
+        "totals": lambda c: c.get("/feedback/analytics"),
+    }
+    for label, send in scenarios.items():
+        result = asyncio.run(_drive(send, app, args.requests, 1))
+        _report(label, 1, *result)
+
+    # The same "new bugs per day" series computed from raw rows.
+    Feedback = feedback_api.Feedback
+    query = (
+        select(func.date(Feedback.created_at), func.count())
+        .where(
+            Feedback.type == "bug",
+            Feedback.created_at >= now - timedelta(days=90),
+        )
+        .group_by(func.date(Feedback.created_at))
+    )
+    timings = []
+    with auth_service.SessionLocal() as db:
+        for _ in range(5):
+            begin = time.perf_counter()
+            db.execute(query).all()
+            timings.append(time.perf_counter() - begin)
+    print(f"{'raw scan':<12} p50={sorted(timings)[2] * 1000:7.1f} ms (new bugs/day)")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="scenario", required=True)
+
+    user = sub.add_parser("user", help="GET /api/user in sync vs async mode")
+    user.add_argument("--requests", type=int, default=500)
+    user.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    user.add_argument("--modes", nargs="+", default=["sync", "async"])
+    user.add_argument(
+        "--discord-latency",
+        type=float,
+        default=0.02,
+        help="Simulated latency in seconds per Discord call",
+    )
+    user.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0,
+        help="Discord cache TTL; 0 measures uncached Discord round trips",
+    )
+    user.set_defaults(func=bench_user)
+
+    token = sub.add_parser("token", help="GET /api/user with the JWT cache off/on")
+    token.add_argument("--requests", type=int, default=2000)
+    token.add_argument("--concurrency", type=int, nargs="+", default=[1, 10])
+    token.add_argument("--mode", choices=["sync", "async"], default="async")
+    token.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=300,
+        help="Verified-token cache TTL for the cached run",
+    )
+    token.set_defaults(func=bench_token)
+
+    xp = sub.add_parser("xp", help="Level/onboarding reads vs XP history size")
+    xp.add_argument("--requests", type=int, default=200)
+    xp.add_argument(
+        "--events",
+        type=int,
+        nargs="+",
+        default=[10, 1000, 10000],
+        help="XP events (and contributions) seeded per user",
+    )
+    xp.set_defaults(func=bench_xp)
+
+    board = sub.add_parser("leaderboard", help="Leaderboard and rank at scale")
+    board.add_argument("--users", type=int, default=100_000)
+    board.add_argument("--requests", type=int, default=200)
+    board.set_defaults(func=bench_leaderboard)
+
+    batch = sub.add_parser("batch", help="Per-item vs batch contribution ingest")
+    batch.add_argument("--items", type=int, default=2000)
+    batch.add_argument("--batch-size", type=int, nargs="+", default=[10, 100, 1000])
+    batch.set_defaults(func=bench_batch)
+
+    feedback = sub.add_parser("feedback", help="Feedback pages and NDJSON export")
+    feedback.add_argument("--rows", type=int, default=100_000)
+    feedback.add_argument("--requests", type=int, default=200)
+    feedback.set_defaults(func=bench_feedback)
+
+    analytics = sub.add_parser("analytics", help="Rollup time series at scale")
+    analytics.add_argument("--rows", type=int, default=1_000_000)
+    analytics.add_argument("--requests", type=int, default=200)
+    analytics.set_defaults(func=bench_analytics)
+
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""Backfill or repair the ``feedback_counts`` analytics buckets."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+os.environ.setdefault("APP_ENV", "development")
+
+from devonboarder import auth_service  # noqa: E402
+from feedback_service.api import (  # noqa: E402
+    rebuild_feedback_rollups,
+    reconcile_feedback_counts,
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Recompute drifted buckets; exit non-zero when any had drifted."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rebuild-rollups",
+        action="store_true",
+        help="Also recreate the hourly/daily rollups from feedback timestamps",
+    )
+    args = parser.parse_args(argv)
+
+    auth_service.Base.metadata.create_all(bind=auth_service.engine)
+    with auth_service.SessionLocal() as db:
+        drifted = reconcile_feedback_counts(db)
+        if args.rebuild_rollups:
+            scanned = rebuild_feedback_rollups(db)
+            print(f"Rebuilt feedback rollups from {scanned} item(s)")
+    print(f"Reconciled {drifted} drifted feedback count bucket(s)")
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
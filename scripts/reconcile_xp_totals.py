@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""Backfill or repair the ``user_xp_totals`` ledger from ``xp_events``."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+os.environ.setdefault("APP_ENV", "development")
+
+from devonboarder import auth_service  # noqa: E402
+
+
+def main() -> None:
+    """Recompute drifted per-user XP totals and print how many were fixed."""
+    auth_service.init_db()
+    with auth_service.SessionLocal() as db:
+        fixed = auth_service.reconcile_xp_totals(db)
+    print(f"Reconciled {fixed} user XP total(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Async variants of the auth service routes.
+
+Enabled with ``AUTH_ASYNC_MODE=true``. Handlers use an ``AsyncSession`` from
+:func:`devonboarder.auth_service.init_async_engine` and the pooled async
+Discord client, so slow database or Discord calls no longer hold a threadpool
+worker, and bcrypt runs through ``PasswordHasher``'s async API. Behaviour and
+responses match the synchronous routes, including read-replica routing for the
+read-only endpoints.
+"""
+
+from __future__ import annotations
+
+from typing import AsyncIterator, Optional
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import RedirectResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from devonboarder import auth_service
+from devonboarder.password_hashing import HashQueueFull
+
+router = APIRouter()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Yield an ``AsyncSession`` bound to the async engine."""
+    factory = auth_service.AsyncSessionLocal or auth_service.init_async_engine()
+    async with factory() as db:
+        yield db
+
+
+async def get_async_read_db(
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(
+        auth_service.optional_security
+    ),
+) -> AsyncIterator[AsyncSession]:
+    """Async equivalent of :func:`auth_service.get_read_db`."""
+    db = None
+    if creds is not None and auth_service._wrote_recently(creds.credentials):
+        auth_service.read_routing["read_after_write"] += 1
+    else:
+        db = await auth_service._async_replica_session()
+    if db is None:
+        factory = auth_service.AsyncSessionLocal or auth_service.init_async_engine()
+        db = factory()
+        auth_service.read_routing["primary"] += 1
+    else:
+        auth_service.read_routing["replica"] += 1
+    async with db:
+        yield db
+
+
+async def _get_user_by_username(
+    db: AsyncSession, username: str
+) -> Optional[auth_service.User]:
+    result = await db.execute(
+        select(auth_service.User).where(auth_service.User.username == username)
+    )
+    return result.scalars().first()
+
+
+async def get_current_user_async(
+    creds: HTTPAuthorizationCredentials = Depends(auth_service.security),
+    db: AsyncSession = Depends(get_async_db),
+) -> auth_service.User:
+    """Async equivalent of :func:`auth_service.get_current_user`."""
+    user_id = auth_service.decode_user_id(creds.credentials)
+    db.info["user_id"] = user_id
+
+    user = await db.get(auth_service.User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+
+    discord_token: str = user.discord_token  # type: ignore[assignment]
+    try:
+        state = await auth_service._resolve_discord_state_async(
+            user_id, discord_token, db
+        )
+    except httpx.TimeoutException as exc:
+        raise HTTPException(status_code=504, detail="Discord API timeout") from exc
+    except httpx.HTTPStatusError as exc:
+        raise auth_service._discord_status_error(exc) from exc
+
+    return auth_service._attach_discord_state(user, state)
+
+
+@router.post("/api/register")
+async def register(
+    data: dict, db: AsyncSession = Depends(get_async_db)
+) -> dict[str, str]:
+    """Create a new user and return an authentication token."""
+    username = data["username"]
+    password = data["password"]
+    discord_token = data.get("discord_token")
+    if await _get_user_by_username(db, username):
+        raise HTTPException(status_code=400, detail="Username exists")
+    validated_password = auth_service._validate_password_for_bcrypt(password)
+    try:
+        password_hash = await auth_service.password_hasher.hash_async(
+            validated_password
+        )
+    except HashQueueFull as exc:
+        raise auth_service._hashing_busy(exc) from exc
+    user = auth_service.User(
+        username=username,
+        password_hash=password_hash,
+        discord_token=discord_token,
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return {"token": auth_service.create_token(user)}
+
+
+@router.post("/api/login")
+async def login(data: dict, db: AsyncSession = Depends(get_async_db)) -> dict[str, str]:
+    """Authenticate a user and return a JWT."""
+    username = data["username"]
+    password = data["password"]
+    discord_token = data.get("discord_token")
+    validated_password = auth_service._validate_password_for_bcrypt(password)
+    user = await _get_user_by_username(db, username)
+    if not user or not user.password_hash:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    password_hash: str = user.password_hash  # type: ignore[assignment]
+    try:
+        verified, new_hash = await auth_service.password_hasher.verify_and_update_async(
+            validated_password, password_hash
+        )
+    except HashQueueFull as exc:
+        raise auth_service._hashing_busy(exc) from exc
+    if not verified:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash is not None:
+        user.password_hash = new_hash  # type: ignore[assignment]
+    if discord_token is not None:
+        user.discord_token = discord_token
+    if new_hash is not None or discord_token is not None:
+        await db.commit()
+    if discord_token is not None:
+        auth_service.invalidate_discord_cache(int(user.id))
+    return {"token": auth_service.create_token(user)}
+
+
+@router.get("/login/discord/callback", response_model=None)
+async def discord_callback(
+    code: str,
+    state: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> RedirectResponse | dict[str, str]:
+    """Exchange the OAuth code for a token and return a JWT."""
+    try:
+        async with httpx.AsyncClient(timeout=auth_service.API_TIMEOUT) as client:
+            token_resp = await client.post(
+                "https://discord.com/api/oauth2/token",
+                data=auth_service._oauth_token_data(code),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+    except httpx.TimeoutException as exc:
+        raise HTTPException(status_code=504, detail="Discord API timeout") from exc
+    token_resp.raise_for_status()
+    access_token = token_resp.json()["access_token"]
+
+    profile = await auth_service.get_user_profile_async(access_token)
+    username = profile["id"]
+    user = await _get_user_by_username(db, username)  # type: ignore[arg-type]
+    if not user:
+        user = auth_service.User(
+            username=username,
+            password_hash="",  # Empty string indicates Discord-only account
+            discord_token=access_token,
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+    else:
+        user.discord_token = access_token
+        await db.commit()
+        auth_service.invalidate_discord_cache(int(user.id))
+
+    token = auth_service.create_token(user)
+    return auth_service._discord_callback_response(token, state)
+
+
+@router.get("/api/user/onboarding-status")
+async def onboarding_status(
+    current_user: auth_service.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> dict[str, str]:
+    """Return the user's onboarding progress."""
+    has_contribution = await db.scalar(
+        auth_service.has_contribution_query(int(current_user.id))
+    )
+    return {"status": "complete" if has_contribution else "pending"}
+
+
+@router.get("/api/user/level")
+async def user_level(
+    current_user: auth_service.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> dict[str, int]:
+    """Calculate the user's level from accumulated XP."""
+    level = await db.scalar(auth_service.level_query(int(current_user.id)))
+    return {"level": level or auth_service.level_for_xp(0)}
+
+
+@router.get("/api/user/contributions")
+async def user_contributions(
+    current_user: auth_service.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, list[str]]:
+    """List the user's recorded contributions."""
+    result = await db.scalars(
+        auth_service.contribution_descriptions_query(int(current_user.id))
+    )
+    return {"contributions": list(result)}
+
+
+@router.post("/api/user/contributions")
+async def add_contribution(
+    data: dict,
+    current_user: auth_service.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, str]:
+    """Record a new contribution and award XP."""
+    username = data.get("username", current_user.username)
+    description = data["description"]
+
+    user = await _get_user_by_username(db, username)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if user.id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    db.add(auth_service.Contribution(user_id=user.id, description=description))
+    db.add(auth_service.XPEvent(user_id=user.id, xp=auth_service.CONTRIBUTION_XP))
+    await db.commit()
+    return {"recorded": description}
+
+
+@router.post("/api/user/promote")
+async def promote(
+    data: dict,
+    current_user: auth_service.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, str]:
+    """Grant admin privileges to another user."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+    target = await _get_user_by_username(db, data["username"])
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
+    target.is_admin = True  # type: ignore[assignment]
+    await db.commit()
+    target_username: str = target.username  # type: ignore[assignment]
+    return {"promoted": target_username}
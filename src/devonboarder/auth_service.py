@@ -2,61 +2,76 @@
 
 from __future__ import annotations
 
-# Patch bcrypt for passlib compatibility before any other imports
-try:
-    import bcrypt as real_bcrypt
-    import bcrypt._bcrypt as _bcrypt
-
-    # Store the original C function directly
-    original_hashpw = _bcrypt.hashpw
-
-    # Create a wrapper function that truncates passwords
-    def patched_hashpw(password, salt):
-        if isinstance(password, str):
-            password = password.encode("utf-8")
-        if len(password) > 72:
-            password = password[:72]
-        return original_hashpw(password, salt)
-
-    # Replace the function in the module
-    real_bcrypt.hashpw = patched_hashpw
-
-    # Add the missing __about__ attribute that passlib expects (if missing)
-    if not hasattr(real_bcrypt, "__about__"):
-
-        class About:
-            __version__ = getattr(real_bcrypt, "__version__", "5.0.0")
-
-        setattr(real_bcrypt, "__about__", About())
-
-except ImportError:
-    pass
+# Imported first: applies the bcrypt compatibility patch passlib relies on
+from devonboarder.password_hashing import (
+    HashQueueFull,
+    PasswordHasher,
+    calibrate_rounds,
+    configure_rounds,
+)
 
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse
-
-from utils.discord import get_user_roles, get_user_profile
+from fastapi.routing import APIRoute
+
+from utils.cache import TTLCache
+from utils.db_pool import (
+    configure_sqlite,
+    dialect_insert,
+    engine_options,
+    pool_stats,
+)
+from utils.db_pool import instrument as instrument_pool
+
+if TYPE_CHECKING:
+    from jwt.types import Options
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+    from utils.jwks import KeySet, TokenVerifier
+from utils.discord import (
+    get_scheduler,
+    get_user_profile,
+    get_user_profile_async,
+    get_user_roles,
+    get_user_roles_async,
+)
 from utils.roles import resolve_user_flags
 from utils.cors import get_cors_origins
 from urllib.parse import urlencode, urlparse, unquote
 import httpx
 from sqlalchemy import (
+    JSON,
     Column,
+    Connection,
+    Engine,
+    Float,
     Integer,
     String,
     Boolean,
     ForeignKey,
+    Insert,
+    Select,
     create_engine,
+    delete,
+    event,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
 )
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship, Session
 from passlib.context import CryptContext
 import jwt
 from jwt.exceptions import InvalidTokenError
+import asyncio
+import hashlib
 import os
 import time
 import logging
@@ -151,34 +166,207 @@ def is_safe_redirect_url(url: str) -> bool:
 
 _secret_key_raw = os.getenv("JWT_SECRET_KEY")
 APP_ENV = os.getenv("APP_ENV")
-if (not _secret_key_raw or _secret_key_raw == "secret") and APP_ENV != "development":
-    raise RuntimeError(
-        "JWT_SECRET_KEY must be set to a non-default value in production"
-    )
-
-# Ensure SECRET_KEY is never None for type checking - secure fallback
-if not _secret_key_raw:
-    raise RuntimeError(
-        "JWT_SECRET_KEY environment variable is required. "
-        "Set JWT_SECRET_KEY to a secure random string for production use."
-    )
-SECRET_KEY: str = _secret_key_raw
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# RS256/EdDSA tokens are signed with a rotating key set (see utils.jwks) and
+# carry a ``kid`` header; the shared secret is only needed for HMAC tokens.
+ASYMMETRIC_JWT = ALGORITHM in ("RS256", "EdDSA")
+if not ASYMMETRIC_JWT:
+    if (
+        not _secret_key_raw or _secret_key_raw == "secret"
+    ) and APP_ENV != "development":
+        raise RuntimeError(
+            "JWT_SECRET_KEY must be set to a non-default value in production"
+        )
+
+    # Ensure SECRET_KEY is never None for type checking - secure fallback
+    if not _secret_key_raw:
+        raise RuntimeError(
+            "JWT_SECRET_KEY environment variable is required. "
+            "Set JWT_SECRET_KEY to a secure random string for production use."
+        )
+SECRET_KEY: str = _secret_key_raw or ""
 TOKEN_EXPIRE_SECONDS = int(os.getenv("TOKEN_EXPIRE_SECONDS", "3600"))
 API_TIMEOUT = int(os.getenv("DISCORD_API_TIMEOUT", "10"))
+DISCORD_CACHE_TTL = float(os.getenv("DISCORD_CACHE_TTL", "60"))
+DISCORD_CACHE_MAXSIZE = int(os.getenv("DISCORD_CACHE_MAXSIZE", "1024"))
+# Role snapshots older than this many seconds fall back to a live Discord fetch.
+DISCORD_ROLE_SNAPSHOT_MAX_AGE = float(os.getenv("DISCORD_ROLE_SNAPSHOT_MAX_AGE", "900"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "4096"))
+# Serve the auth routes with async handlers backed by an AsyncSession
+ASYNC_MODE = os.getenv("AUTH_ASYNC_MODE", "false").lower() == "true"
 
 
 CONTRIBUTION_XP = 50
 
 Base = declarative_base()
 _db_url = os.getenv("DATABASE_URL", "sqlite:///./auth.db")
-_engine_kwargs = (
-    {"connect_args": {"check_same_thread": False}}
-    if _db_url.startswith("sqlite")
-    else {}
+# The XP, feedback and Discord integration services share this engine, so
+# size the pool for all of them (at least the server's worker threads).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() == "true"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+engine = create_engine(
+    _db_url,
+    **engine_options(
+        _db_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pre_ping=DB_POOL_PRE_PING,
+        recycle=DB_POOL_RECYCLE,
+    ),
 )
-engine = create_engine(_db_url, **_engine_kwargs)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+configure_sqlite(engine, wal=SQLITE_WAL, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS)
+instrument_pool(engine)
+
+
+class TrackedSession(Session):
+    """Session that opens the read-after-write window when it commits writes."""
+
+
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=TrackedSession
+)
+
+# Read-only endpoints use get_read_db(), which routes to READ_DATABASE_URL when
+# set. A user who wrote within READ_AFTER_WRITE_SECONDS reads from the primary
+# so replication lag never hides their own changes, and reads fall back to the
+# primary for READ_REPLICA_RETRY_SECONDS whenever the replica cannot connect.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+READ_REPLICA_RETRY_SECONDS = float(os.getenv("READ_REPLICA_RETRY_SECONDS", "30"))
+read_engine = None
+ReadSessionLocal = None
+
+
+def init_read_engine(url: Optional[str]) -> None:
+    """Create the replica engine used by :func:`get_read_db`.
+
+    Parameters
+    ----------
+    url : Optional[str]
+        Replica database URL. An empty value routes every read to the primary.
+    """
+    global read_engine, ReadSessionLocal, _replica_down_until
+    global async_read_engine, AsyncReadSessionLocal
+    read_engine = ReadSessionLocal = None
+    # Rebuilt from read_engine by init_async_read_engine() in async mode.
+    async_read_engine = AsyncReadSessionLocal = None
+    _replica_down_until = 0.0
+    if not url:
+        return
+    read_engine = create_engine(
+        url,
+        **engine_options(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pre_ping=DB_POOL_PRE_PING,
+            recycle=DB_POOL_RECYCLE,
+        ),
+    )
+    configure_sqlite(read_engine, wal=False, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS)
+    instrument_pool(read_engine)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+_replica_down_until = 0.0
+init_read_engine(READ_DATABASE_URL)
+
+# Created on demand by init_async_engine() so the async driver stays optional
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+async_read_engine: Optional[AsyncEngine] = None
+AsyncReadSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def _async_db_url(url: str) -> str:
+    """Return ``url`` rewritten for the matching async driver."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix) :]
+    return url
+
+
+def _create_async_engine(url: str, *, wal: bool) -> AsyncEngine:
+    """Return an async engine with the same pool settings as the sync engines."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = _async_db_url(url)
+    async_db = create_async_engine(
+        url,
+        **engine_options(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pre_ping=DB_POOL_PRE_PING,
+            recycle=DB_POOL_RECYCLE,
+            asynchronous=True,
+        ),
+    )
+    # Pool events and pragmas attach to the sync engine the async one wraps.
+    configure_sqlite(
+        async_db.sync_engine, wal=wal, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS
+    )
+    instrument_pool(async_db.sync_engine)
+    return async_db
+
+
+def init_async_engine(url: Optional[str] = None) -> async_sessionmaker[AsyncSession]:
+    """Create the async engine and session factory used in async mode.
+
+    Parameters
+    ----------
+    url : Optional[str]
+        Synchronous or async database URL. Defaults to ``ASYNC_DATABASE_URL``
+        or the URL of the sync engine.
+
+    Returns
+    -------
+    async_sessionmaker[AsyncSession]
+        The new :data:`AsyncSessionLocal`.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    global async_engine, AsyncSessionLocal
+    if url is None:
+        url = os.getenv("ASYNC_DATABASE_URL") or engine.url.render_as_string(
+            hide_password=False
+        )
+    async_engine = _create_async_engine(url, wal=SQLITE_WAL)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=TrackedSession,
+    )
+    return AsyncSessionLocal
+
+
+def init_async_read_engine() -> None:
+    """Create the async replica engine for the URL of :data:`read_engine`."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    global async_read_engine, AsyncReadSessionLocal
+    async_read_engine = AsyncReadSessionLocal = None
+    if read_engine is None:
+        return
+    async_read_engine = _create_async_engine(
+        read_engine.url.render_as_string(hide_password=False), wal=False
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False
+    )
+
 
 pwd_context = CryptContext(
     schemes=["bcrypt"],
@@ -186,6 +374,72 @@ pwd_context = CryptContext(
     bcrypt__default_rounds=12,
 )
 
+# New hashes use BCRYPT_ROUNDS; stored hashes with fewer rounds (or more than
+# BCRYPT_MAX_ROUNDS) are rehashed on the user's next successful login. When
+# BCRYPT_TARGET_MS is set, create_app() calibrates the rounds on this host
+# instead, staying within BCRYPT_MIN_ROUNDS..BCRYPT_MAX_ROUNDS.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "14"))
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "0"))
+configure_rounds(pwd_context, BCRYPT_ROUNDS, max_rounds=BCRYPT_MAX_ROUNDS)
+
+# bcrypt runs in a process pool with one worker per core unless
+# PASSWORD_HASH_WORKERS is set; 0 hashes on the request thread instead. At most
+# PASSWORD_HASH_QUEUE_SIZE operations are queued before requests get a 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1)
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=PASSWORD_HASH_WORKERS,
+    queue_size=PASSWORD_HASH_QUEUE_SIZE,
+    retry_after=PASSWORD_HASH_RETRY_AFTER,
+)
+
+
+def _hashing_busy(exc: HashQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def hash_password(password: str) -> str:
+    """Hash ``password`` through the bounded hashing pool."""
+    try:
+        return password_hasher.hash(password)
+    except HashQueueFull as exc:
+        raise _hashing_busy(exc) from exc
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verify ``password`` through the bounded hashing pool."""
+    try:
+        return password_hasher.verify(password, hashed)
+    except HashQueueFull as exc:
+        raise _hashing_busy(exc) from exc
+
+
+def verify_and_update_password(
+    password: str, hashed: str
+) -> tuple[bool, Optional[str]]:
+    """Verify ``password`` and return a new hash if ``hashed`` is outdated."""
+    try:
+        return password_hasher.verify_and_update(password, hashed)
+    except HashQueueFull as exc:
+        raise _hashing_busy(exc) from exc
+
+
+def calibrate_password_hashing(target_ms: float) -> int:
+    """Pick bcrypt rounds for ``target_ms`` on this host and apply them."""
+    rounds = calibrate_rounds(
+        target_ms, min_rounds=BCRYPT_MIN_ROUNDS, max_rounds=BCRYPT_MAX_ROUNDS
+    )
+    configure_rounds(pwd_context, rounds, max_rounds=BCRYPT_MAX_ROUNDS)
+    return rounds
+
 
 def _validate_password_for_bcrypt(password: Optional[str]) -> str:
     """Validate and truncate passwords for bcrypt compatibility.
@@ -242,7 +496,7 @@ class Contribution(Base):
     __tablename__ = "contributions"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     description = Column(String, nullable=False)
 
     user = relationship("User", back_populates="contributions")
@@ -252,17 +506,327 @@ class XPEvent(Base):
     __tablename__ = "xp_events"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     xp = Column(Integer, default=0)
 
     user = relationship("User", back_populates="events")
 
 
+class UserXPTotal(Base):
+    """Running XP total and level per user, maintained as XP events are added."""
+
+    __tablename__ = "user_xp_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    xp_total = Column(Integer, nullable=False, default=0)
+    level = Column(Integer, nullable=False, default=1)
+
+
+class DiscordRoleSnapshot(Base):
+    """Discord roles and profile per user, refreshed by the role-sync worker."""
+
+    __tablename__ = "discord_role_snapshots"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Digest of the OAuth token the snapshot was fetched with.
+    token_digest = Column(String, nullable=False)
+    roles = Column(JSON, nullable=False)
+    profile = Column(JSON, nullable=False)
+    refreshed_at = Column(Float, nullable=False, index=True)
+
+
+class DiscordRoleSyncFailure(Base):
+    """Last failed role-sync attempt per user; cleared by a successful sync."""
+
+    __tablename__ = "discord_role_sync_failures"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    failed_at = Column(Float, nullable=False)
+    failures = Column(Integer, nullable=False, default=0)
+
+
+def level_for_xp(xp_total: int) -> int:
+    """Return the level reached with ``xp_total`` experience points."""
+    return xp_total // 100 + 1
+
+
+def xp_total_upsert(bind: Engine | Connection, user_id: int, xp: int) -> Insert:
+    """Return a statement adding ``xp`` to the user's row in ``user_xp_totals``."""
+    values = {"user_id": user_id, "xp_total": xp, "level": level_for_xp(xp)}
+    new_total = UserXPTotal.xp_total + xp
+    return (
+        dialect_insert(bind)(UserXPTotal)
+        .values(**values)
+        .on_conflict_do_update(
+            index_elements=[UserXPTotal.user_id],
+            set_={"xp_total": new_total, "level": new_total // 100 + 1},
+        )
+    )
+
+
+@event.listens_for(XPEvent, "after_insert")
+def _update_xp_total(mapper, connection, target: XPEvent) -> None:
+    # Runs in the flush that inserts the event, so the total commits (or rolls
+    # back) together with it. Bulk Core inserts bypass this; run
+    # reconcile_xp_totals() after loading events that way.
+    if target.user_id is not None:
+        connection.execute(
+            xp_total_upsert(connection, int(target.user_id), int(target.xp or 0))
+        )
+
+
+def bulk_add_contributions(db: Session, items: list[tuple[int, str]]) -> None:
+    """Insert ``(user_id, description)`` contributions and their XP in bulk.
+
+    Contributions and XP events go through one executemany each, then the
+    ledger gets one upsert per distinct user. The caller commits.
+    """
+    if not items:
+        return
+    db.execute(
+        insert(Contribution),
+        [{"user_id": user_id, "description": text} for user_id, text in items],
+    )
+    db.execute(
+        insert(XPEvent),
+        [{"user_id": user_id, "xp": CONTRIBUTION_XP} for user_id, _ in items],
+    )
+    awarded: dict[int, int] = {}
+    for user_id, _ in items:
+        awarded[user_id] = awarded.get(user_id, 0) + CONTRIBUTION_XP
+    bind = db.get_bind()
+    for user_id, xp in awarded.items():
+        db.execute(xp_total_upsert(bind, user_id, xp))
+
+
+def reconcile_xp_totals(db: Session) -> int:
+    """Rebuild drifted ``user_xp_totals`` rows from ``xp_events``.
+
+    Returns the number of rows inserted, corrected or removed.
+    """
+    sums = (
+        select(XPEvent.user_id, func.sum(XPEvent.xp).label("xp_total"))
+        .where(XPEvent.user_id.is_not(None))
+        .group_by(XPEvent.user_id)
+        .subquery()
+    )
+    drifted = db.execute(
+        select(sums.c.user_id, sums.c.xp_total)
+        .outerjoin(UserXPTotal, UserXPTotal.user_id == sums.c.user_id)
+        .where(
+            or_(
+                UserXPTotal.user_id.is_(None),
+                UserXPTotal.xp_total != sums.c.xp_total,
+            )
+        )
+    ).all()
+    for user_id, xp_total in drifted:
+        db.merge(
+            UserXPTotal(
+                user_id=user_id, xp_total=xp_total, level=level_for_xp(xp_total)
+            )
+        )
+    orphaned = db.execute(
+        delete(UserXPTotal).where(
+            ~exists().where(XPEvent.user_id == UserXPTotal.user_id)
+        )
+    )
+    db.commit()
+    return len(drifted) + (orphaned.rowcount or 0)
+
+
+# Reads use SQL (a primary-key lookup, EXISTS, a single-column select) rather
+# than loading ``User.events`` or ``User.contributions``; each query is shared
+# by the sync and async routes.
+def level_query(user_id: int) -> Select:
+    """Return a query for the user's stored level (no row means level 1)."""
+    return select(UserXPTotal.level).where(UserXPTotal.user_id == user_id)
+
+
+def has_contribution_query(user_id: int) -> Select:
+    """Return a query that is true when the user has any contribution."""
+    return select(exists().where(Contribution.user_id == user_id))
+
+
+def contribution_descriptions_query(user_id: int) -> Select:
+    """Return a query for the user's contribution descriptions, oldest first."""
+    return (
+        select(Contribution.description)
+        .where(Contribution.user_id == user_id)
+        .order_by(Contribution.id)
+    )
+
+
 def init_db() -> None:
     """Create database tables if they do not exist."""
     Base.metadata.create_all(bind=engine)
 
 
+# Resolved Discord roles, flags and profile keyed by user ID. Each entry records
+# a digest of the OAuth token it was fetched with so a replaced token misses.
+discord_cache = TTLCache(maxsize=DISCORD_CACHE_MAXSIZE, ttl=DISCORD_CACHE_TTL)
+
+
+def invalidate_discord_cache(user_id: int) -> None:
+    """Forget cached Discord state for ``user_id`` after its token changes."""
+    discord_cache.invalidate(user_id)
+
+
+def _token_digest(discord_token: Optional[str]) -> str:
+    return hashlib.sha256((discord_token or "").encode("utf-8")).hexdigest()
+
+
+role_snapshot_reads = {"hits": 0, "misses": 0}
+
+
+def fresh_role_snapshot(
+    snapshot: Optional[DiscordRoleSnapshot], discord_token: Optional[str]
+) -> Optional[DiscordRoleSnapshot]:
+    """Return ``snapshot`` if it matches ``discord_token`` and is recent enough."""
+    if (
+        snapshot is None
+        or snapshot.token_digest != _token_digest(discord_token)
+        or time.time() - snapshot.refreshed_at > DISCORD_ROLE_SNAPSHOT_MAX_AGE
+    ):
+        role_snapshot_reads["misses"] += 1
+        return None
+    role_snapshot_reads["hits"] += 1
+    return snapshot
+
+
+def store_role_snapshot(
+    db: Session,
+    user_id: int,
+    discord_token: str,
+    roles: dict[str, list[str]],
+    profile: dict,
+) -> None:
+    """Insert or replace the role snapshot for ``user_id`` (not committed)."""
+    db.merge(
+        DiscordRoleSnapshot(
+            user_id=user_id,
+            token_digest=_token_digest(discord_token),
+            roles=roles,
+            profile=profile,
+            refreshed_at=time.time(),
+        )
+    )
+
+
+def _cached_discord_state(
+    user_id: int, token_digest: str
+) -> Optional[dict[str, object]]:
+    cached = discord_cache.get(user_id)
+    if cached is not None and cached["token_digest"] == token_digest:
+        return cached
+    return None
+
+
+def _store_discord_state(
+    user_id: int,
+    token_digest: str,
+    roles: dict[str, list[str]],
+    profile: dict,
+) -> dict[str, object]:
+    """Resolve flags from ``roles`` and cache the combined Discord state.
+
+    ``roles`` must come from a lookup where every guild succeeded: the Discord
+    helpers raise on rate limits and timeouts instead of returning ``[]``, so a
+    failed lookup never reaches the cache.
+    """
+    admin_guild = os.getenv("ADMIN_SERVER_GUILD_ID")
+    if admin_guild:
+        relevant_roles = roles.get(admin_guild, [])
+    else:
+        relevant_roles = [r for rs in roles.values() for r in rs]
+
+    state: dict[str, object] = {
+        "token_digest": token_digest,
+        "roles": roles,
+        "flags": resolve_user_flags(relevant_roles),
+        "profile": profile,
+    }
+    discord_cache.set(user_id, state)
+    return state
+
+
+def _store_snapshot_state(
+    user_id: int, token_digest: str, snapshot: DiscordRoleSnapshot
+) -> dict[str, object]:
+    """Cache the Discord state recorded in a fresh role ``snapshot``."""
+    roles: dict[str, list[str]] = snapshot.roles  # type: ignore[assignment]
+    profile: dict = snapshot.profile  # type: ignore[assignment]
+    return _store_discord_state(user_id, token_digest, roles, profile)
+
+
+def _resolve_discord_state(
+    user_id: int, discord_token: str, db: Optional[Session] = None
+) -> dict[str, object]:
+    """Return roles, flags and profile for ``discord_token``.
+
+    The in-process cache is checked first, then the role snapshot kept fresh
+    by the role-sync worker; Discord is only called when both miss.
+    """
+    token_digest = _token_digest(discord_token)
+    cached = _cached_discord_state(user_id, token_digest)
+    if cached is not None:
+        return cached
+    if db is not None:
+        snapshot = fresh_role_snapshot(
+            db.get(DiscordRoleSnapshot, user_id), discord_token
+        )
+        if snapshot is not None:
+            return _store_snapshot_state(user_id, token_digest, snapshot)
+
+    roles = get_user_roles(discord_token)
+    profile = get_user_profile(discord_token)
+    return _store_discord_state(user_id, token_digest, roles, profile)
+
+
+async def _resolve_discord_state_async(
+    user_id: int, discord_token: str, db: Optional[AsyncSession] = None
+) -> dict[str, object]:
+    """Async variant of :func:`_resolve_discord_state`."""
+    token_digest = _token_digest(discord_token)
+    cached = _cached_discord_state(user_id, token_digest)
+    if cached is not None:
+        return cached
+    if db is not None:
+        snapshot = fresh_role_snapshot(
+            await db.get(DiscordRoleSnapshot, user_id), discord_token
+        )
+        if snapshot is not None:
+            return _store_snapshot_state(user_id, token_digest, snapshot)
+
+    roles, profile = await asyncio.gather(
+        get_user_roles_async(discord_token),
+        get_user_profile_async(discord_token),
+    )
+    return _store_discord_state(user_id, token_digest, roles, profile)
+
+
+def _discord_status_error(exc: httpx.HTTPStatusError) -> HTTPException:
+    """Return the response for a Discord lookup that failed with ``exc``."""
+    if exc.response.status_code == 429:
+        return HTTPException(status_code=503, detail="Discord API rate limited")
+    return HTTPException(status_code=502, detail="Discord API error")
+
+
+def _attach_discord_state(user: User, state: dict[str, object]) -> User:
+    """Attach resolved Discord information to ``user`` for downstream handlers."""
+    flags: dict = state["flags"]  # type: ignore[assignment]
+    profile: dict = state["profile"]  # type: ignore[assignment]
+
+    user.roles = state["roles"]
+    user.isAdmin = flags["isAdmin"]
+    user.isVerified = flags["isVerified"]
+    user.verificationType = flags["verificationType"]
+    user.discord_id = profile["id"]
+    user.discord_username = profile["username"]
+    user.avatar = profile["avatar"]
+    return user
+
+
 def get_db() -> Session:
     db = SessionLocal()
     try:
@@ -271,34 +835,226 @@ def get_db() -> Session:
         db.close()
 
 
+# User IDs that committed a write recently; their reads stay on the primary.
+recent_writers = TTLCache(maxsize=100_000, ttl=READ_AFTER_WRITE_SECONDS)
+read_routing = {"replica": 0, "primary": 0, "read_after_write": 0, "fallback": 0}
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _flag_flush(session: TrackedSession, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _flag_dml(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(TrackedSession, "after_commit")
+def _open_read_after_write_window(session: TrackedSession) -> None:
+    # get_current_user() tags the request session with the caller's ID.
+    wrote = session.info.pop("wrote", False)
+    user_id = session.info.get("user_id")
+    if wrote and user_id is not None:
+        recent_writers.set(user_id, True)
+
+
+def _wrote_recently(jwt_token: str) -> bool:
+    try:
+        user_id = decode_user_id(jwt_token)
+    except HTTPException:
+        return False
+    return recent_writers.get(user_id) is not None
+
+
+def _replica_session() -> Optional[Session]:
+    """Return a connected replica session, or ``None`` to use the primary."""
+    global _replica_down_until
+    if ReadSessionLocal is None or time.monotonic() < _replica_down_until:
+        return None
+    db = ReadSessionLocal()
+    try:
+        db.connection()
+    except DBAPIError:
+        db.close()
+        logger.warning(
+            "Read replica unavailable; using the primary for %ss",
+            READ_REPLICA_RETRY_SECONDS,
+            exc_info=True,
+        )
+        _replica_down_until = time.monotonic() + READ_REPLICA_RETRY_SECONDS
+        read_routing["fallback"] += 1
+        return None
+    return db
+
+
+async def _async_replica_session() -> Optional[AsyncSession]:
+    """Async counterpart of :func:`_replica_session`; shares its retry window."""
+    global _replica_down_until
+    if read_engine is not None and AsyncReadSessionLocal is None:
+        init_async_read_engine()
+    if AsyncReadSessionLocal is None or time.monotonic() < _replica_down_until:
+        return None
+    db = AsyncReadSessionLocal()
+    try:
+        await db.connection()
+    except DBAPIError:
+        await db.close()
+        logger.warning(
+            "Read replica unavailable; using the primary for %ss",
+            READ_REPLICA_RETRY_SECONDS,
+            exc_info=True,
+        )
+        _replica_down_until = time.monotonic() + READ_REPLICA_RETRY_SECONDS
+        read_routing["fallback"] += 1
+        return None
+    return db
+
+
+optional_security = HTTPBearer(auto_error=False)
+
+
+def get_read_db(
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> Session:
+    """Yield a session for read-only handlers, on the replica when possible."""
+    db = None
+    if creds is not None and _wrote_recently(creds.credentials):
+        read_routing["read_after_write"] += 1
+    else:
+        db = _replica_session()
+    if db is None:
+        db = SessionLocal()
+        read_routing["primary"] += 1
+    else:
+        read_routing["replica"] += 1
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def load_signing_keys() -> Optional[KeySet]:
+    """Return the asymmetric signing key set, or ``None`` for HMAC tokens.
+
+    Keys are read from ``JWT_KEYS_DIR``; ``JWT_ACTIVE_KID`` pins the signing
+    key. In development an ephemeral key is generated when no directory is set.
+    """
+    if not ASYMMETRIC_JWT:
+        return None
+    from utils.jwks import KeySet
+
+    keys_dir = os.getenv("JWT_KEYS_DIR")
+    if keys_dir:
+        return KeySet.from_directory(keys_dir, os.getenv("JWT_ACTIVE_KID") or None)
+    if APP_ENV != "development":
+        raise RuntimeError(f"JWT_KEYS_DIR is required when JWT_ALGORITHM={ALGORITHM}")
+    return KeySet.generate(ALGORITHM)
+
+
+# Private keys are loaded only where tokens are issued: by create_app() here,
+# or on the first create_token() call. The XP, feedback and Discord
+# integration services import this module for its models and sessions but
+# never sign, so with RS256/EdDSA they verify against JWT_JWKS_URL instead.
+signing_keys: Optional[KeySet] = None
+jwks_verifier: Optional[TokenVerifier] = None
+
+
+def init_signing_keys() -> Optional[KeySet]:
+    """Load the signing keys for this process unless already loaded."""
+    global signing_keys
+    if signing_keys is None:
+        signing_keys = load_signing_keys()
+    return signing_keys
+
+
+def _jwks_verifier() -> TokenVerifier:
+    global jwks_verifier
+    if jwks_verifier is None:
+        from utils.jwks import TokenVerifier
+
+        jwks_verifier = TokenVerifier.from_env()
+    return jwks_verifier
+
+
 def create_token(user: User) -> str:
     """Return a signed JWT for the given user."""
     iat = int(time.time())
     payload = {"sub": str(user.id), "iat": iat, "exp": iat + TOKEN_EXPIRE_SECONDS}
+    keys = init_signing_keys()
+    if keys is not None:
+        return keys.sign(payload)
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def _verify_token(jwt_token: str) -> dict:
+    options: Options = {"verify_exp": True}
+    if signing_keys is not None:
+        return signing_keys.decode(jwt_token, options=options)
+    if ASYMMETRIC_JWT:
+        return _jwks_verifier().verify(jwt_token, options=options)
+    return jwt.decode(jwt_token, SECRET_KEY, algorithms=[ALGORITHM], options=options)
+
+
 security = HTTPBearer()
 
+# User IDs of verified JWTs keyed by a digest of the token, so repeat bearer
+# tokens skip signature verification. Entries live at most TOKEN_CACHE_TTL
+# seconds and never past the token's ``exp`` claim; tokens without ``exp`` and
+# failed verifications are not cached. Each entry keeps the ``kid`` that signed
+# the token and is dropped once that key is retired.
+token_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=TOKEN_CACHE_TTL)
+
+
+def _kid_published(kid: Optional[str]) -> bool:
+    """Return whether the key ``kid`` can still verify tokens."""
+    if signing_keys is not None:
+        return kid in signing_keys
+    if ASYMMETRIC_JWT:
+        return jwks_verifier is not None and kid in jwks_verifier
+    return True
+
+
+def decode_user_id(jwt_token: str) -> int:
+    """Verify ``jwt_token`` and return the user ID from its ``sub`` claim."""
+    digest = hashlib.sha256(jwt_token.encode("utf-8")).hexdigest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        user_id, expires_at, kid = cached
+        if expires_at > time.time() and _kid_published(kid):
+            return user_id
+        token_cache.invalidate(digest)
 
-def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    jwt_token = creds.credentials
     try:
-        payload = jwt.decode(
-            jwt_token,
-            SECRET_KEY,
-            algorithms=[ALGORITHM],
-            options={"verify_exp": True},
-        )
+        payload = _verify_token(jwt_token)
         user_id = int(payload["sub"])
     except (InvalidTokenError, KeyError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
+    except httpx.HTTPError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Signing keys unavailable",
+        ) from exc
+
+    if isinstance(payload.get("exp"), (int, float)):
+        expires_at = float(payload["exp"])
+        remaining = expires_at - time.time()
+        if remaining > 0:
+            kid = jwt.get_unverified_header(jwt_token).get("kid")
+            token_cache.set(digest, (user_id, expires_at, kid), ttl=remaining)
+    return user_id
+
+
+def get_current_user(
+    creds: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> User:
+    user_id = decode_user_id(creds.credentials)
+    db.info["user_id"] = user_id
 
     user = db.get(User, user_id)
     if user is None:
@@ -307,33 +1063,19 @@ def get_current_user(
             detail="User not found",
         )
 
-    # Fetch Discord roles and profile using the stored OAuth token. Handle
-    # timeouts from the Discord API so the service can respond with a 504.
+    # Use the synced role snapshot, or fetch Discord roles and profile with
+    # the stored OAuth token. Handle timeouts from the Discord API so the
+    # service can respond with a 504. Results are cached per user for
+    # DISCORD_CACHE_TTL seconds.
     discord_token: str = user.discord_token  # type: ignore[assignment]
     try:
-        roles = get_user_roles(discord_token)
-        admin_guild = os.getenv("ADMIN_SERVER_GUILD_ID")
-        if admin_guild:
-            relevant_roles = roles.get(admin_guild, [])
-        else:
-            relevant_roles = [r for rs in roles.values() for r in rs]
-
-        flags = resolve_user_flags(relevant_roles)
-
-        profile = get_user_profile(discord_token)
+        state = _resolve_discord_state(user_id, discord_token, db)
     except httpx.TimeoutException as exc:
         raise HTTPException(status_code=504, detail="Discord API timeout") from exc
+    except httpx.HTTPStatusError as exc:
+        raise _discord_status_error(exc) from exc
 
-    # Attach resolved information to the user object for downstream handlers
-    user.roles = roles
-    user.isAdmin = flags["isAdmin"]
-    user.isVerified = flags["isVerified"]
-    user.verificationType = flags["verificationType"]
-    user.discord_id = profile["id"]
-    user.discord_username = profile["username"]
-    user.avatar = profile["avatar"]
-
-    return user
+    return _attach_discord_state(user, state)
 
 
 router = APIRouter()
@@ -345,6 +1087,37 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@router.get("/.well-known/jwks.json")
+def jwks() -> dict[str, list[dict[str, str]]]:
+    """Publish the public keys that verify tokens issued by this service."""
+    if signing_keys is None:
+        return {"keys": []}
+    return signing_keys.jwks()
+
+
+@router.get("/metrics")
+def metrics() -> dict[str, dict[str, float]]:
+    """Return in-process cache, scheduler and hashing counters for scraping."""
+    return {
+        "token_cache": token_cache.stats(),
+        "discord_cache": discord_cache.stats(),
+        "discord_scheduler": get_scheduler().stats(),
+        "password_hashing": password_hasher.stats(),
+        "db_pool": pool_stats(engine),
+        "db_read_pool": pool_stats(read_engine) if read_engine is not None else {},
+        "db_async_pool": (
+            pool_stats(async_engine.sync_engine) if async_engine is not None else {}
+        ),
+        "db_async_read_pool": (
+            pool_stats(async_read_engine.sync_engine)
+            if async_read_engine is not None
+            else {}
+        ),
+        "read_routing": dict(read_routing),
+        "role_snapshots": dict(role_snapshot_reads),
+    }
+
+
 @router.post("/api/register")
 def register(data: dict, db: Session = Depends(get_db)) -> dict[str, str]:
     """Create a new user and return an authentication token."""
@@ -357,7 +1130,7 @@ def register(data: dict, db: Session = Depends(get_db)) -> dict[str, str]:
     validated_password = _validate_password_for_bcrypt(password)
     user = User(
         username=username,
-        password_hash=pwd_context.hash(validated_password),
+        password_hash=hash_password(validated_password),
         discord_token=discord_token,
     )
     db.add(user)
@@ -382,11 +1155,18 @@ def login(data: dict, db: Session = Depends(get_db)) -> dict[str, str]:
     if not user.password_hash:
         # No local password set (Discord-only account)
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    if not pwd_context.verify(validated_password, user.password_hash):
+    password_hash: str = user.password_hash  # type: ignore[assignment]
+    verified, new_hash = verify_and_update_password(validated_password, password_hash)
+    if not verified:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash is not None:
+        user.password_hash = new_hash  # type: ignore[assignment]
     if discord_token is not None:
         user.discord_token = discord_token
+    if new_hash is not None or discord_token is not None:
         db.commit()
+    if discord_token is not None:
+        invalidate_discord_cache(int(user.id))
     return {"token": create_token(user)}
 
 
@@ -409,60 +1189,25 @@ def discord_login(redirect_to: Optional[str] = None) -> RedirectResponse:
     return RedirectResponse(url)
 
 
-@router.get("/login/discord/callback", response_model=None)
-def discord_callback(
-    code: str, state: Optional[str] = None, db: Session = Depends(get_db)
-) -> RedirectResponse | dict[str, str]:
-    """Exchange the OAuth code for a token and return a JWT."""
-    # Debug logging to see what we receive
-    logger.info(f"Discord callback - code: {code[:10]}..., state: {state}")
-
-    # Debug logging to see what redirect_uri is being used
+def _oauth_token_data(code: str) -> dict[str, Optional[str]]:
+    """Return the form body exchanging an OAuth ``code`` for a Discord token."""
     redirect_uri = os.getenv(
         "DISCORD_REDIRECT_URI",
         "http://localhost:8002/login/discord/callback",
     )
-    try:
-        token_data = {
-            "client_id": os.getenv("DISCORD_CLIENT_ID"),
-            "client_secret": os.getenv("DISCORD_CLIENT_SECRET"),
-            "grant_type": "authorization_code",
-            "code": code,
-            "redirect_uri": redirect_uri,
-        }
-
-        token_resp = httpx.post(
-            "https://discord.com/api/oauth2/token",
-            data=token_data,
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=API_TIMEOUT,
-        )
-    except httpx.TimeoutException as exc:
-        raise HTTPException(status_code=504, detail="Discord API timeout") from exc
-    token_resp.raise_for_status()
-    access_token = token_resp.json()["access_token"]
-
-    profile = get_user_profile(access_token)
-    username = profile["id"]
-    user = db.query(User).filter_by(username=username).first()
-    if not user:
-        # Discord-created accounts have no local password. Store empty hash
-        # to indicate this is a Discord-only account.
-        user = User(
-            username=username,
-            password_hash="",  # Empty string indicates Discord-only account
-            discord_token=access_token,
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    else:
-        user.discord_token = access_token
-        db.commit()
+    return {
+        "client_id": os.getenv("DISCORD_CLIENT_ID"),
+        "client_secret": os.getenv("DISCORD_CLIENT_SECRET"),
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": redirect_uri,
+    }
 
-    # Redirect to frontend with token
-    token = create_token(user)
 
+def _discord_callback_response(
+    token: str, state: Optional[str]
+) -> RedirectResponse | dict[str, str]:
+    """Return the redirect (or JSON in test mode) carrying the new JWT."""
     # For testing, return JSON instead of redirect
     if os.getenv("TEST_MODE"):
         return {"token": token}
@@ -551,27 +1296,79 @@ def discord_callback(
     return RedirectResponse(final_redirect)
 
 
+@router.get("/login/discord/callback", response_model=None)
+def discord_callback(
+    code: str, state: Optional[str] = None, db: Session = Depends(get_db)
+) -> RedirectResponse | dict[str, str]:
+    """Exchange the OAuth code for a token and return a JWT."""
+    # Debug logging to see what we receive
+    logger.info(f"Discord callback - code: {code[:10]}..., state: {state}")
+
+    try:
+        token_resp = httpx.post(
+            "https://discord.com/api/oauth2/token",
+            data=_oauth_token_data(code),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=API_TIMEOUT,
+        )
+    except httpx.TimeoutException as exc:
+        raise HTTPException(status_code=504, detail="Discord API timeout") from exc
+    token_resp.raise_for_status()
+    access_token = token_resp.json()["access_token"]
+
+    profile = get_user_profile(access_token)
+    username = profile["id"]
+    user = db.query(User).filter_by(username=username).first()
+    if not user:
+        # Discord-created accounts have no local password. Store empty hash
+        # to indicate this is a Discord-only account.
+        user = User(
+            username=username,
+            password_hash="",  # Empty string indicates Discord-only account
+            discord_token=access_token,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    else:
+        user.discord_token = access_token
+        db.commit()
+        invalidate_discord_cache(int(user.id))
+
+    # Redirect to frontend with token
+    token = create_token(user)
+
+    return _discord_callback_response(token, state)
+
+
 @router.get("/api/user/onboarding-status")
-def onboarding_status(current_user: User = Depends(get_current_user)) -> dict[str, str]:
+def onboarding_status(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+) -> dict[str, str]:
     """Return the user's onboarding progress."""
-    status_str = "complete" if current_user.contributions else "pending"
-    return {"status": status_str}
+    has_contribution = db.scalar(has_contribution_query(int(current_user.id)))
+    return {"status": "complete" if has_contribution else "pending"}
 
 
 @router.get("/api/user/level")
-def user_level(current_user: User = Depends(get_current_user)) -> dict[str, int]:
+def user_level(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+) -> dict[str, int]:
     """Calculate the user's level from accumulated XP."""
-    xp_total = sum(evt.xp for evt in current_user.events)
-    level = xp_total // 100 + 1
-    return {"level": level}
+    level = db.scalar(level_query(int(current_user.id)))
+    return {"level": level or level_for_xp(0)}
 
 
 @router.get("/api/user/contributions")
 def user_contributions(
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ) -> dict[str, list[str]]:
     """List the user's recorded contributions."""
-    return {"contributions": [c.description for c in current_user.contributions]}
+    result = db.scalars(contribution_descriptions_query(int(current_user.id)))
+    return {"contributions": list(result)}
 
 
 @router.post("/api/user/contributions")
@@ -621,6 +1418,11 @@ def create_app() -> FastAPI:
     if os.getenv("INIT_DB_ON_STARTUP"):
         init_db()
 
+    init_signing_keys()
+
+    if BCRYPT_TARGET_MS > 0:
+        calibrate_password_hashing(BCRYPT_TARGET_MS)
+
     app = FastAPI()
     cors_origins = get_cors_origins()
 
@@ -645,7 +1447,30 @@ def create_app() -> FastAPI:
 
     from routes.user import router as user_router
 
-    app.include_router(router)
+    if ASYNC_MODE:
+        from devonboarder import auth_async
+
+        # Async handlers replace their sync counterparts; routes without an
+        # async variant (health, metrics, OAuth redirect) are shared.
+        async_routes = {
+            (route.path, frozenset(route.methods or ()))
+            for route in auth_async.router.routes
+            if isinstance(route, APIRoute)
+        }
+        app.include_router(auth_async.router)
+        app.include_router(
+            APIRouter(
+                routes=[
+                    route
+                    for route in router.routes
+                    if not isinstance(route, APIRoute)
+                    or (route.path, frozenset(route.methods or ())) not in async_routes
+                ]
+            )
+        )
+        app.dependency_overrides[get_current_user] = auth_async.get_current_user_async
+    else:
+        app.include_router(router)
     app.include_router(user_router)
     return app
 
@@ -0,0 +1,319 @@
+"""Bounded bcrypt hashing and verification for the auth service.
+
+bcrypt at 12 rounds costs a few hundred milliseconds of CPU per call. Running
+it on request threads lets a login storm saturate the worker pool, so
+:class:`PasswordHasher` runs it in a process pool sized to the host's cores
+and rejects work once a bounded queue fills up. Callers turn the rejection
+into ``503 Service Unavailable`` with ``Retry-After``.
+
+It also handles cost tuning: :meth:`PasswordHasher.verify_and_update` returns
+a replacement hash when a stored hash no longer matches the configured bcrypt
+rounds, and :func:`calibrate_rounds` picks a rounds value from a target hash
+latency measured on the current host.
+
+Importing this module also applies the bcrypt compatibility patch passlib
+needs; worker processes pick it up when they unpickle the task functions.
+"""
+
+from __future__ import annotations
+
+# Patch bcrypt for passlib compatibility before any other imports
+try:
+    import bcrypt as real_bcrypt
+    import bcrypt._bcrypt as _bcrypt
+
+    # Store the original C function directly
+    original_hashpw = _bcrypt.hashpw
+
+    # Create a wrapper function that truncates passwords
+    def patched_hashpw(password, salt):
+        if isinstance(password, str):
+            password = password.encode("utf-8")
+        if len(password) > 72:
+            password = password[:72]
+        return original_hashpw(password, salt)
+
+    # Replace the function in the module
+    real_bcrypt.hashpw = patched_hashpw
+
+    # Add the missing __about__ attribute that passlib expects (if missing)
+    if not hasattr(real_bcrypt, "__about__"):
+
+        class About:
+            __version__ = getattr(real_bcrypt, "__version__", "5.0.0")
+
+        setattr(real_bcrypt, "__about__", About())
+
+except ImportError:
+    pass
+
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+
+class HashQueueFull(RuntimeError):
+    """Raised when the hashing queue is at capacity."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+@functools.lru_cache(maxsize=8)
+def _context_from_config(config: str) -> CryptContext:
+    return CryptContext.from_string(config)
+
+
+def _hash_task(config: str, password: str) -> str:
+    """Hash ``password`` in a worker process."""
+    return _context_from_config(config).hash(password)
+
+
+def _verify_task(config: str, password: str, hashed: str) -> bool:
+    """Verify ``password`` against ``hashed`` in a worker process."""
+    return _context_from_config(config).verify(password, hashed)
+
+
+def _verify_and_update_task(
+    config: str, password: str, hashed: str
+) -> tuple[bool, Optional[str]]:
+    """Verify ``password`` and return a rehash if the stored cost is outdated."""
+    return _context_from_config(config).verify_and_update(password, hashed)
+
+
+def configure_rounds(
+    context: CryptContext, rounds: int, *, max_rounds: Optional[int] = None
+) -> None:
+    """Hash new passwords with ``rounds`` and flag weaker hashes for rehash.
+
+    Stored hashes below ``rounds`` (or above ``max_rounds``) report
+    ``needs_update`` and are replaced on the user's next successful login.
+    """
+    settings: dict[str, int] = {
+        "bcrypt__default_rounds": rounds,
+        "bcrypt__min_rounds": rounds,
+    }
+    if max_rounds is not None:
+        settings["bcrypt__max_rounds"] = max(rounds, max_rounds)
+    context.update(**settings)
+
+
+def measure_hash_ms(rounds: int, *, samples: int = 3) -> float:
+    """Return the fastest of ``samples`` bcrypt hashes at ``rounds``, in ms."""
+    context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+    best = math.inf
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def calibrate_rounds(
+    target_ms: float,
+    *,
+    min_rounds: int = 10,
+    max_rounds: int = 14,
+    measure: Callable[[int], float] = measure_hash_ms,
+) -> int:
+    """Return the highest bcrypt rounds whose hash time stays within ``target_ms``.
+
+    One probe is timed at ``min_rounds``; each extra round doubles the cost,
+    so the result is extrapolated from it and clamped to the given bounds.
+    """
+    probe_ms = max(measure(min_rounds), 0.001)
+    extra = math.floor(math.log2(target_ms / probe_ms)) if target_ms > 0 else 0
+    rounds = min(max(min_rounds + extra, min_rounds), max_rounds)
+    logger.info(
+        "bcrypt calibration: %.1f ms at %d rounds, target %.0f ms -> %d rounds",
+        probe_ms,
+        min_rounds,
+        target_ms,
+        rounds,
+    )
+    return rounds
+
+
+class _OpStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class PasswordHasher:
+    """Run ``context.hash``/``context.verify`` with bounded concurrency.
+
+    Parameters
+    ----------
+    context:
+        The passlib context whose configuration is used for every operation.
+    workers:
+        Size of the process pool. ``0`` runs operations inline on the calling
+        thread, still subject to the queue bound.
+    queue_size:
+        Maximum operations queued or running at once before new ones are
+        rejected with :class:`HashQueueFull`.
+    retry_after:
+        Seconds suggested to clients whose request was rejected.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext,
+        *,
+        workers: int = 0,
+        queue_size: int = 64,
+        retry_after: int = 1,
+    ) -> None:
+        self.context = context
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._stats = {"hash": _OpStats(), "verify": _OpStats()}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _acquire(self) -> float:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashQueueFull(self.retry_after)
+        with self._lock:
+            self._in_flight += 1
+        return time.perf_counter()
+
+    def _release(self, op: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._in_flight -= 1
+            self._stats[op].record(elapsed)
+        self._slots.release()
+
+    def _submit(self, op: str, fn: Callable[..., Any], *args: Any) -> Future:
+        """Queue ``fn`` on the process pool, releasing the slot when it finishes."""
+        started = self._acquire()
+        try:
+            future = self._pool().submit(fn, self.context.to_string(), *args)
+        except BaseException:
+            self._release(op, started)
+            raise
+        future.add_done_callback(lambda _: self._release(op, started))
+        return future
+
+    def _run_inline(self, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+        started = self._acquire()
+        try:
+            return fn(*args)
+        finally:
+            self._release(op, started)
+
+    def hash(self, password: str) -> str:
+        """Return the hash of ``password``, blocking the calling thread."""
+        if not self.workers:
+            return self._run_inline("hash", self.context.hash, password)
+        return self._submit("hash", _hash_task, password).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Return whether ``password`` matches ``hashed``."""
+        if not self.workers:
+            return self._run_inline("verify", self.context.verify, password, hashed)
+        return self._submit("verify", _verify_task, password, hashed).result()
+
+    def _count_rehash(self, result: tuple[bool, Optional[str]]) -> None:
+        if result[1] is not None:
+            with self._lock:
+                self._rehashed += 1
+
+    def verify_and_update(
+        self, password: str, hashed: str
+    ) -> tuple[bool, Optional[str]]:
+        """Verify ``password`` and return a new hash if ``hashed`` is outdated."""
+        if not self.workers:
+            result = self._run_inline(
+                "verify", self.context.verify_and_update, password, hashed
+            )
+        else:
+            result = self._submit(
+                "verify", _verify_and_update_task, password, hashed
+            ).result()
+        self._count_rehash(result)
+        return result
+
+    async def hash_async(self, password: str) -> str:
+        """Async variant of :meth:`hash` that never blocks the event loop."""
+        if not self.workers:
+            return await asyncio.to_thread(self.hash, password)
+        return await asyncio.wrap_future(self._submit("hash", _hash_task, password))
+
+    async def verify_async(self, password: str, hashed: str) -> bool:
+        """Async variant of :meth:`verify` that never blocks the event loop."""
+        if not self.workers:
+            return await asyncio.to_thread(self.verify, password, hashed)
+        return await asyncio.wrap_future(
+            self._submit("verify", _verify_task, password, hashed)
+        )
+
+    async def verify_and_update_async(
+        self, password: str, hashed: str
+    ) -> tuple[bool, Optional[str]]:
+        """Async variant of :meth:`verify_and_update`."""
+        if not self.workers:
+            return await asyncio.to_thread(self.verify_and_update, password, hashed)
+        result = await asyncio.wrap_future(
+            self._submit("verify", _verify_and_update_task, password, hashed)
+        )
+        self._count_rehash(result)
+        return result
+
+    def stats(self) -> dict[str, float]:
+        """Return queue occupancy and per-operation latency counters."""
+        with self._lock:
+            result: dict[str, float] = {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "rounds": self.context.to_dict().get("bcrypt__default_rounds", 0),
+            }
+            for op, stats in self._stats.items():
+                avg = stats.total / stats.count if stats.count else 0.0
+                result[f"{op}_count"] = stats.count
+                result[f"{op}_avg_ms"] = round(avg * 1000, 3)
+                result[f"{op}_max_ms"] = round(stats.max * 1000, 3)
+            return result
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, if any were started."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -2,20 +2,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import Any
+from typing import Any, Optional
 
 import httpx
 from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from utils.cors import get_cors_origins
-from utils.discord import get_user_roles
+from utils.discord import get_user_roles, get_user_roles_async
 from devonboarder import auth_service
 
 API_TIMEOUT = int(os.getenv("DISCORD_API_TIMEOUT", "10"))
+# Usernames accepted by /roles/batch and Discord lookups it runs at once.
+ROLES_BATCH_MAX = int(os.getenv("DISCORD_ROLES_BATCH_MAX", "100"))
+ROLES_BATCH_CONCURRENCY = int(os.getenv("DISCORD_ROLES_BATCH_CONCURRENCY", "10"))
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -78,6 +88,8 @@ def exchange_oauth(
         else:
             user.discord_token = token
         db.commit()
+        if user.id is not None:
+            auth_service.invalidate_discord_cache(user.id)
     except Exception as exc:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error") from exc
@@ -86,7 +98,7 @@ def exchange_oauth(
 
 @router.get("/roles")
 def get_roles(
-    username: str, db: Session = Depends(auth_service.get_db)
+    username: str, db: Session = Depends(auth_service.get_read_db)
 ) -> dict[str, Any]:
     """Get Discord roles for a user."""
     try:
@@ -102,10 +114,19 @@ def get_roles(
         if discord_token == "":  # noqa: B105
             raise HTTPException(status_code=404, detail="Invalid Discord token")
 
+        # Prefer the snapshot kept fresh by the role-sync worker.
+        snapshot = auth_service.fresh_role_snapshot(
+            db.get(auth_service.DiscordRoleSnapshot, user.id), discord_token
+        )
+        if snapshot is not None:
+            return {"roles": snapshot.roles}
+
         try:
             roles = get_user_roles(discord_token)
         except httpx.TimeoutException as exc:
             raise HTTPException(status_code=504, detail="Discord API timeout") from exc
+        except httpx.HTTPStatusError as exc:
+            raise auth_service._discord_status_error(exc) from exc
 
         return {"roles": roles}
     except HTTPException:
@@ -114,6 +135,99 @@ def get_roles(
         raise HTTPException(status_code=500, detail="Database error") from exc
 
 
+def _load_tokens(
+    db: Session, usernames: list[str]
+) -> tuple[dict[str, Optional[str]], dict[str, Any]]:
+    """Return tokens and role snapshots for the known ``usernames``.
+
+    Both come from one query: ``({username: discord_token}, {username:
+    snapshot})``, where users without a snapshot are left out of the second.
+    """
+    User = auth_service.User
+    Snapshot = auth_service.DiscordRoleSnapshot
+    rows = db.execute(
+        select(User.username, User.discord_token, Snapshot)
+        .outerjoin(Snapshot, Snapshot.user_id == User.id)
+        .where(User.username.in_(usernames))
+    ).all()
+    tokens = {username: token for username, token, _ in rows}
+    snapshots = {username: snap for username, _, snap in rows if snap is not None}
+    return tokens, snapshots
+
+
+def _token_error(username: str, tokens: dict[str, Optional[str]]) -> Optional[str]:
+    if username not in tokens:
+        return "User not found"
+    if tokens[username] is None:
+        return "Discord token not found"
+    if tokens[username] == "":  # noqa: B105
+        return "Invalid Discord token"
+    return None
+
+
+def _lookup_error(exc: BaseException) -> str:
+    if isinstance(exc, httpx.TimeoutException):
+        return "Discord API timeout"
+    if not isinstance(exc, httpx.HTTPError):
+        logger.error("Discord role lookup failed", exc_info=exc)
+    return "Discord API error"
+
+
+@router.post("/roles/batch")
+async def get_roles_batch(
+    data: dict[str, list[str]], db: Session = Depends(auth_service.get_read_db)
+) -> dict[str, Any]:
+    """Get Discord roles for many users at once.
+
+    Tokens and role-sync snapshots are loaded with a single query. Users
+    without a fresh snapshot are looked up concurrently through the shared
+    Discord client and rate-limit scheduler. Users that cannot be resolved
+    are listed under ``errors`` instead of failing the whole request.
+    """
+    usernames = list(dict.fromkeys(data.get("usernames") or []))
+    if not usernames:
+        raise HTTPException(status_code=422, detail="usernames is required")
+    if len(usernames) > ROLES_BATCH_MAX:
+        raise HTTPException(
+            status_code=422, detail=f"At most {ROLES_BATCH_MAX} usernames allowed"
+        )
+    try:
+        tokens, snapshots = await run_in_threadpool(_load_tokens, db, usernames)
+    except SQLAlchemyError as exc:
+        raise HTTPException(status_code=500, detail="Database error") from exc
+
+    roles: dict[str, dict[str, list[str]]] = {}
+    errors: dict[str, str] = {}
+    lookups: dict[str, str] = {}
+    for username in usernames:
+        error = _token_error(username, tokens)
+        if error is not None:
+            errors[username] = error
+            continue
+        token: str = tokens[username]  # type: ignore[assignment]
+        snapshot = auth_service.fresh_role_snapshot(snapshots.get(username), token)
+        if snapshot is not None:
+            roles[username] = snapshot.roles
+        else:
+            lookups[username] = token
+
+    slots = asyncio.Semaphore(ROLES_BATCH_CONCURRENCY)
+
+    async def lookup(token: str) -> dict[str, list[str]]:
+        async with slots:
+            return await get_user_roles_async(token)
+
+    results = await asyncio.gather(
+        *(lookup(token) for token in lookups.values()), return_exceptions=True
+    )
+    for username, result in zip(lookups, results):
+        if isinstance(result, BaseException):
+            errors[username] = _lookup_error(result)
+        else:
+            roles[username] = result
+    return {"roles": roles, "errors": errors}
+
+
 def create_app() -> FastAPI:
     """Build the Discord Integration FastAPI application."""
 
@@ -0,0 +1,181 @@
+"""Background worker that keeps Discord role snapshots fresh.
+
+Each pass refreshes the linked users whose last sync attempt is oldest (never
+attempted first), spacing the Discord lookups evenly over
+``DISCORD_ROLE_SYNC_INTERVAL`` seconds so the sync never bursts against
+Discord's rate limits. A failed attempt is recorded too, so users whose sync
+keeps failing go to the back of the queue instead of starving everyone else.
+Requests read the snapshots (see
+:func:`devonboarder.auth_service.fresh_role_snapshot`) and only call Discord
+when a snapshot is missing or stale.
+
+Run it next to the integration service with ``devonboarder-role-sync``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import delete, func, select
+
+from devonboarder import auth_service
+from utils.discord import DiscordClient, get_client
+
+SYNC_INTERVAL = float(os.getenv("DISCORD_ROLE_SYNC_INTERVAL", "300"))
+SYNC_BATCH_SIZE = int(os.getenv("DISCORD_ROLE_SYNC_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+def due_users(batch_size: int) -> list[tuple[int, str]]:
+    """Return ``(user_id, discord_token)`` for linked users, stalest first.
+
+    A user's last attempt is their latest failure, or else their snapshot's
+    refresh time; users never attempted come first.
+    """
+    User = auth_service.User
+    Snapshot = auth_service.DiscordRoleSnapshot
+    Failure = auth_service.DiscordRoleSyncFailure
+    last_attempt = func.coalesce(Failure.failed_at, Snapshot.refreshed_at)
+    query = (
+        select(User.id, User.discord_token)
+        .outerjoin(Snapshot, Snapshot.user_id == User.id)
+        .outerjoin(Failure, Failure.user_id == User.id)
+        .where(User.discord_token.is_not(None), User.discord_token != "")
+        .order_by(last_attempt.asc().nullsfirst(), User.id)
+        .limit(batch_size)
+    )
+    with auth_service.SessionLocal() as db:
+        return [(user_id, token) for user_id, token in db.execute(query)]
+
+
+def record_failure(user_id: int) -> None:
+    """Record a failed sync so the user moves behind the others in the queue."""
+    with auth_service.SessionLocal() as db:
+        failure = db.get(auth_service.DiscordRoleSyncFailure, user_id)
+        if failure is None:
+            failure = auth_service.DiscordRoleSyncFailure(user_id=user_id, failures=0)
+            db.add(failure)
+        failure.failed_at = time.time()
+        failure.failures += 1
+        db.commit()
+
+
+class RoleSyncWorker:
+    """Refresh role snapshots for linked users, a paced batch per pass.
+
+    Parameters
+    ----------
+    interval:
+        Seconds one pass is spread over.
+    batch_size:
+        Maximum users refreshed per pass.
+    client:
+        Discord client; defaults to the process-wide one.
+    sleep:
+        Coroutine used to wait between lookups (replaced in tests).
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = SYNC_INTERVAL,
+        batch_size: int = SYNC_BATCH_SIZE,
+        client: Optional[DiscordClient] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self._client = client
+        self._sleep = sleep
+        self.passes = 0
+        self.synced = 0
+        self.failed = 0
+        self.last_pass_seconds = 0.0
+
+    async def sync_user(self, user_id: int, discord_token: str) -> bool:
+        """Fetch and store one user's roles; return ``False`` on failure.
+
+        Any error (Discord, including a lookup still rate limited or timed
+        out, a malformed payload, the database) is logged and recorded against
+        this user only, so one bad user never stops a pass. The previous
+        snapshot is left in place.
+        """
+        client = self._client or get_client()
+        try:
+            roles, profile = await asyncio.gather(
+                client.get_user_roles(discord_token),
+                client.get_user_profile(discord_token),
+            )
+            with auth_service.SessionLocal() as db:
+                try:
+                    auth_service.store_role_snapshot(
+                        db, user_id, discord_token, roles, profile
+                    )
+                    db.execute(
+                        delete(auth_service.DiscordRoleSyncFailure).where(
+                            auth_service.DiscordRoleSyncFailure.user_id == user_id
+                        )
+                    )
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+        except Exception:
+            # The kept snapshot ages out and requests fall back to Discord.
+            logger.warning("Role sync failed for user %s", user_id, exc_info=True)
+            self.failed += 1
+            try:
+                record_failure(user_id)
+            except Exception:
+                logger.exception("Could not record role sync failure for %s", user_id)
+            return False
+        self.synced += 1
+        return True
+
+    async def run_once(self) -> int:
+        """Refresh one batch, pacing lookups over the interval; return its size."""
+        started = time.monotonic()
+        users = due_users(self.batch_size)
+        spacing = self.interval / len(users) if users else 0.0
+        for user_id, token in users:
+            await self.sync_user(user_id, token)
+            await self._sleep(spacing)
+        self.passes += 1
+        self.last_pass_seconds = time.monotonic() - started
+        logger.info(
+            "Role sync pass refreshed %d users in %.1fs",
+            len(users),
+            self.last_pass_seconds,
+        )
+        return len(users)
+
+    async def run_forever(self) -> None:
+        """Run passes until cancelled."""
+        while True:
+            if not await self.run_once():
+                await self._sleep(self.interval)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "passes": self.passes,
+            "synced": self.synced,
+            "failed": self.failed,
+            "last_pass_seconds": round(self.last_pass_seconds, 3),
+        }
+
+
+def main() -> None:  # pragma: no cover - long-running entry point
+    """Run the role-sync worker."""
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    if os.getenv("INIT_DB_ON_STARTUP"):
+        auth_service.init_db()
+    asyncio.run(RoleSyncWorker().run_forever())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
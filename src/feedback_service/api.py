@@ -1,17 +1,43 @@
 from __future__ import annotations
 
+import json
+import logging
 import os
-from typing import Any
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Optional
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import Column, Integer, String, func
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Index,
+    Insert,
+    Integer,
+    Select,
+    String,
+    delete,
+    func,
+    insert,
+    select,
+)
 from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from utils.cors import get_cors_origins
+from utils.db_pool import dialect_insert
 from devonboarder import auth_service
 
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC so SQLite and PostgreSQL agree.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class Feedback(auth_service.Base):
     __tablename__ = "feedback"
@@ -20,8 +46,222 @@ class Feedback(auth_service.Base):
     type = Column(String, nullable=False)
     status = Column(String, default="open", nullable=False)
     description = Column(String, nullable=False)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
+
+    __table_args__ = (Index("ix_feedback_type_status", "type", "status"),)
+
+
+class FeedbackCount(auth_service.Base):
+    """Number of feedback items per ``(type, status)`` bucket.
+
+    Updated in the same transaction as the items, so analytics reads the
+    buckets instead of grouping the feedback table.
+    """
+
+    __tablename__ = "feedback_counts"
+
+    type = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+def feedback_count_upsert(
+    bind: Engine | Connection, type_: str, status: str, delta: int
+) -> Insert:
+    """Return a statement adding ``delta`` to one ``feedback_counts`` bucket."""
+    return (
+        dialect_insert(bind)(FeedbackCount)
+        .values(type=type_, status=status, count=delta)
+        .on_conflict_do_update(
+            index_elements=[FeedbackCount.type, FeedbackCount.status],
+            set_={"count": FeedbackCount.count + delta},
+        )
+    )
+
+
+class _RollupColumns:
+    bucket = Column(DateTime, primary_key=True)
+    type = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    # Items that moved into / out of ``status`` during the bucket.
+    entered = Column(Integer, nullable=False, default=0)
+    exited = Column(Integer, nullable=False, default=0)
+
+
+class FeedbackRollupHourly(_RollupColumns, auth_service.Base):
+    """Status transitions per hour, type and status."""
+
+    __tablename__ = "feedback_rollup_hourly"
+
+
+class FeedbackRollupDaily(_RollupColumns, auth_service.Base):
+    """Status transitions per UTC day, type and status."""
+
+    __tablename__ = "feedback_rollup_daily"
+
+
+ROLLUPS: dict[str, type[_RollupColumns]] = {
+    "hour": FeedbackRollupHourly,
+    "day": FeedbackRollupDaily,
+}
+INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def bucket_start(moment: datetime, interval: str) -> datetime:
+    """Return the start of the ``interval`` bucket containing ``moment``."""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if interval == "day" else moment
+
+
+def feedback_rollup_upsert(
+    bind: Engine | Connection,
+    model: type[_RollupColumns],
+    bucket: datetime,
+    type_: str,
+    status: str,
+    *,
+    entered: int = 0,
+    exited: int = 0,
+) -> Insert:
+    """Return a statement adding transitions to one rollup bucket."""
+    return (
+        dialect_insert(bind)(model)
+        .values(
+            bucket=bucket, type=type_, status=status, entered=entered, exited=exited
+        )
+        .on_conflict_do_update(
+            index_elements=[model.bucket, model.type, model.status],
+            set_={
+                "entered": model.entered + entered,
+                "exited": model.exited + exited,
+            },
+        )
+    )
+
+
+def _record_move(
+    db: Session,
+    type_: str,
+    old_status: Optional[str],
+    new_status: str,
+    at: datetime,
+) -> None:
+    """Update counters and rollups for an item entering ``new_status``."""
+    bind = db.get_bind()
+    moves = [(new_status, 1, 0)]
+    if old_status is not None:
+        moves.append((old_status, 0, 1))
+    for status, entered, exited in moves:
+        db.execute(feedback_count_upsert(bind, type_, status, entered - exited))
+        for interval, model in ROLLUPS.items():
+            db.execute(
+                feedback_rollup_upsert(
+                    bind,
+                    model,
+                    bucket_start(at, interval),
+                    type_,
+                    status,
+                    entered=entered,
+                    exited=exited,
+                )
+            )
+
+
+def reconcile_feedback_counts(db: Session) -> int:
+    """Rebuild ``feedback_counts`` from the feedback table.
+
+    Returns the number of buckets that had drifted; drift is also logged.
+    """
+    actual = {
+        (type_, status): count
+        for type_, status, count in db.execute(
+            select(Feedback.type, Feedback.status, func.count(Feedback.id)).group_by(
+                Feedback.type, Feedback.status
+            )
+        ).all()
+    }
+    stored = {
+        (row.type, row.status): row.count
+        for row in db.execute(select(FeedbackCount)).scalars()
+    }
+    drifted = 0
+    for key in actual.keys() | stored.keys():
+        if actual.get(key, 0) == stored.get(key, 0):
+            continue
+        drifted += 1
+        logger.warning(
+            "feedback_counts drift for %s/%s: stored %s, actual %s",
+            *key,
+            stored.get(key, 0),
+            actual.get(key, 0),
+        )
+        if key in actual:
+            db.merge(FeedbackCount(type=key[0], status=key[1], count=actual[key]))
+        else:
+            db.execute(
+                delete(FeedbackCount).where(
+                    FeedbackCount.type == key[0], FeedbackCount.status == key[1]
+                )
+            )
+    db.commit()
+    return drifted
 
 
+def rebuild_feedback_rollups(db: Session, batch_size: int = 10_000) -> int:
+    """Recreate the hourly and daily rollups from feedback timestamps.
+
+    Raw rows only record creation and the latest change, so each item counts
+    as entering ``open`` at ``created_at`` and, if it is no longer open,
+    moving to its current status at ``updated_at``. Intermediate moves made
+    through the API are lost. Returns the number of items scanned.
+    """
+    buckets: dict[str, dict[tuple, list[int]]] = {interval: {} for interval in ROLLUPS}
+    scanned = 0
+    rows = db.execute(
+        select(Feedback.type, Feedback.status, Feedback.created_at, Feedback.updated_at)
+    ).yield_per(batch_size)
+    for type_, status, created_at, updated_at in rows:
+        scanned += 1
+        created_at = created_at or updated_at or _utcnow()
+        moves = [(created_at, "open", 1, 0)]
+        if status != "open":
+            moved_at = updated_at or created_at
+            moves += [(moved_at, "open", 0, 1), (moved_at, status, 1, 0)]
+        for interval, totals in buckets.items():
+            for moment, bucket_status, entered, exited in moves:
+                key = (bucket_start(moment, interval), type_, bucket_status)
+                counts = totals.setdefault(key, [0, 0])
+                counts[0] += entered
+                counts[1] += exited
+
+    for interval, model in ROLLUPS.items():
+        totals = buckets[interval]
+        db.execute(delete(model))
+        if totals:
+            db.execute(
+                insert(model),
+                [
+                    {
+                        "bucket": bucket,
+                        "type": type_,
+                        "status": status,
+                        "entered": entered,
+                        "exited": exited,
+                    }
+                    for (bucket, type_, status), (entered, exited) in totals.items()
+                ],
+            )
+    db.commit()
+    return scanned
+
+
+FEEDBACK_FIELDS = ("id", "type", "status", "description", "created_at", "updated_at")
+# Page size when a ``cursor`` is given without a ``limit``.
+DEFAULT_PAGE_SIZE = 100
+# Rows fetched per query when streaming an NDJSON export.
+EXPORT_BATCH_SIZE = 1000
+
 router = APIRouter()
 
 
@@ -30,12 +270,16 @@ def submit_feedback(
     data: dict[str, Any],
     db: Session = Depends(auth_service.get_db),
 ) -> dict[str, Any]:
+    now = _utcnow()
     item = Feedback(
         type=data["type"],
         description=data["description"],
         status="open",
+        created_at=now,
+        updated_at=now,
     )
     db.add(item)
+    _record_move(db, item.type, None, item.status, now)
     db.commit()
     db.refresh(item)
     return {"id": item.id, "status": item.status}
@@ -47,48 +291,217 @@ def update_status(
     data: dict[str, Any],
     db: Session = Depends(auth_service.get_db),
 ) -> dict[str, Any]:
-    item = db.get(Feedback, item_id)
+    # Lock the row so concurrent moves cannot both decrement the old bucket.
+    item = db.get(Feedback, item_id, with_for_update=True)
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    item.status = data.get("status", item.status)
+    status = data.get("status", item.status)
+    if status != item.status:
+        now = _utcnow()
+        _record_move(db, item.type, item.status, status, now)
+        item.status = status
+        item.updated_at = now
     db.commit()
     return {"updated": item.id, "status": item.status}
 
 
-@router.get("/feedback")
-def list_feedback(db: Session = Depends(auth_service.get_db)) -> dict[str, Any]:
-    items = db.query(Feedback).all()
+def _parse_fields(fields: Optional[str]) -> list[str]:
+    if not fields:
+        return list(FEEDBACK_FIELDS)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FEEDBACK_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown feedback fields: {', '.join(unknown)}"
+        )
+    return names
+
+
+def _page_query(
+    names: list[str],
+    type_: Optional[str],
+    status: Optional[str],
+    after: Optional[int],
+    limit: Optional[int],
+) -> Select:
+    """Return the keyset query for ``limit`` rows (or all) with ``id > after``."""
+    # ``id`` always comes first so the caller can continue from the last row.
+    columns = [Feedback.id] + [getattr(Feedback, name) for name in names]
+    query = select(*columns).order_by(Feedback.id)
+    if limit is not None:
+        query = query.limit(limit)
+    if type_ is not None:
+        query = query.where(Feedback.type == type_)
+    if status is not None:
+        query = query.where(Feedback.status == status)
+    if after is not None:
+        query = query.where(Feedback.id > after)
+    return query
+
+
+def _isoformat(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _export_lines(
+    db: Session,
+    names: list[str],
+    type_: Optional[str],
+    status: Optional[str],
+    after: Optional[int],
+) -> Iterator[str]:
+    while True:
+        rows = db.execute(
+            _page_query(names, type_, status, after, EXPORT_BATCH_SIZE)
+        ).all()
+        if rows:
+            # One chunk per batch; StreamingResponse pays a thread hop per chunk.
+            yield "".join(
+                json.dumps(dict(zip(names, row[1:])), default=_isoformat) + "\n"
+                for row in rows
+            )
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        after = rows[-1][0]
+
+
+@router.get("/feedback", response_model=None)
+def list_feedback(
+    type_: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = None,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = None,
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    db: Session = Depends(auth_service.get_read_db),
+) -> dict[str, Any] | StreamingResponse:
+    """List feedback ordered by ID.
+
+    Without ``limit`` or ``cursor`` every matching item is returned, as before
+    pagination existed. Pagination is opt-in: pass ``limit`` (and then
+    ``next_cursor`` from a response as ``cursor``) to fetch one page at a
+    time; ``next_cursor`` is ``null`` on the last page and ``limit`` defaults
+    to 100 once a ``cursor`` is given. ``fields`` is a comma-separated subset
+    of the item fields. ``format=ndjson`` streams every matching item after
+    ``cursor`` as one JSON object per line, ignoring ``limit``.
+    """
+    names = _parse_fields(fields)
+    if output == "ndjson":
+        return StreamingResponse(
+            _export_lines(db, names, type_, status, cursor),
+            media_type="application/x-ndjson",
+        )
+    if limit is None and cursor is not None:
+        limit = DEFAULT_PAGE_SIZE
+    rows = db.execute(_page_query(names, type_, status, cursor, limit)).all()
+    next_cursor = rows[-1][0] if limit is not None and len(rows) == limit else None
     return {
-        "feedback": [
-            {
-                "id": f.id,
-                "type": f.type,
-                "status": f.status,
-                "description": f.description,
-            }
-            for f in items
-        ]
+        "feedback": [dict(zip(names, row[1:])) for row in rows],
+        "next_cursor": next_cursor,
     }
 
 
 @router.get("/feedback/analytics")
-def analytics(db: Session = Depends(auth_service.get_db)) -> dict[str, Any]:
-    rows = (
-        db.query(Feedback.type, Feedback.status, func.count(Feedback.id))
-        .group_by(Feedback.type, Feedback.status)
-        .all()
-    )
+def analytics(db: Session = Depends(auth_service.get_read_db)) -> dict[str, Any]:
+    rows = db.execute(
+        select(FeedbackCount.type, FeedbackCount.status, FeedbackCount.count).where(
+            FeedbackCount.count > 0
+        )
+    ).all()
     summary: dict[str, dict[str, int]] = {}
+    total = 0
     for type_, status, count in rows:
         summary.setdefault(type_, {})[status] = count
-    total = db.query(func.count(Feedback.id)).scalar() or 0
+        total += count
     return {"total": total, "breakdown": summary}
 
 
+@router.get("/feedback/analytics/timeseries")
+def analytics_timeseries(
+    interval: str = Query("day", pattern="^(hour|day)$"),
+    periods: int = Query(90, ge=1, le=2000),
+    end: Optional[datetime] = None,
+    type_: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = None,
+    metric: str = Query("count", pattern="^(count|entered|exited)$"),
+    db: Session = Depends(auth_service.get_read_db),
+) -> dict[str, Any]:
+    """Return one value per bucket for the ``periods`` buckets ending at ``end``.
+
+    ``count`` is the number of matching items at the end of each bucket (for
+    example open bugs per day); ``entered`` and ``exited`` count the items
+    that moved into or out of the matching statuses during the bucket. Values
+    come from the rollup tables and the current counters, never raw rows.
+    """
+    model = ROLLUPS[interval]
+    step = INTERVALS[interval]
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    last = bucket_start(end or _utcnow(), interval)
+    first = last - step * (periods - 1)
+
+    filters = []
+    count_filters = []
+    if type_ is not None:
+        filters.append(model.type == type_)
+        count_filters.append(FeedbackCount.type == type_)
+    if status is not None:
+        filters.append(model.status == status)
+        count_filters.append(FeedbackCount.status == status)
+    # For ``count`` the buckets after ``end`` are needed to walk back from now.
+    upper = [] if metric == "count" else [model.bucket <= last]
+    rows = db.execute(
+        select(model.bucket, func.sum(model.entered), func.sum(model.exited))
+        .where(model.bucket >= first, *upper, *filters)
+        .group_by(model.bucket)
+    ).all()
+    changes = {bucket: (entered, exited) for bucket, entered, exited in rows}
+    buckets = [first + step * i for i in range(periods)]
+
+    if metric == "count":
+        current = db.scalar(
+            select(func.coalesce(func.sum(FeedbackCount.count), 0)).where(
+                *count_filters
+            )
+        )
+        # The count at the end of a bucket is the current count minus the net
+        # change of every later bucket.
+        running = current - sum(
+            entered - exited
+            for bucket, (entered, exited) in changes.items()
+            if bucket > last
+        )
+        values = []
+        for bucket in reversed(buckets):
+            values.append(running)
+            entered, exited = changes.get(bucket, (0, 0))
+            running -= entered - exited
+        values.reverse()
+    else:
+        column = 0 if metric == "entered" else 1
+        values = [changes.get(bucket, (0, 0))[column] for bucket in buckets]
+
+    return {
+        "interval": interval,
+        "metric": metric,
+        "type": type_,
+        "status": status,
+        "points": [
+            {"start": bucket.isoformat(), "value": value}
+            for bucket, value in zip(buckets, values)
+        ],
+    }
+
+
 def create_app() -> FastAPI:
     if os.getenv("INIT_DB_ON_STARTUP"):
         auth_service.init_db()
         auth_service.Base.metadata.create_all(bind=auth_service.engine)
+        # Backfills the counters for tables created before they existed.
+        with auth_service.SessionLocal() as db:
+            reconcile_feedback_counts(db)
 
     app = FastAPI()
     cors_origins = get_cors_origins()
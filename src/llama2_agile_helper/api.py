@@ -2,67 +2,384 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import os
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional, Union
 
 import httpx
-from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from utils.cache import TTLCache
 from utils.cors import get_cors_origins
 
+from .cache import ResponseCache
+from .client import (
+    LlamaBusyError,
+    LlamaClient,
+    LlamaResponseError,
+    LlamaTimeoutError,
+)
+from .grooming import RateLimiter, groom
+from .prompts import PromptError, PromptRegistry, PromptTemplate
+from .summarize import Progress, condense
+
 API_KEY = os.getenv("LLAMA2_API_KEY", "")
+# Deadline per request in seconds, including time queued for a free slot.
 API_TIMEOUT = int(os.getenv("LLAMA2_API_TIMEOUT", "10"))
 BASE_URL = os.getenv("LLAMA2_URL", "https://api.llama2.ai/generate")
+MAX_CONCURRENCY = int(os.getenv("LLAMA2_MAX_CONCURRENCY", "4"))
 PROMPT_DIR = Path(__file__).resolve().parents[2] / "prompts"
+# Seconds between checks for edited prompt files.
+PROMPT_POLL_INTERVAL = float(os.getenv("LLAMA2_PROMPT_POLL_INTERVAL", "2"))
+# Generated responses are reused for identical prompt text and input.
+CACHE_TTL = float(os.getenv("LLAMA2_CACHE_TTL", "3600"))
+CACHE_MAXSIZE = int(os.getenv("LLAMA2_CACHE_MAXSIZE", "256"))
+CACHE_DIR = os.getenv("LLAMA2_CACHE_DIR", "")
+# Notes over this many estimated tokens are summarized in chunks first.
+CHUNK_TOKENS = int(os.getenv("LLAMA2_CHUNK_TOKENS", "2000"))
+CHUNK_CONCURRENCY = int(os.getenv("LLAMA2_CHUNK_CONCURRENCY", "2"))
+# Batch grooming: tickets per shard, shards in flight and shards per second.
+GROOM_SHARD_SIZE = int(os.getenv("LLAMA2_GROOM_SHARD_SIZE", "25"))
+GROOM_CONCURRENCY = int(os.getenv("LLAMA2_GROOM_CONCURRENCY", "4"))
+GROOM_RATE = float(os.getenv("LLAMA2_GROOM_RATE", "2"))
+TICKET_CACHE_MAXSIZE = int(os.getenv("LLAMA2_TICKET_CACHE_MAXSIZE", "4096"))
+
+logger = logging.getLogger(__name__)
+
+llm_client = LlamaClient(
+    BASE_URL,
+    api_key=API_KEY,
+    timeout=API_TIMEOUT,
+    max_concurrency=MAX_CONCURRENCY,
+)
+response_cache = ResponseCache(
+    maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, directory=CACHE_DIR or None
+)
+
+prompt_registry = PromptRegistry(PROMPT_DIR, poll_interval=PROMPT_POLL_INTERVAL)
+ticket_cache = TTLCache(maxsize=TICKET_CACHE_MAXSIZE, ttl=CACHE_TTL)
+groom_limiter = RateLimiter(GROOM_RATE, burst=GROOM_CONCURRENCY)
 
 router = APIRouter()
 
 
-def _load_prompt(name: str) -> str:
-    return (PROMPT_DIR / name).read_text()
+def _api_error(exc: Exception) -> HTTPException:
+    if isinstance(exc, LlamaBusyError):
+        return HTTPException(status_code=503, detail="Llama2 API busy")
+    if isinstance(exc, LlamaTimeoutError):
+        return HTTPException(status_code=504, detail="Llama2 API timeout")
+    return HTTPException(status_code=502, detail="Llama2 API error")
+
+
+_LLAMA_ERRORS = (
+    LlamaBusyError,
+    LlamaTimeoutError,
+    LlamaResponseError,
+    httpx.HTTPError,
+)
 
 
-def _call_llama2(prompt: str) -> str:
+def _template(name: str) -> PromptTemplate:
+    try:
+        return prompt_registry.get(name)
+    except PromptError as exc:
+        logger.error("Prompt template unavailable: %s", exc)
+        raise HTTPException(status_code=500, detail="Prompt template unavailable")
+
+
+def _require_key() -> None:
     if not API_KEY:
         raise HTTPException(status_code=503, detail="LLAMA2_API_KEY not set")
+
+
+async def _call_llama2(prompt: str) -> str:
+    _require_key()
+    try:
+        return await llm_client.generate(prompt)
+    except _LLAMA_ERRORS as exc:
+        raise _api_error(exc) from exc
+
+
+async def _stream_llama2(
+    prompt: str, on_complete: Optional[Callable[[str], None]] = None
+) -> StreamingResponse:
+    """Stream generated text, failing with a status code before the first token.
+
+    ``on_complete`` receives the full text once the stream finishes normally.
+    """
+    _require_key()
+    tokens = llm_client.stream(prompt)
+    try:
+        # Wait for a slot and the first token so queueing and API errors
+        # still map to an HTTP status instead of a truncated 200.
+        first = await anext(tokens, "")
+    except _LLAMA_ERRORS as exc:
+        await tokens.aclose()
+        raise _api_error(exc) from exc
+
+    async def body() -> AsyncIterator[str]:
+        parts = [first]
+        try:
+            yield first
+            async for token in tokens:
+                parts.append(token)
+                yield token
+            if on_complete is not None:
+                on_complete("".join(parts))
+        except _LLAMA_ERRORS:
+            # Headers are already sent; end the response early.
+            logger.warning("Llama2 stream ended early", exc_info=True)
+        finally:
+            await tokens.aclose()
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
+
+
+async def _build_prompt(
+    template: str,
+    user_input: str,
+    *,
+    chunked: bool,
+    on_progress: Optional[Progress] = None,
+) -> str:
+    """Return the generation prompt, condensing long input when ``chunked``."""
+    if not chunked:
+        return template + "\n" + user_input
+    _require_key()
     try:
-        resp = httpx.post(
-            BASE_URL,
-            json={"prompt": prompt},
-            headers={"Authorization": f"Bearer {API_KEY}"},
-            timeout=API_TIMEOUT,
+        return await condense(
+            llm_client.generate,
+            template,
+            user_input,
+            max_tokens=CHUNK_TOKENS,
+            concurrency=CHUNK_CONCURRENCY,
+            on_progress=on_progress,
+        )
+    except _LLAMA_ERRORS as exc:
+        raise _api_error(exc) from exc
+
+
+def _ndjson(event: dict[str, object]) -> str:
+    return json.dumps(event) + "\n"
+
+
+def _progress_stream(
+    template: str,
+    user_input: str,
+    *,
+    cached: Optional[str],
+    on_complete: Optional[Callable[[str], None]],
+    headers: dict[str, str],
+) -> StreamingResponse:
+    """Stream progress events, then the generated text, as NDJSON.
+
+    Each line is a progress event (``{"stage": ...}``), a piece of text
+    (``{"text": ...}``), ``{"error": ...}`` if generation fails after the
+    response started, or the final ``{"done": true}``.
+    """
+    if cached is None:
+        _require_key()
+
+    async def body() -> AsyncIterator[str]:
+        if cached is not None:
+            yield _ndjson({"text": cached})
+            yield _ndjson({"done": True})
+            return
+        events: asyncio.Queue[Optional[dict[str, object]]] = asyncio.Queue()
+
+        async def prepare() -> str:
+            try:
+                return await _build_prompt(
+                    template, user_input, chunked=True, on_progress=events.put_nowait
+                )
+            finally:
+                events.put_nowait(None)
+
+        task = asyncio.ensure_future(prepare())
+        parts: list[str] = []
+        try:
+            while (event := await events.get()) is not None:
+                yield _ndjson(event)
+            prompt = await task
+            async for token in llm_client.stream(prompt):
+                parts.append(token)
+                yield _ndjson({"text": token})
+        except HTTPException as exc:
+            yield _ndjson({"error": exc.detail})
+            return
+        except _LLAMA_ERRORS as exc:
+            logger.warning("Llama2 stream ended early", exc_info=True)
+            yield _ndjson({"error": _api_error(exc).detail})
+            return
+        finally:
+            task.cancel()
+        if on_complete is not None:
+            on_complete("".join(parts))
+        yield _ndjson({"done": True})
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers=headers)
+
+
+async def _generate(
+    template_name: str,
+    user_input: str,
+    field: str,
+    response: Response,
+    *,
+    stream: bool,
+    cache_control: Optional[str],
+    chunked: bool = False,
+    progress: bool = False,
+) -> Union[dict[str, str], StreamingResponse]:
+    """Answer from the response cache or generate (and cache) a response.
+
+    ``Cache-Control: no-cache`` skips the lookup and ``no-store`` skips
+    storing the new response. ``X-Cache`` reports ``HIT`` or ``MISS`` and
+    ``X-Prompt-Version`` the version of the template used. ``chunked`` input
+    over the token budget is condensed first; ``progress`` streams NDJSON
+    progress events ahead of the text.
+    """
+    template = _template(template_name)
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    key = response_cache.key(template_name, template.version, user_input)
+    cached = None if "no-cache" in directives else response_cache.get(key)
+    headers = {
+        "X-Cache": "MISS" if cached is None else "HIT",
+        "X-Prompt-Version": template.version,
+    }
+    store = None if "no-store" in directives else partial(response_cache.set, key)
+    if progress:
+        return _progress_stream(
+            template.text,
+            user_input,
+            cached=cached,
+            on_complete=store,
+            headers=headers,
         )
-    except httpx.TimeoutException as exc:  # pragma: no cover - network issue
-        raise HTTPException(status_code=504, detail="Llama2 API timeout") from exc
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get("text", "")
+    if cached is not None:
+        if stream:
+            return StreamingResponse(
+                iter([cached]), media_type="text/plain; charset=utf-8", headers=headers
+            )
+        response.headers.update(headers)
+        return {field: cached}
+
+    prompt = await _build_prompt(template.text, user_input, chunked=chunked)
+    if stream:
+        streamed = await _stream_llama2(prompt, on_complete=store)
+        streamed.headers.update(headers)
+        return streamed
+    text = await _call_llama2(prompt)
+    if store is not None:
+        store(text)
+    response.headers.update(headers)
+    return {field: text}
+
 
+@router.post("/sprint-summary", response_model=None)
+async def sprint_summary(
+    data: dict[str, str],
+    response: Response,
+    stream: bool = False,
+    progress: bool = False,
+    cache_control: Optional[str] = Header(None),
+) -> Union[dict[str, str], StreamingResponse]:
+    """Return a sprint summary generated from raw notes.
+
+    Notes over ``LLAMA2_CHUNK_TOKENS`` are summarized section by section and
+    the partial summaries combined. With ``stream=true`` the summary is
+    streamed as plain text while it is generated; ``progress=true`` streams
+    NDJSON chunk progress events followed by the summary text.
+    """
+    return await _generate(
+        "retro_analysis.prompt",
+        data["notes"],
+        "summary",
+        response,
+        stream=stream,
+        cache_control=cache_control,
+        chunked=True,
+        progress=progress,
+    )
 
-@router.post("/sprint-summary")
-def sprint_summary(data: dict[str, str]) -> dict[str, str]:
-    """Return a sprint summary generated from raw notes."""
-    notes = data["notes"]
-    prompt = _load_prompt("retro_analysis.prompt") + "\n" + notes
-    summary = _call_llama2(prompt)
-    return {"summary": summary}
 
+@router.post("/groom-backlog", response_model=None)
+async def groom_backlog(
+    data: dict[str, list[str]],
+    response: Response,
+    stream: bool = False,
+    cache_control: Optional[str] = Header(None),
+) -> Union[dict[str, str], StreamingResponse]:
+    """Return backlog grooming suggestions for the given tickets.
 
-@router.post("/groom-backlog")
-def groom_backlog(data: dict[str, list[str]]) -> dict[str, str]:
-    """Return backlog grooming suggestions for the given tickets."""
+    With ``stream=true`` the suggestions are streamed as plain text while
+    they are generated.
+    """
     tickets = "\n".join(f"- {t}" for t in data["tickets"])
-    prompt = _load_prompt("ticket_classifier.prompt") + "\n" + tickets
-    suggestions = _call_llama2(prompt)
-    return {"suggestions": suggestions}
+    return await _generate(
+        "ticket_classifier.prompt",
+        tickets,
+        "suggestions",
+        response,
+        stream=stream,
+        cache_control=cache_control,
+    )
+
+
+def _shard_error(exc: Exception) -> str:
+    if isinstance(exc, _LLAMA_ERRORS):
+        return str(_api_error(exc).detail)
+    logger.exception("Backlog shard failed", exc_info=exc)
+    return "Classification failed"
+
+
+@router.post("/groom-backlog/batch")
+async def groom_backlog_batch(
+    data: dict[str, list[str]], response: Response
+) -> dict[str, Any]:
+    """Classify each ticket's priority and labels in concurrent shards.
+
+    Repeated tickets are classified once and earlier classifications are
+    reused from a cache. A failed shard only marks its own tickets with an
+    ``error``; ``shards`` reports each shard's queue wait and latency.
+    """
+    _require_key()
+    template = _template("ticket_classifier.prompt")
+    response.headers["X-Prompt-Version"] = template.version
+    return await groom(
+        llm_client.generate,
+        template.text,
+        data["tickets"],
+        cache=ticket_cache,
+        cache_scope=template.version,
+        limiter=groom_limiter,
+        max_tokens=CHUNK_TOKENS,
+        shard_size=GROOM_SHARD_SIZE,
+        concurrency=GROOM_CONCURRENCY,
+        describe=_shard_error,
+    )
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    await llm_client.aclose()
 
 
 def create_app() -> FastAPI:
     """Instantiate and configure the FastAPI application."""
 
-    app = FastAPI()
+    # Invalid templates fail here rather than on the first request.
+    prompt_registry.load()
+    app = FastAPI(lifespan=_lifespan)
     cors_origins = get_cors_origins()
 
     class _SecurityHeadersMiddleware(BaseHTTPMiddleware):
@@ -86,6 +403,15 @@ def create_app() -> FastAPI:
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/metrics")
+    def metrics() -> dict[str, dict[str, object]]:
+        return {
+            "llama2_client": llm_client.stats(),
+            "response_cache": response_cache.stats(),
+            "prompts": prompt_registry.stats(),
+            "ticket_cache": ticket_cache.stats(),
+        }
+
     app.include_router(router)
     return app
 
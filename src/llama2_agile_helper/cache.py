@@ -0,0 +1,143 @@
+"""Content-addressed cache for generated Llama2 responses.
+
+Entries are keyed on the prompt template's version (a hash of its text)
+plus the request input, so editing a prompt file can never serve a response
+generated from the old wording. When a template's version changes, entries
+made with the old version are dropped as well.
+
+Responses live in an in-memory :class:`~utils.cache.TTLCache` and, when a
+directory is configured, in ``<directory>/<template>/<key>.json`` files that
+survive restarts and are shared between workers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """TTL/LRU cache of generated text with an optional on-disk store.
+
+    Parameters
+    ----------
+    maxsize:
+        Entries kept in memory before the least recently used is evicted.
+    ttl:
+        Lifetime of an entry in seconds; ``0`` disables caching.
+    directory:
+        Optional directory for the on-disk store.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: float = 3600.0,
+        directory: Optional[str | Path] = None,
+    ) -> None:
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.directory = Path(directory) if directory else None
+        self._templates: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.enabled
+
+    def key(self, template_name: str, version: str, user_input: str) -> tuple:
+        """Return the cache key for ``user_input`` rendered with a template.
+
+        Seeing a new ``version`` of ``template_name`` invalidates its old
+        entries.
+        """
+        with self._lock:
+            previous = self._templates.get(template_name)
+            self._templates[template_name] = version
+        if previous is not None and previous != version:
+            self.invalidate_template(template_name)
+        digest = hashlib.sha256(f"{version}\0{user_input}".encode("utf-8")).hexdigest()
+        return (template_name, digest)
+
+    def _path(self, key: tuple) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        template_name, digest = key
+        return self.directory / template_name / f"{digest}.json"
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Return the cached text for ``key``, checking memory then disk."""
+        if not self.enabled:
+            return None
+        text = self.memory.get(key)
+        if text is not None:
+            return text
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        remaining = entry["expires_at"] - time.time()
+        if remaining <= 0:
+            path.unlink(missing_ok=True)
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, entry["text"], ttl=remaining)
+        return entry["text"]
+
+    def set(self, key: tuple, text: str) -> None:
+        """Store ``text`` under ``key`` in memory and on disk."""
+        if not self.enabled:
+            return
+        self.memory.set(key, text)
+        path = self._path(key)
+        if path is None:
+            return
+        entry = {"expires_at": time.time() + self.memory.ttl, "text": text}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so readers never see a partial file.
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as handle:
+                json.dump(entry, handle)
+            os.replace(tmp, path)
+            self.disk_writes += 1
+        except OSError:
+            logger.warning("Could not write response cache %s", path, exc_info=True)
+
+    def invalidate_template(self, template_name: str) -> int:
+        """Drop every entry generated with ``template_name``."""
+        dropped = self.memory.purge(lambda key: key[0] == template_name)
+        if self.directory is not None:
+            shutil.rmtree(self.directory / template_name, ignore_errors=True)
+        self.invalidations += 1
+        return dropped
+
+    def stats(self) -> dict[str, float]:
+        """Return hit-rate and storage counters for the metrics endpoint."""
+        stats = self.memory.stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            # Disk hits are memory misses that still avoided a generation.
+            "hit_rate": (stats["hits"] + self.disk_hits) / lookups if lookups else 0.0,
+            "disk_hits": self.disk_hits,
+            "disk_writes": self.disk_writes,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,211 @@
+"""Async Llama2 API client with a shared connection pool and concurrency cap.
+
+Generations are slow, so at most ``max_concurrency`` requests are sent to the
+API at once; further callers wait in line. Every call has a deadline covering
+both the wait and the generation. A call whose deadline passes while queued
+is dropped with :class:`LlamaBusyError` without reaching the API.
+
+Streaming requests send ``"stream": true`` and expect newline-delimited JSON
+objects, each carrying the next piece of ``text``; an object with
+``"done": true`` ends the stream.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+
+class LlamaBusyError(RuntimeError):
+    """The deadline passed before a generation slot became free."""
+
+
+class LlamaTimeoutError(TimeoutError):
+    """The deadline passed while the API was generating."""
+
+
+class LlamaResponseError(RuntimeError):
+    """The API replied with a body that is not the expected JSON object."""
+
+
+def _parse(body: str) -> dict:
+    try:
+        data = json.loads(body)
+    except ValueError as exc:
+        raise LlamaResponseError("Unreadable Llama2 response") from exc
+    if not isinstance(data, dict):
+        raise LlamaResponseError("Unreadable Llama2 response")
+    return data
+
+
+class LlamaClient:
+    """Async Llama2 client backed by a pooled ``httpx.AsyncClient``.
+
+    Parameters
+    ----------
+    url:
+        Generation endpoint. Point this at a local fake server in tests.
+    api_key:
+        Bearer token sent with each request.
+    timeout:
+        Default deadline in seconds for a call, including time spent queued.
+    max_concurrency:
+        Maximum generations in flight; also the connection pool size.
+    transport:
+        Optional transport override (for example ``httpx.ASGITransport``).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        api_key: str = "",
+        timeout: float = 10.0,
+        max_concurrency: int = 4,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._transport = transport
+        # Connections and semaphores belong to the event loop that created
+        # them, so each loop gets its own client and generation slots.
+        self._pools: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Semaphore]
+        ] = weakref.WeakKeyDictionary()
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _pool(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Return the pooled client and generation slots for the running loop."""
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None or pool[0].is_closed:
+            # Clients of closed loops can no longer be used or closed.
+            for stale in [other for other in self._pools if other.is_closed()]:
+                del self._pools[stale]
+            http = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                transport=self._transport,
+            )
+            # Calls already holding a slot keep counting against the cap.
+            if pool is not None:
+                slots = pool[1]
+            else:
+                slots = asyncio.Semaphore(self.max_concurrency)
+            pool = self._pools[loop] = (http, slots)
+        return pool
+
+    def _remaining(self, deadline: float) -> float:
+        return deadline - asyncio.get_running_loop().time()
+
+    @asynccontextmanager
+    async def _slot(self, deadline: float) -> AsyncIterator[httpx.AsyncClient]:
+        """Wait for a generation slot, giving up when ``deadline`` passes."""
+        client, slots = self._pool()
+        self.queued += 1
+        try:
+            remaining = self._remaining(deadline)
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(slots.acquire(), remaining)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LlamaBusyError("No Llama2 slot free before the deadline") from None
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield client
+        finally:
+            self.in_flight -= 1
+            slots.release()
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        loop = asyncio.get_running_loop()
+        return loop.time() + (self.timeout if timeout is None else timeout)
+
+    async def generate(self, prompt: str, *, timeout: Optional[float] = None) -> str:
+        """Return the generated text for ``prompt``."""
+        deadline = self._deadline(timeout)
+        async with self._slot(deadline) as client:
+            remaining = self._remaining(deadline)
+            try:
+                resp = await asyncio.wait_for(
+                    client.post(self.url, json={"prompt": prompt}, timeout=remaining),
+                    remaining,
+                )
+            except (asyncio.TimeoutError, httpx.TimeoutException) as exc:
+                self.timeouts += 1
+                raise LlamaTimeoutError("Llama2 generation timed out") from exc
+            resp.raise_for_status()
+            text = _parse(resp.text).get("text", "")
+            self.completed += 1
+            return text
+
+    async def stream(
+        self, prompt: str, *, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield pieces of the generated text for ``prompt`` as they arrive."""
+        deadline = self._deadline(timeout)
+        async with self._slot(deadline) as client:
+            request = client.build_request(
+                "POST",
+                self.url,
+                json={"prompt": prompt, "stream": True},
+                timeout=self._remaining(deadline),
+            )
+            try:
+                resp = await client.send(request, stream=True)
+            except httpx.TimeoutException as exc:
+                self.timeouts += 1
+                raise LlamaTimeoutError("Llama2 generation timed out") from exc
+            try:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if self._remaining(deadline) <= 0:
+                        self.timeouts += 1
+                        raise LlamaTimeoutError("Llama2 generation timed out")
+                    if not line.strip():
+                        continue
+                    data = _parse(line)
+                    if data.get("text"):
+                        yield data["text"]
+                    if data.get("done"):
+                        break
+            except httpx.TimeoutException as exc:
+                self.timeouts += 1
+                raise LlamaTimeoutError("Llama2 generation timed out") from exc
+            finally:
+                await resp.aclose()
+            self.completed += 1
+
+    def stats(self) -> dict[str, float]:
+        """Return concurrency and outcome counters for the metrics endpoint."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of the running event loop's client."""
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool[0].aclose()
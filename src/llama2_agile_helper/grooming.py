@@ -0,0 +1,203 @@
+"""Batch backlog grooming with tickets classified in concurrent shards.
+
+Tickets are deduplicated (case and whitespace insensitive), looked up in a
+cache of earlier classifications, and the rest are packed into shards that
+fit a token and ticket budget. Shards are classified concurrently, no faster
+than a :class:`RateLimiter` allows, and each asks the model for a JSON array
+of ``{"ticket", "priority", "labels"}`` objects. A failed shard only fails
+its own tickets; the response reports every shard's latency and error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable
+
+from utils.cache import TTLCache
+
+from .summarize import estimate_tokens
+
+CLASSIFY_INSTRUCTIONS = (
+    "Reply with only a JSON array holding one object per ticket: "
+    '{"ticket": <number>, "priority": "high" | "medium" | "low", '
+    '"labels": [<label>, ...]}.'
+)
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second.
+
+    Up to ``burst`` acquisitions pass immediately after an idle period. A
+    ``rate`` of ``0`` disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.waited = 0.0
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            delay = (1 - self._tokens) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+
+def normalize_ticket(ticket: str) -> str:
+    """Return the deduplication key for ``ticket``."""
+    return " ".join(ticket.split()).casefold()
+
+
+def shard_tickets(
+    tickets: list[str], max_tokens: int, max_size: int
+) -> list[list[int]]:
+    """Group ticket indexes into shards within ``max_tokens`` and ``max_size``."""
+    shards: list[list[int]] = []
+    current: list[int] = []
+    size = 0
+    for index, ticket in enumerate(tickets):
+        cost = estimate_tokens(ticket) + 2  # Numbering and line break.
+        if current and (size + cost > max_tokens or len(current) == max_size):
+            shards.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += cost
+    if current:
+        shards.append(current)
+    return shards
+
+
+def shard_prompt(template: str, tickets: list[str]) -> str:
+    numbered = "\n".join(f"{n}. {ticket}" for n, ticket in enumerate(tickets, 1))
+    return f"{template}\n{CLASSIFY_INSTRUCTIONS}\n\n{numbered}"
+
+
+def parse_classification(text: str, count: int) -> dict[int, dict[str, Any]]:
+    """Return ``{position: {"priority", "labels"}}`` parsed from a shard reply.
+
+    Positions are 0-based. Raises ``ValueError`` if no JSON array is found.
+    """
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if match is None:
+        raise ValueError("reply holds no JSON array")
+    items = json.loads(match.group(0))
+    if not isinstance(items, list):
+        raise ValueError("reply is not a JSON array")
+    parsed: dict[int, dict[str, Any]] = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        number = item.get("ticket", position + 1)
+        if not isinstance(number, int) or not 1 <= number <= count:
+            continue
+        labels = item.get("labels") or []
+        parsed[number - 1] = {
+            "priority": str(item.get("priority", "")),
+            "labels": [str(label) for label in labels]
+            if isinstance(labels, list)
+            else [str(labels)],
+        }
+    return parsed
+
+
+async def groom(
+    generate: Callable[[str], Awaitable[str]],
+    template: str,
+    tickets: list[str],
+    *,
+    cache: TTLCache,
+    cache_scope: str,
+    limiter: RateLimiter,
+    max_tokens: int,
+    shard_size: int,
+    concurrency: int,
+    describe: Callable[[Exception], str] = str,
+) -> dict[str, Any]:
+    """Classify ``tickets`` and return merged results plus shard statistics.
+
+    ``cache_scope`` (for example the template version) is part of every
+    cache key so a changed prompt never reuses old classifications.
+    ``describe`` turns a failed ``generate`` call into the shard's error.
+    """
+    keys = [normalize_ticket(ticket) for ticket in tickets]
+    first_seen: dict[str, str] = {}
+    for key, ticket in zip(keys, tickets):
+        first_seen.setdefault(key, ticket)
+    classified: dict[str, dict[str, Any]] = {}
+    cached: set[str] = set()
+    pending: list[str] = []
+    for key in first_seen:
+        hit = cache.get((cache_scope, key))
+        if hit is not None:
+            classified[key] = hit
+            cached.add(key)
+        else:
+            pending.append(key)
+
+    pending_text = [first_seen[key] for key in pending]
+    shards = shard_tickets(pending_text, max_tokens, shard_size)
+    slots = asyncio.Semaphore(concurrency)
+    errors: dict[str, str] = {}
+
+    async def run(number: int, indexes: list[int]) -> dict[str, Any]:
+        shard_keys = [pending[i] for i in indexes]
+        report: dict[str, Any] = {"shard": number, "tickets": len(indexes)}
+        results: dict[int, dict[str, Any]] = {}
+        queued = time.perf_counter()
+        async with slots:
+            await limiter.acquire()
+            started = time.perf_counter()
+            try:
+                reply = await generate(
+                    shard_prompt(template, [pending_text[i] for i in indexes])
+                )
+            except Exception as exc:
+                # A failed shard is reported without failing the batch.
+                report["error"] = describe(exc)
+            else:
+                try:
+                    results = parse_classification(reply, len(indexes))
+                except ValueError as exc:
+                    report["error"] = f"Unreadable reply: {exc}"
+            report["wait_ms"] = round((started - queued) * 1000, 3)
+            report["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        for position, key in enumerate(shard_keys):
+            if position in results:
+                classified[key] = results[position]
+                cache.set((cache_scope, key), results[position])
+            else:
+                errors[key] = report.get("error", "ticket missing from reply")
+        return report
+
+    reports = await asyncio.gather(
+        *(run(number, indexes) for number, indexes in enumerate(shards))
+    )
+
+    results = []
+    for ticket, key in zip(tickets, keys):
+        if key in classified:
+            results.append(
+                {"ticket": ticket, **classified[key], "cached": key in cached}
+            )
+        else:
+            results.append({"ticket": ticket, "error": errors[key]})
+    return {
+        "results": results,
+        "shards": list(reports),
+        "duplicates": len(keys) - len(set(keys)),
+        "cached": len(cached),
+    }
@@ -0,0 +1,153 @@
+"""Prompt templates loaded once and hot-reloaded when their files change.
+
+:class:`PromptRegistry` reads every ``*.prompt`` file in a directory when it
+is loaded, so requests never touch the disk for a template. Lookups poll the
+directory's modification times at most once per ``poll_interval`` seconds and
+reload only the files that changed. A file that fails validation keeps its
+previously loaded version and is reported in :meth:`PromptRegistry.stats`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MAX_PROMPT_BYTES = 64 * 1024
+
+
+class PromptError(ValueError):
+    """A prompt template file is missing or invalid."""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A validated prompt template and the version derived from its text."""
+
+    name: str
+    text: str
+    version: str
+    mtime_ns: int
+
+
+def validate_prompt(name: str, raw: bytes) -> str:
+    """Return the text of prompt ``name`` or raise :class:`PromptError`."""
+    if len(raw) > MAX_PROMPT_BYTES:
+        raise PromptError(f"{name} is larger than {MAX_PROMPT_BYTES} bytes")
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise PromptError(f"{name} is not valid UTF-8") from exc
+    if "\0" in text:
+        raise PromptError(f"{name} contains NUL bytes")
+    if not text.strip():
+        raise PromptError(f"{name} is empty")
+    return text
+
+
+class PromptRegistry:
+    """In-memory prompt templates for a directory.
+
+    Parameters
+    ----------
+    directory:
+        Directory containing the ``*.prompt`` files.
+    poll_interval:
+        Minimum seconds between checks for changed files; ``0`` checks on
+        every lookup.
+    """
+
+    suffix = ".prompt"
+
+    def __init__(self, directory: str | Path, *, poll_interval: float = 2.0) -> None:
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self._templates: dict[str, PromptTemplate] = {}
+        self._errors: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._checked_at: float | None = None
+        self.reloads = 0
+
+    def _scan(self) -> dict[str, int]:
+        """Return ``{name: mtime_ns}`` for the prompt files in the directory."""
+        try:
+            with os.scandir(self.directory) as entries:
+                return {
+                    entry.name: entry.stat().st_mtime_ns
+                    for entry in entries
+                    if entry.name.endswith(self.suffix) and entry.is_file()
+                }
+        except FileNotFoundError:
+            return {}
+
+    def _read(self, name: str, mtime_ns: int) -> PromptTemplate:
+        text = validate_prompt(name, (self.directory / name).read_bytes())
+        version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        return PromptTemplate(name, text, version, mtime_ns)
+
+    def load(self, *, strict: bool = True) -> None:
+        """Load or refresh every template in the directory.
+
+        With ``strict`` an invalid file raises :class:`PromptError`; otherwise
+        it is logged and its previous version, if any, stays in use.
+        """
+        with self._lock:
+            files = self._scan()
+            templates = {n: t for n, t in self._templates.items() if n in files}
+            errors: dict[str, str] = {}
+            for name, mtime_ns in files.items():
+                current = templates.get(name)
+                if current is not None and current.mtime_ns == mtime_ns:
+                    continue
+                try:
+                    templates[name] = self._read(name, mtime_ns)
+                except (OSError, PromptError) as exc:
+                    if strict:
+                        raise PromptError(str(exc)) from exc
+                    logger.warning("Keeping previous prompt %s: %s", name, exc)
+                    errors[name] = str(exc)
+                    continue
+                if current is not None:
+                    self.reloads += 1
+                    logger.info(
+                        "Reloaded prompt %s (%s)", name, templates[name].version
+                    )
+            self._templates = templates
+            self._errors = errors
+            self._checked_at = time.monotonic()
+
+    def _refresh(self) -> None:
+        checked_at = self._checked_at
+        if (
+            checked_at is not None
+            and time.monotonic() - checked_at < self.poll_interval
+        ):
+            return
+        self.load(strict=False)
+
+    def get(self, name: str) -> PromptTemplate:
+        """Return template ``name``, reloading changed files when due."""
+        self._refresh()
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise PromptError(f"Unknown prompt template {name}") from None
+
+    def versions(self) -> dict[str, str]:
+        """Return ``{name: version}`` for the loaded templates."""
+        return {name: t.version for name, t in sorted(self._templates.items())}
+
+    def stats(self) -> dict[str, object]:
+        """Return template versions and reload counters."""
+        return {
+            "templates": len(self._templates),
+            "reloads": self.reloads,
+            "versions": self.versions(),
+            "errors": dict(self._errors),
+        }
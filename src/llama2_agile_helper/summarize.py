@@ -0,0 +1,169 @@
+"""Map-reduce condensing of notes too long for one Llama2 request.
+
+Notes are split at markdown headings, then paragraphs, then lines, and the
+pieces are packed into chunks that fit a token budget. Each chunk is
+summarized separately (at most ``concurrency`` at a time) and the partial
+summaries are combined into the prompt for the final generation. If the
+partial summaries are themselves over budget they are condensed again.
+
+Token counts are estimated from character counts; the budget only needs to
+keep requests comfortably inside the model's context window.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+from typing import Awaitable, Callable, Optional
+
+CHARS_PER_TOKEN = 4
+MAX_ROUNDS = 3
+
+Generate = Callable[[str], Awaitable[str]]
+Progress = Callable[[dict[str, object]], None]
+
+# Section boundaries from coarsest to finest.
+_SEPARATORS = (
+    re.compile(r"\n(?=#{1,6}\s)"),
+    re.compile(r"\n\s*\n"),
+    re.compile(r"\n"),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Return a rough token count for ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _pieces(text: str, max_tokens: int, level: int = 0) -> list[str]:
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if level == len(_SEPARATORS):
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[i : i + size] for i in range(0, len(text), size)]
+    parts = [part for part in _SEPARATORS[level].split(text) if part.strip()]
+    return [piece for part in parts for piece in _pieces(part, max_tokens, level + 1)]
+
+
+def split_notes(notes: str, max_tokens: int) -> list[str]:
+    """Split ``notes`` into chunks of at most ``max_tokens`` estimated tokens.
+
+    Chunks break at the coarsest boundary that fits: headings first, then
+    blank lines, then line ends, and only then mid-line.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for piece in _pieces(notes.strip(), max_tokens):
+        cost = estimate_tokens(piece)
+        if current and size + cost > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _map_prompt(template: str, chunk: str, index: int, total: int) -> str:
+    return (
+        f"{template}\n\nPart {index} of {total} of the notes. Summarize only "
+        f"this part; the parts are combined afterwards.\n\n{chunk}"
+    )
+
+
+def _reduce_prompt(template: str, partials: list[str]) -> str:
+    parts = "\n\n".join(
+        f"## Part {i}\n{text}" for i, text in enumerate(partials, start=1)
+    )
+    return (
+        f"{template}\n\nThe notes were summarized in consecutive parts. Combine "
+        f"these partial summaries into one summary.\n\n{parts}"
+    )
+
+
+async def _map(
+    generate: Generate,
+    template: str,
+    chunks: list[str],
+    *,
+    concurrency: int,
+    on_progress: Optional[Progress],
+    round_: int,
+) -> list[str]:
+    """Summarize ``chunks`` concurrently, keeping their order."""
+    slots = asyncio.Semaphore(concurrency)
+    completed = 0
+
+    async def summarize(index: int, chunk: str) -> str:
+        nonlocal completed
+        async with slots:
+            text = await generate(_map_prompt(template, chunk, index, len(chunks)))
+        completed += 1
+        if on_progress is not None:
+            on_progress(
+                {
+                    "stage": "map",
+                    "round": round_,
+                    "completed": completed,
+                    "total": len(chunks),
+                }
+            )
+        return text
+
+    tasks = [
+        asyncio.ensure_future(summarize(i, chunk))
+        for i, chunk in enumerate(chunks, start=1)
+    ]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        # One failed chunk fails the summary; stop the rest.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def condense(
+    generate: Generate,
+    template: str,
+    notes: str,
+    *,
+    max_tokens: int,
+    concurrency: int = 2,
+    on_progress: Optional[Progress] = None,
+) -> str:
+    """Return the final prompt for ``notes``, condensing them if needed.
+
+    Notes within ``max_tokens`` produce ``template`` followed by the notes
+    without any generation. Longer notes are summarized chunk by chunk with
+    ``generate`` and the result asks the model to combine the partials.
+    ``on_progress`` receives a ``{"stage": ...}`` event as work completes.
+    """
+    if estimate_tokens(notes) <= max_tokens:
+        return template + "\n" + notes
+    text = notes
+    partials: list[str] = []
+    for round_ in range(1, MAX_ROUNDS + 1):
+        chunks = split_notes(text, max_tokens)
+        if partials and len(chunks) >= len(partials):
+            break  # Summaries are not shrinking; combine what we have.
+        if on_progress is not None:
+            on_progress({"stage": "split", "round": round_, "chunks": len(chunks)})
+        partials = await _map(
+            generate,
+            template,
+            chunks,
+            concurrency=concurrency,
+            on_progress=on_progress,
+            round_=round_,
+        )
+        text = "\n\n".join(partials)
+        if estimate_tokens(text) <= max_tokens:
+            break
+    if on_progress is not None:
+        on_progress({"stage": "reduce", "partials": len(partials)})
+    return _reduce_prompt(template, partials)
@@ -0,0 +1,114 @@
+"""In-memory TTL cache with LRU eviction and hit/miss counters."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded mapping whose entries expire after a time-to-live.
+
+    Parameters
+    ----------
+    maxsize:
+        Maximum number of entries kept before the least recently used entry
+        is evicted.
+    ttl:
+        Default lifetime of an entry in seconds. A value of ``0`` disables the
+        cache entirely; every lookup is a miss and nothing is stored.
+    timer:
+        Monotonic clock used for expiry. Overridable for tests.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        *,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Return ``True`` when the cache stores entries."""
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds (default TTL)."""
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if not self.enabled or lifetime <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._timer() + lifetime, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop ``key`` from the cache and return whether it was present."""
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def purge(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every key for which ``predicate`` is true; return the count."""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, float]:
+        """Return counters suitable for exposing on a metrics endpoint."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,201 @@
+"""Connection pool configuration and checkout metrics for SQLAlchemy engines.
+
+:func:`engine_options` turns ``DB_POOL_*`` settings into ``create_engine``
+keyword arguments, and :func:`configure_sqlite` enables WAL journaling and a
+busy timeout so concurrent writers wait instead of failing with "database is
+locked". Pools created through :func:`engine_options` are wrapped so
+:func:`pool_stats` can report how long requests waited for a connection.
+:func:`dialect_insert` picks the ``INSERT ... ON CONFLICT`` construct used by
+the counter upserts.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    Pool,
+    PoolProxiedConnection,
+    QueuePool,
+    SingletonThreadPool,
+    StaticPool,
+)
+
+
+class PoolMetrics:
+    """Checkout counters shared by a pool and the pools it is recreated as."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def checked_out(self) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+
+def _metered(pool_class: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Return ``pool_class`` with :meth:`Pool.connect` timed into ``metrics``.
+
+    The timing covers waiting for a free slot plus opening a new connection or
+    pinging a pooled one, which is what a request spends before its first query.
+    """
+
+    class Metered(pool_class):
+        def connect(self) -> PoolProxiedConnection:
+            started = time.perf_counter()
+            try:
+                conn = super().connect()
+            except PoolTimeoutError:
+                metrics.record_wait(time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.record_wait(time.perf_counter() - started)
+            return conn
+
+    # ``Pool.recreate()`` (used by ``Engine.dispose()``) instantiates
+    # ``self.__class__``, so the metrics survive a dispose.
+    Metered.__name__ = Metered.__qualname__ = f"Metered{pool_class.__name__}"
+    Metered.metrics = metrics
+    return Metered
+
+
+def dialect_insert(bind: Engine | Connection) -> Callable[..., Any]:
+    """Return the ``insert()`` supporting ``on_conflict_do_update`` for ``bind``.
+
+    Only SQLite and PostgreSQL implement the upsert; any other database is a
+    configuration error.
+    """
+    name = bind.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+        return postgresql_insert
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert
+    raise RuntimeError(
+        f"Unsupported database dialect {name!r}: DATABASE_URL must point at "
+        "SQLite or PostgreSQL"
+    )
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    if not url.startswith("sqlite"):
+        return False
+    return ":memory:" in url or url.rstrip("/").endswith(":")
+
+
+def engine_options(
+    url: str,
+    *,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30.0,
+    pre_ping: bool = False,
+    recycle: int = -1,
+    asynchronous: bool = False,
+) -> dict[str, Any]:
+    """Return ``create_engine`` keyword arguments for a metered pool.
+
+    Pass ``asynchronous=True`` for ``create_async_engine``, which needs the
+    asyncio-aware pool classes.
+    """
+    metrics = PoolMetrics()
+    options: dict[str, Any] = {"pool_pre_ping": pre_ping}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_sqlite_memory(url):
+        # Each thread keeps its own in-memory database connection; async
+        # engines run on one event loop and share a single connection.
+        pool_class: type[Pool] = StaticPool if asynchronous else SingletonThreadPool
+        options["poolclass"] = _metered(pool_class, metrics)
+        return options
+    pool_class = AsyncAdaptedQueuePool if asynchronous else QueuePool
+    options.update(
+        poolclass=_metered(pool_class, metrics),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=recycle,
+    )
+    return options
+
+
+def configure_sqlite(
+    engine: Engine, *, wal: bool = True, busy_timeout_ms: int = 5000
+) -> None:
+    """Apply WAL journaling and ``busy_timeout`` to each new SQLite connection."""
+    if engine.dialect.name != "sqlite":
+        return
+    use_wal = wal and not _is_sqlite_memory(engine.url.render_as_string())
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+            if use_wal:
+                cursor.execute("PRAGMA journal_mode = WAL")
+        finally:
+            cursor.close()
+
+
+def instrument(engine: Engine) -> None:
+    """Track connections in use on ``engine`` for :func:`pool_stats`."""
+    metrics: Optional[PoolMetrics] = getattr(engine.pool, "metrics", None)
+    if metrics is None:
+        return
+    event.listen(engine, "checkout", lambda *args: metrics.checked_out())
+    event.listen(engine, "checkin", lambda *args: metrics.checked_in())
+
+
+def pool_stats(engine: Engine) -> dict[str, float]:
+    """Return pool occupancy and checkout-wait gauges for ``engine``."""
+    pool = engine.pool
+    stats: dict[str, float] = {}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checked_in=pool.checkedin(),
+        )
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    if metrics is not None:
+        with metrics._lock:
+            avg = metrics.wait_total / metrics.checkouts if metrics.checkouts else 0.0
+            stats.update(
+                in_use=metrics.in_use,
+                peak_in_use=metrics.peak_in_use,
+                checkouts=metrics.checkouts,
+                timeouts=metrics.timeouts,
+                wait_avg_ms=round(avg * 1000, 3),
+                wait_max_ms=round(metrics.wait_max * 1000, 3),
+            )
+    return stats
@@ -1,13 +1,340 @@
-"""Discord API helper functions."""
+"""Discord API helper functions.
+
+The module-level ``get_user_roles``/``get_user_profile`` helpers are
+synchronous and share a pooled ``httpx.Client`` (see
+:func:`get_http_client`). Async counterparts (``get_user_roles_async`` and
+``get_user_profile_async``) share a pooled :class:`DiscordClient` so
+keep-alive connections are reused and per-guild member lookups run
+concurrently.
+
+Both paths send requests through a shared :class:`RateLimitScheduler`,
+which tracks Discord's rate-limit buckets and delays calls instead of
+letting them fail with ``429``.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Optional
+
 import httpx
 
 
 BASE_URL = "https://discord.com/api/v10"
 API_TIMEOUT = int(os.getenv("DISCORD_API_TIMEOUT", "10"))
+POOL_MAX_CONNECTIONS = int(os.getenv("DISCORD_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.getenv("DISCORD_POOL_MAX_KEEPALIVE", "20"))
+MAX_RETRIES = int(os.getenv("DISCORD_RATE_LIMIT_RETRIES", "3"))
+MAX_RATE_LIMIT_WAIT = float(os.getenv("DISCORD_RATE_LIMIT_MAX_WAIT", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Last known state of one Discord rate-limit bucket."""
+
+    __slots__ = ("remaining", "reset_at")
+
+    def __init__(self) -> None:
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+
+
+class RateLimitScheduler:
+    """Queue Discord API calls according to the rate-limit headers.
+
+    Discord reports per-route limits through ``X-RateLimit-Bucket``,
+    ``X-RateLimit-Remaining`` and ``X-RateLimit-Reset-After``, and signals a
+    ``429`` with ``Retry-After`` (optionally ``X-RateLimit-Global``). The
+    scheduler remembers which bucket a route maps to, holds callers back while
+    a bucket is exhausted and retries ``429`` responses after the advertised
+    delay.
+
+    Limits are tracked per ``scope`` (the calling token): Discord reuses bucket
+    IDs for every token calling the same route, but counts each token
+    separately. Buckets whose reset time has passed are dropped periodically.
+
+    Parameters
+    ----------
+    max_retries:
+        Number of times a ``429`` response is retried before it is returned to
+        the caller.
+    max_wait:
+        Longest single delay in seconds the scheduler accepts. Requests that
+        would need to wait longer are sent (or returned) immediately.
+    default_retry_after:
+        Delay used when a ``429`` response carries no ``Retry-After``.
+    prune_interval:
+        Seconds between sweeps that drop expired bucket state.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_retries: int = MAX_RETRIES,
+        max_wait: float = MAX_RATE_LIMIT_WAIT,
+        default_retry_after: float = 1.0,
+        prune_interval: float = 60.0,
+        timer: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        async_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.default_retry_after = default_retry_after
+        self.prune_interval = prune_interval
+        self._timer = timer
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self._lock = threading.Lock()
+        # Keys are ``(scope, route)`` and ``(scope, bucket ID or route)``.
+        self._route_buckets: dict[tuple[str, str], str] = {}
+        self._buckets: dict[tuple[str, str], _Bucket] = {}
+        self._global_reset_at: dict[str, float] = {}
+        self._next_prune = 0.0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def _bucket(self, scope: str, route: str) -> _Bucket:
+        key = (scope, self._route_buckets.get((scope, route), route))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets and global limits that have reset (lock held)."""
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.prune_interval
+        for key in [k for k, b in self._buckets.items() if b.reset_at <= now]:
+            del self._buckets[key]
+        live = {scope for scope, _ in self._buckets}
+        for key in [k for k in self._route_buckets if k[0] not in live]:
+            del self._route_buckets[key]
+        for scope in [s for s, at in self._global_reset_at.items() if at <= now]:
+            del self._global_reset_at[scope]
+
+    def _reserve(self, scope: str, route: str) -> float:
+        """Return seconds to wait before ``route`` may be called.
+
+        A return value of ``0`` means a slot in the bucket was claimed.
+        """
+        with self._lock:
+            now = self._timer()
+            self._prune(now)
+            delay = max(self._global_reset_at.get(scope, 0.0) - now, 0.0)
+            bucket = self._bucket(scope, route)
+            if bucket.reset_at <= now:
+                bucket.remaining = None
+            elif bucket.remaining is not None and bucket.remaining <= 0:
+                delay = max(delay, bucket.reset_at - now)
+            if delay > 0 and delay <= self.max_wait:
+                return delay
+            if bucket.remaining is not None:
+                bucket.remaining -= 1
+            return 0.0
+
+    def _record(self, scope: str, route: str, response: Any) -> Optional[float]:
+        """Update bucket state from ``response``; return a retry delay on 429."""
+        headers = getattr(response, "headers", None) or {}
+        now = self._timer()
+        with self._lock:
+            bucket_id = headers.get("X-RateLimit-Bucket")
+            if bucket_id:
+                self._route_buckets[(scope, route)] = bucket_id
+            bucket = self._bucket(scope, route)
+            remaining = headers.get("X-RateLimit-Remaining")
+            reset_after = headers.get("X-RateLimit-Reset-After")
+            if remaining is not None and reset_after is not None:
+                bucket.remaining = int(remaining)
+                bucket.reset_at = now + float(reset_after)
+
+            if response.status_code != 429:
+                return None
+            self.rate_limited += 1
+            retry_after = headers.get("Retry-After")
+            delay = (
+                float(retry_after)
+                if retry_after is not None
+                else self.default_retry_after
+            )
+            if headers.get("X-RateLimit-Global", "").lower() == "true":
+                self._global_reset_at[scope] = now + delay
+            else:
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, now + delay)
+            return delay
+
+    def _enter_queue(self, delay: float) -> None:
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            self.delayed += 1
+            self.total_wait += delay
+            self.max_wait_seen = max(self.max_wait_seen, delay)
+
+    def _leave_queue(self) -> None:
+        with self._lock:
+            self.queue_depth -= 1
+
+    def _should_retry(self, attempt: int, retry_after: Optional[float]) -> bool:
+        if retry_after is None:
+            return False
+        if attempt >= self.max_retries or retry_after > self.max_wait:
+            with self._lock:
+                self.exhausted += 1
+            logger.warning("Discord rate limit not cleared after %d retries", attempt)
+            return False
+        with self._lock:
+            self.retries += 1
+        return True
+
+    def run(self, route: str, send: Callable[[], Any], *, scope: str = "") -> Any:
+        """Call ``send`` for ``route`` once ``scope``'s bucket allows it."""
+        with self._lock:
+            self.requests += 1
+        attempt = 0
+        while True:
+            delay = self._reserve(scope, route)
+            while delay > 0:
+                self._enter_queue(delay)
+                try:
+                    self._sleep(delay)
+                finally:
+                    self._leave_queue()
+                delay = self._reserve(scope, route)
+            response = send()
+            retry_after = self._record(scope, route, response)
+            if not self._should_retry(attempt, retry_after):
+                return response
+            attempt += 1
+
+    async def arun(
+        self, route: str, send: Callable[[], Awaitable[Any]], *, scope: str = ""
+    ) -> Any:
+        """Async variant of :meth:`run`; waiting callers yield the event loop."""
+        with self._lock:
+            self.requests += 1
+        attempt = 0
+        while True:
+            delay = self._reserve(scope, route)
+            while delay > 0:
+                self._enter_queue(delay)
+                try:
+                    await self._async_sleep(delay)
+                finally:
+                    self._leave_queue()
+                delay = self._reserve(scope, route)
+            response = await send()
+            retry_after = self._record(scope, route, response)
+            if not self._should_retry(attempt, retry_after):
+                return response
+            attempt += 1
+
+    def stats(self) -> dict[str, float]:
+        """Return queue depth and wait-time counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "delayed": self.delayed,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "max_wait_seconds": round(self.max_wait_seen, 3),
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+                "buckets": len(self._buckets),
+            }
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Return the process-wide :class:`RateLimitScheduler`."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RateLimitScheduler()
+    return _scheduler
+
+
+def set_scheduler(scheduler: Optional[RateLimitScheduler]) -> None:
+    """Replace the process-wide scheduler (``None`` resets to the default)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def _token_scope(token: str) -> str:
+    """Return the scheduler scope for ``token``.
+
+    OAuth rate limits apply per token, so buckets are tracked per token.
+    """
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+    )
+
+
+_http: Optional[httpx.Client] = None
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide pooled client used by the synchronous helpers."""
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.Client(timeout=API_TIMEOUT, limits=_pool_limits())
+    return _http
+
+
+def set_http_client(client: Optional[httpx.Client]) -> None:
+    """Replace the synchronous client (``None`` resets to the default)."""
+    global _http
+    _http = client
+
+
+def _get(path: str, token: str) -> httpx.Response:
+    """Issue a synchronous, rate-limited GET request for ``path``."""
+    headers = {"Authorization": f"Bearer {token}"}
+    return get_scheduler().run(
+        f"GET {path}",
+        lambda: get_http_client().get(f"{BASE_URL}{path}", headers=headers),
+        scope=_token_scope(token),
+    )
+
+
+def _target_guild_ids() -> set[str]:
+    """Return the guild IDs whose member roles we resolve."""
+    return {
+        os.getenv("DISCORD_DEV_GUILD_ID", "1386935663139749998"),
+        os.getenv("DISCORD_PROD_GUILD_ID", "1065367728992571444"),
+    }
+
+
+def _profile_from_json(data: dict[str, Any]) -> dict[str, str | None]:
+    return {
+        "id": data["id"],
+        "username": data["username"],
+        "avatar": data.get("avatar"),
+    }
 
 
 def get_user_roles(token: str) -> dict[str, list[str]]:
@@ -22,21 +349,21 @@ def get_user_roles(token: str) -> dict[str, list[str]]:
     -------
     dict[str, list[str]]
         Mapping of guild IDs to role ID lists.
-    """
-    headers = {"Authorization": f"Bearer {token}"}
 
+    Raises
+    ------
+    httpx.HTTPStatusError
+        A lookup failed, including a ``429`` the scheduler could not clear.
+    httpx.TimeoutException
+        Discord did not answer in time.
+    """
     # Get user's guilds
-    guilds_resp = httpx.get(
-        f"{BASE_URL}/users/@me/guilds", headers=headers, timeout=API_TIMEOUT
-    )
+    guilds_resp = _get("/users/@me/guilds", token)
     guilds_resp.raise_for_status()
     guilds = guilds_resp.json()
 
     # Filter to only our configured guilds to avoid unnecessary API calls
-    target_guild_ids = {
-        os.getenv("DISCORD_DEV_GUILD_ID", "1386935663139749998"),
-        os.getenv("DISCORD_PROD_GUILD_ID", "1065367728992571444"),
-    }
+    target_guild_ids = _target_guild_ids()
 
     roles: dict[str, list[str]] = {}
     for guild in guilds:
@@ -46,46 +373,158 @@ def get_user_roles(token: str) -> dict[str, list[str]]:
         if guild_id not in target_guild_ids:
             continue
 
+        # A rate limit or timeout raises rather than reporting no roles, so
+        # callers never mistake a failed lookup for a member without roles.
         try:
-            member_resp = httpx.get(
-                f"{BASE_URL}/users/@me/guilds/{guild_id}/member",
-                headers=headers,
-                timeout=API_TIMEOUT,
-            )
+            member_resp = _get(f"/users/@me/guilds/{guild_id}/member", token)
             member_resp.raise_for_status()
-            data = member_resp.json()
-            roles[guild_id] = data.get("roles", [])
         except httpx.HTTPStatusError as e:
-            if e.response.status_code == 429:  # Rate limited
-                # Return empty roles for this guild and continue
-                roles[guild_id] = []
-                continue
-            elif e.response.status_code == 403:  # Not a member of this guild
-                # User is not in this guild, skip it
+            if e.response.status_code == 403:  # Not a member of this guild
                 continue
-            else:
-                # Re-raise other errors
-                raise
-        except httpx.TimeoutException:
-            # Return empty roles for this guild on timeout
-            roles[guild_id] = []
-            continue
+            raise
+        roles[guild_id] = member_resp.json().get("roles", [])
 
     return roles
 
 
 def get_user_profile(token: str) -> dict[str, str | None]:
     """Return the Discord user profile for the given OAuth token."""
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = httpx.get(
-        f"{BASE_URL}/users/@me",
-        headers=headers,
-        timeout=API_TIMEOUT,
-    )
+    resp = _get("/users/@me", token)
     resp.raise_for_status()
-    data = resp.json()
-    return {
-        "id": data["id"],
-        "username": data["username"],
-        "avatar": data.get("avatar"),
-    }
+    return _profile_from_json(resp.json())
+
+
+class DiscordClient:
+    """Async Discord API client backed by a shared, pooled ``httpx.AsyncClient``.
+
+    Parameters
+    ----------
+    base_url:
+        Discord API root. Point this at a local stub in tests.
+    timeout:
+        Per-request timeout in seconds.
+    max_connections, max_keepalive:
+        Connection pool limits passed to :class:`httpx.Limits`.
+    transport:
+        Optional transport override (for example ``httpx.MockTransport``).
+    scheduler:
+        Rate-limit scheduler; defaults to the process-wide one.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        *,
+        timeout: float = API_TIMEOUT,
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        max_keepalive: int = POOL_MAX_KEEPALIVE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self._transport = transport
+        self._scheduler = scheduler
+        # Pooled connections belong to the event loop that opened them, so
+        # each loop gets its own client instead of replacing a shared one.
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        """Return the pooled client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        http = self._clients.get(loop)
+        if http is None or http.is_closed:
+            # Clients of closed loops can no longer be used or closed.
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            http = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._transport,
+            )
+        return http
+
+    async def get(self, path: str, token: str) -> httpx.Response:
+        """Issue an authenticated, rate-limited GET request for ``path``."""
+        headers = {"Authorization": f"Bearer {token}"}
+        scheduler = self._scheduler or get_scheduler()
+        return await scheduler.arun(
+            f"GET {path}",
+            lambda: self._client().get(path, headers=headers),
+            scope=_token_scope(token),
+        )
+
+    async def _get_member_roles(self, guild_id: str, token: str) -> Optional[list]:
+        """Return role IDs for one guild, or ``None`` if the user is not a member."""
+        try:
+            resp = await self.get(f"/users/@me/guilds/{guild_id}/member", token)
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 403:  # Not a member of this guild
+                return None
+            raise
+        return resp.json().get("roles", [])
+
+    async def get_user_roles(self, token: str) -> dict[str, list[str]]:
+        """Async equivalent of :func:`get_user_roles`.
+
+        Member lookups for the configured guilds are issued concurrently.
+        """
+        guilds_resp = await self.get("/users/@me/guilds", token)
+        guilds_resp.raise_for_status()
+        target_guild_ids = _target_guild_ids()
+        guild_ids = [g["id"] for g in guilds_resp.json() if g["id"] in target_guild_ids]
+        results = await asyncio.gather(
+            *(self._get_member_roles(guild_id, token) for guild_id in guild_ids)
+        )
+        return {
+            guild_id: guild_roles
+            for guild_id, guild_roles in zip(guild_ids, results)
+            if guild_roles is not None
+        }
+
+    async def get_user_profile(self, token: str) -> dict[str, str | None]:
+        """Async equivalent of :func:`get_user_profile`."""
+        resp = await self.get("/users/@me", token)
+        resp.raise_for_status()
+        return _profile_from_json(resp.json())
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of the running event loop's client."""
+        http = self._clients.pop(asyncio.get_running_loop(), None)
+        if http is not None:
+            await http.aclose()
+
+
+_client: Optional[DiscordClient] = None
+
+
+def get_client() -> DiscordClient:
+    """Return the process-wide :class:`DiscordClient`."""
+    global _client
+    if _client is None:
+        _client = DiscordClient()
+    return _client
+
+
+def set_client(client: Optional[DiscordClient]) -> None:
+    """Replace the process-wide client (``None`` resets to the default)."""
+    global _client
+    _client = client
+
+
+async def get_user_roles_async(token: str) -> dict[str, list[str]]:
+    """Return guild role IDs for the user using the shared async client."""
+    return await get_client().get_user_roles(token)
+
+
+async def get_user_profile_async(token: str) -> dict[str, str | None]:
+    """Return the Discord profile for the user using the shared async client."""
+    return await get_client().get_user_profile(token)
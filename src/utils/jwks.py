@@ -0,0 +1,301 @@
+"""Asymmetric JWT signing keys, JWKS publishing and local token verification.
+
+The auth service signs tokens with the active key of a :class:`KeySet` and
+publishes every public key at ``/.well-known/jwks.json``. Other services
+validate tokens locally with :class:`TokenVerifier`, which fetches that
+document once and refetches it only when a token names an unknown ``kid``.
+
+Keys are rotated by adding a new private key file to ``JWT_KEYS_DIR``. The
+newest file (by name) signs new tokens unless ``JWT_ACTIVE_KID`` pins another
+one. Older keys stay published, so tokens they signed remain valid until
+they expire; after that the file can be removed.
+
+Requires the ``cryptography`` package (``PyJWT[crypto]``).
+"""
+
+from __future__ import annotations
+
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import httpx
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+SUPPORTED_ALGORITHMS = ("RS256", "EdDSA")
+
+
+def _algorithm_for(private_key: Any) -> str:
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return "RS256"
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return "EdDSA"
+    raise ValueError(f"Unsupported signing key type: {type(private_key).__name__}")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """A private key with the ``kid`` and algorithm it signs under."""
+
+    kid: str
+    algorithm: str
+    private_key: Any
+
+    @classmethod
+    def generate(cls, kid: str, algorithm: str = "RS256") -> SigningKey:
+        """Create a new random key for ``algorithm``."""
+        if algorithm == "RS256":
+            key: Any = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        elif algorithm == "EdDSA":
+            key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        return cls(kid=kid, algorithm=algorithm, private_key=key)
+
+    @classmethod
+    def from_pem(cls, kid: str, pem: bytes) -> SigningKey:
+        """Load an unencrypted PEM private key; the algorithm follows its type."""
+        key = serialization.load_pem_private_key(pem, password=None)
+        return cls(kid=kid, algorithm=_algorithm_for(key), private_key=key)
+
+    def to_pem(self) -> bytes:
+        """Serialize the private key as unencrypted PKCS#8 PEM."""
+        return self.private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+
+    def public_jwk(self) -> dict[str, Any]:
+        """Return the public half of the key as a JWK."""
+        public_key = self.private_key.public_key()
+        if self.algorithm == "RS256":
+            jwk = RSAAlgorithm.to_jwk(public_key, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+class KeySet:
+    """Signing keys for the auth service; one is active, all are published.
+
+    Parameters
+    ----------
+    keys:
+        Keys that may have signed still-valid tokens.
+    active_kid:
+        ``kid`` of the key used for new tokens. Defaults to the last key.
+    """
+
+    def __init__(
+        self, keys: Iterable[SigningKey], active_kid: Optional[str] = None
+    ) -> None:
+        self._keys = {key.kid: key for key in keys}
+        if not self._keys:
+            raise ValueError("A key set needs at least one signing key")
+        self.active_kid = active_kid or list(self._keys)[-1]
+        if self.active_kid not in self._keys:
+            raise ValueError(f"Unknown active kid: {self.active_kid}")
+        self._verifier = TokenVerifier(jwks=self.jwks())
+
+    @classmethod
+    def from_directory(
+        cls, path: str | Path, active_kid: Optional[str] = None
+    ) -> KeySet:
+        """Load ``*.pem`` private keys from ``path``, using file stems as kids."""
+        files = sorted(Path(path).glob("*.pem"))
+        return cls(
+            (SigningKey.from_pem(file.stem, file.read_bytes()) for file in files),
+            active_kid,
+        )
+
+    @classmethod
+    def generate(cls, algorithm: str = "RS256") -> KeySet:
+        """Return a set with one fresh key, for development and tests."""
+        return cls([SigningKey.generate(_new_kid(), algorithm)])
+
+    @property
+    def active(self) -> SigningKey:
+        return self._keys[self.active_kid]
+
+    def __contains__(self, kid: object) -> bool:
+        """Return whether ``kid`` is published and may verify tokens."""
+        return kid in self._keys
+
+    def rotate(self, algorithm: Optional[str] = None) -> SigningKey:
+        """Generate a new active key, keeping the old ones for verification."""
+        key = SigningKey.generate(_new_kid(), algorithm or self.active.algorithm)
+        self._keys[key.kid] = key
+        self.active_kid = key.kid
+        self._verifier = TokenVerifier(jwks=self.jwks())
+        return key
+
+    def retire(self, kid: str) -> None:
+        """Stop publishing ``kid``; tokens it signed no longer verify."""
+        if kid == self.active_kid:
+            raise ValueError("Cannot retire the active signing key")
+        self._keys.pop(kid, None)
+        self._verifier = TokenVerifier(jwks=self.jwks())
+
+    def sign(self, payload: dict[str, Any]) -> str:
+        """Encode ``payload`` with the active key and its ``kid`` header."""
+        key = self.active
+        return jwt.encode(
+            payload,
+            key.private_key,
+            algorithm=key.algorithm,
+            headers={"kid": key.kid},
+        )
+
+    def decode(self, token: str, **kwargs: Any) -> dict[str, Any]:
+        """Verify ``token`` against the published keys and return its claims."""
+        return self._verifier.verify(token, **kwargs)
+
+    def jwks(self) -> dict[str, list[dict[str, Any]]]:
+        """Return the JSON Web Key Set document for every key."""
+        return {"keys": [key.public_jwk() for key in self._keys.values()]}
+
+
+def _new_kid() -> str:
+    # Time-ordered so ``from_directory`` picks the newest key by default.
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}"
+
+
+class TokenVerifier:
+    """Validate auth service JWTs locally against its published JWKS.
+
+    Parameters
+    ----------
+    jwks_url:
+        URL of the auth service's ``/.well-known/jwks.json``.
+    jwks:
+        A JWKS document to use instead of fetching one.
+    algorithms:
+        Algorithms accepted from token headers.
+    min_refresh_interval:
+        Minimum seconds between refetches triggered by an unknown ``kid``, so
+        forged tokens cannot make every request call the auth service.
+    timeout:
+        HTTP timeout for fetching the JWKS.
+    """
+
+    def __init__(
+        self,
+        jwks_url: Optional[str] = None,
+        *,
+        jwks: Optional[dict[str, Any]] = None,
+        algorithms: Iterable[str] = SUPPORTED_ALGORITHMS,
+        min_refresh_interval: float = 30.0,
+        timeout: float = 5.0,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if jwks_url is None and jwks is None:
+            raise ValueError("TokenVerifier needs a jwks_url or a jwks document")
+        self.jwks_url = jwks_url
+        self.algorithms = list(algorithms)
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self.fetches = 0
+        if jwks is not None:
+            self._keys = self._parse(jwks)
+
+    @classmethod
+    def from_env(cls) -> TokenVerifier:
+        """Build a verifier for ``JWT_JWKS_URL`` (default: local auth service)."""
+        url = os.getenv("JWT_JWKS_URL", "http://localhost:8002/.well-known/jwks.json")
+        return cls(url)
+
+    def _parse(self, jwks: dict[str, Any]) -> dict[str, jwt.PyJWK]:
+        # Parse each JWK once; PyJWK holds the ready-to-use public key.
+        keys = {}
+        for data in jwks.get("keys", []):
+            if data.get("kid") and data.get("alg") in self.algorithms:
+                keys[data["kid"]] = jwt.PyJWK(data)
+        return keys
+
+    def refresh(self) -> None:
+        """Fetch the JWKS document from ``jwks_url``."""
+        if self.jwks_url is None:
+            return
+        with self._lock:
+            self._fetched_at = self._timer()
+        # The fetch runs unlocked so a slow auth service never blocks
+        # verifications; only the swap of the parsed keys is locked.
+        resp = httpx.get(self.jwks_url, timeout=self.timeout)
+        resp.raise_for_status()
+        keys = self._parse(resp.json())
+        with self._lock:
+            self._keys = keys
+            self.fetches += 1
+
+    def __contains__(self, kid: object) -> bool:
+        """Return whether ``kid`` is in the loaded JWKS, without refetching."""
+        with self._lock:
+            return kid in self._keys
+
+    def _key_for(self, kid: str) -> Optional[jwt.PyJWK]:
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None or self.jwks_url is None:
+                return key
+            # The attempt time is recorded before fetching, so failed fetches
+            # and concurrent misses also wait out ``min_refresh_interval``.
+            if (
+                self._fetched_at is not None
+                and self._timer() - self._fetched_at < self.min_refresh_interval
+            ):
+                return None
+            self._fetched_at = self._timer()
+        self.refresh()
+        with self._lock:
+            return self._keys.get(kid)
+
+    def verify(self, token: str, **kwargs: Any) -> dict[str, Any]:
+        """Return the claims of ``token`` or raise ``jwt.InvalidTokenError``."""
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid")
+        if not kid:
+            raise jwt.InvalidTokenError("Token has no kid header")
+        key = self._key_for(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+        return jwt.decode(token, key, algorithms=[key.algorithm_name], **kwargs)
+
+
+def bearer_claims(
+    verifier: TokenVerifier, **options: Any
+) -> Callable[..., dict[str, Any]]:
+    """Return a FastAPI dependency that yields the claims of the bearer token.
+
+    Invalid or expired tokens get ``401``; a JWKS fetch failure gets ``503``.
+    """
+
+    def dependency(
+        creds: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+    ) -> dict[str, Any]:
+        try:
+            return verifier.verify(creds.credentials, **options)
+        except jwt.InvalidTokenError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+            ) from exc
+        except httpx.HTTPError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Signing keys unavailable",
+            ) from exc
+
+    return dependency
@@ -0,0 +1,180 @@
+"""In-memory XP ranking kept sorted as totals change."""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Iterable, Iterator, Optional
+
+Key = tuple[int, ...]
+
+
+class _SortedKeys:
+    """Sorted keys split into blocks of at most ``2 * load`` entries.
+
+    A Fenwick tree over the block sizes gives the position of any block in
+    O(log n), so inserting or removing a key touches one short block instead
+    of shifting the whole list, while positional slices stay cheap.
+    """
+
+    def __init__(self, keys: Iterable[Key] = (), load: int = 512) -> None:
+        ordered = sorted(keys)
+        self._load = load
+        self._blocks = [ordered[i : i + load] for i in range(0, len(ordered), load)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(ordered)
+        self._reindex()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _reindex(self) -> None:
+        tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, start=1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _resize(self, block: int, delta: int) -> None:
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _offset(self, block: int) -> int:
+        """Return the number of keys in blocks before ``block``."""
+        total = 0
+        while block > 0:
+            total += self._tree[block]
+            block -= block & -block
+        return total
+
+    def _locate(self, position: int) -> tuple[int, int]:
+        """Return ``(block, index)`` holding the key at ``position``."""
+        block = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = block + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                block = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return block, position
+
+    def add(self, key: Key) -> None:
+        if not self._blocks:
+            self._blocks, self._maxes, self._len = [[key]], [key], 1
+            self._reindex()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        self._len += 1
+        if len(block) > 2 * self._load:
+            self._blocks[i : i + 1] = [block[: self._load], block[self._load :]]
+            self._maxes[i : i + 1] = [block[self._load - 1], block[-1]]
+            self._reindex()
+        else:
+            self._resize(i, 1)
+
+    def remove(self, key: Key) -> None:
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        self._len -= 1
+        if block:
+            self._maxes[i] = block[-1]
+            self._resize(i, -1)
+        else:
+            del self._blocks[i], self._maxes[i]
+            self._reindex()
+
+    def bisect_left(self, key: Key) -> int:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return self._len
+        return self._offset(i) + bisect_left(self._blocks[i], key)
+
+    def islice(self, start: int, stop: int) -> Iterator[Key]:
+        """Yield the keys at positions ``start`` to ``stop`` (exclusive)."""
+        if start >= min(stop, self._len):
+            return
+        block, index = self._locate(start)
+        remaining = min(stop, self._len) - start
+        while remaining > 0:
+            chunk = self._blocks[block][index : index + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            block, index = block + 1, 0
+
+
+class RankingIndex:
+    """Users ordered by XP (highest first, ties by user ID).
+
+    Entries are ``(-xp, user_id)`` keys in a blocked sorted list, so rank
+    lookups, page offsets and single-user updates cost O(log n) plus one short
+    block shift and never rescan XP data.
+    """
+
+    def __init__(self) -> None:
+        self._keys = _SortedKeys()
+        self._entries: dict[int, tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def is_stale(self, max_age: float) -> bool:
+        """Return ``True`` if never loaded or loaded over ``max_age`` seconds ago."""
+        if self.loaded_at is None:
+            return True
+        return max_age > 0 and time.monotonic() - self.loaded_at > max_age
+
+    def load(self, rows: Iterable[tuple[int, str, int]]) -> None:
+        """Replace the index with ``(user_id, username, xp_total)`` rows."""
+        entries = {user_id: (xp, username) for user_id, username, xp in rows}
+        keys = _SortedKeys((-xp, user_id) for user_id, (xp, _) in entries.items())
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self.loaded_at = time.monotonic()
+
+    def update(self, user_id: int, username: str, xp_total: int) -> None:
+        """Record ``xp_total`` as the user's current XP."""
+        with self._lock:
+            previous = self._entries.get(user_id)
+            if previous is not None:
+                self._keys.remove((-previous[0], user_id))
+            self._entries[user_id] = (xp_total, username)
+            self._keys.add((-xp_total, user_id))
+
+    def rank_for_xp(self, xp_total: int) -> int:
+        """Return the 1-based rank for ``xp_total``; equal XP shares a rank."""
+        with self._lock:
+            return self._keys.bisect_left((-xp_total,)) + 1
+
+    def get(self, user_id: int) -> Optional[tuple[str, int]]:
+        """Return ``(username, xp_total)`` for an indexed user."""
+        entry = self._entries.get(user_id)
+        return None if entry is None else (entry[1], entry[0])
+
+    def page(self, offset: int, limit: int) -> list[tuple[int, int, str, int]]:
+        """Return ``(rank, user_id, username, xp_total)`` for one page."""
+        with self._lock:
+            keys = list(self._keys.islice(offset, offset + limit))
+            if not keys:
+                return []
+            # Rank of the first entry accounts for ties reaching into the page.
+            rank = self._keys.bisect_left((keys[0][0],)) + 1
+            result = []
+            previous_xp = keys[0][0]
+            for position, (neg_xp, user_id) in enumerate(keys, start=offset + 1):
+                if neg_xp != previous_xp:
+                    rank, previous_xp = position, neg_xp
+                result.append((rank, user_id, self._entries[user_id][1], -neg_xp))
+            return result
@@ -2,41 +2,73 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, FastAPI, Depends, HTTPException
+import os
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from utils.cors import get_cors_origins
+from utils.ranking import RankingIndex
 
 from devonboarder import auth_service
 
 router = APIRouter()
 
+# Leaderboard order, loaded from user_xp_totals on first use and updated by
+# ``contribute``. XP awarded elsewhere (the auth service, other workers) is
+# picked up by a full reload every LEADERBOARD_RELOAD_SECONDS.
+LEADERBOARD_RELOAD_SECONDS = float(os.getenv("LEADERBOARD_RELOAD_SECONDS", "300"))
+ranking = RankingIndex()
+CONTRIBUTION_BATCH_LIMIT = int(os.getenv("CONTRIBUTION_BATCH_LIMIT", "1000"))
+
+
+def _ranking(db: Session) -> RankingIndex:
+    if ranking.is_stale(LEADERBOARD_RELOAD_SECONDS):
+        rows = db.execute(
+            select(
+                auth_service.User.id,
+                auth_service.User.username,
+                auth_service.UserXPTotal.xp_total,
+            ).join(
+                auth_service.UserXPTotal,
+                auth_service.UserXPTotal.user_id == auth_service.User.id,
+            )
+        )
+        ranking.load(rows.tuples())
+    return ranking
+
+
+def _user_id(db: Session, username: str) -> int:
+    user_id = db.scalar(
+        select(auth_service.User.id).where(auth_service.User.username == username)
+    )
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_id
+
 
 @router.get("/api/user/onboarding-status")
 def onboarding_status(
-    username: str, db: Session = Depends(auth_service.get_db)
+    username: str, db: Session = Depends(auth_service.get_read_db)
 ) -> dict[str, str]:
     """Return the user's onboarding status."""
-    user = db.query(auth_service.User).filter_by(username=username).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    status_str = "complete" if user.contributions else "pending"
-    return {"status": status_str}
+    user_id = _user_id(db, username)
+    has_contribution = db.scalar(auth_service.has_contribution_query(user_id))
+    return {"status": "complete" if has_contribution else "pending"}
 
 
 @router.get("/api/user/level")
 def user_level(
-    username: str, db: Session = Depends(auth_service.get_db)
+    username: str, db: Session = Depends(auth_service.get_read_db)
 ) -> dict[str, int]:
     """Return the user's current level."""
-    user = db.query(auth_service.User).filter_by(username=username).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    xp_total = sum(evt.xp for evt in user.events)
-    level = xp_total // 100 + 1
-    return {"level": level}
+    user_id = _user_id(db, username)
+    level = db.scalar(auth_service.level_query(user_id))
+    return {"level": level or auth_service.level_for_xp(0)}
 
 
 @router.post("/api/user/contribute")
@@ -58,9 +90,129 @@ def contribute(
         auth_service.XPEvent(user_id=current_user.id, xp=auth_service.CONTRIBUTION_XP)
     )
     db.commit()
+    xp_total = db.scalar(
+        select(auth_service.UserXPTotal.xp_total).where(
+            auth_service.UserXPTotal.user_id == current_user.id
+        )
+    )
+    _ranking(db).update(current_user.id, current_user.username, xp_total or 0)
     return {"recorded": description}
 
 
+def _batch_item(item: object, default_username: str) -> Optional[tuple[str, str]]:
+    """Return ``(description, username)`` for a well-formed batch item."""
+    if not isinstance(item, dict):
+        return None
+    description = item.get("description")
+    username = item.get("username", default_username)
+    if not isinstance(description, str) or not description:
+        return None
+    if not isinstance(username, str):
+        return None
+    return description, username
+
+
+@router.post("/api/user/contributions/batch")
+def contribute_batch(
+    data: dict,
+    current_user: auth_service.User = Depends(auth_service.get_current_user),
+    db: Session = Depends(auth_service.get_db),
+) -> dict[str, object]:
+    """Record many contributions in one transaction and report each item.
+
+    Items are ``{"description": ..., "username": ...}``; ``username`` defaults
+    to the caller, and recording for someone else requires admin rights.
+    """
+    items = data.get("contributions")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="contributions must be a list")
+    if len(items) > CONTRIBUTION_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {CONTRIBUTION_BATCH_LIMIT} contributions per batch",
+        )
+
+    parsed = [_batch_item(item, current_user.username) for item in items]
+    usernames = {item[1] for item in parsed if item is not None}
+    user_ids = dict(
+        db.execute(
+            select(auth_service.User.username, auth_service.User.id).where(
+                auth_service.User.username.in_(usernames)
+            )
+        ).all()
+    )
+
+    results: list[dict[str, object]] = []
+    accepted: list[tuple[int, str]] = []
+    for index, item in enumerate(parsed):
+        if item is None:
+            results.append({"index": index, "status": 422, "detail": "Invalid item"})
+            continue
+        description, username = item
+        user_id = user_ids.get(username)
+        if user_id is None:
+            results.append({"index": index, "status": 404, "detail": "User not found"})
+        elif user_id != current_user.id and not current_user.is_admin:
+            results.append({"index": index, "status": 403, "detail": "Forbidden"})
+        else:
+            accepted.append((user_id, description))
+            results.append({"index": index, "status": 200, "recorded": description})
+
+    auth_service.bulk_add_contributions(db, accepted)
+    db.commit()
+
+    touched = {user_id for user_id, _ in accepted}
+    if touched:
+        names = {user_id: name for name, user_id in user_ids.items()}
+        totals = db.execute(
+            select(
+                auth_service.UserXPTotal.user_id, auth_service.UserXPTotal.xp_total
+            ).where(auth_service.UserXPTotal.user_id.in_(touched))
+        )
+        board = _ranking(db)
+        for user_id, xp_total in totals.tuples():
+            board.update(user_id, names[user_id], xp_total)
+    return {"recorded": len(accepted), "results": results}
+
+
+@router.get("/api/leaderboard")
+def leaderboard(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(auth_service.get_db),
+) -> dict[str, object]:
+    """Return one page of users ordered by XP, highest first."""
+    index = _ranking(db)
+    entries = [
+        {
+            "rank": rank,
+            "username": username,
+            "xp": xp_total,
+            "level": auth_service.level_for_xp(xp_total),
+        }
+        for rank, _, username, xp_total in index.page(offset, limit)
+    ]
+    return {"total": len(index), "offset": offset, "limit": limit, "entries": entries}
+
+
+@router.get("/api/user/rank")
+def user_rank(
+    username: str, db: Session = Depends(auth_service.get_db)
+) -> dict[str, object]:
+    """Return the user's leaderboard rank; users without XP share last place."""
+    user_id = _user_id(db, username)
+    index = _ranking(db)
+    entry = index.get(user_id)
+    xp_total = entry[1] if entry is not None else 0
+    return {
+        "username": username,
+        "rank": index.rank_for_xp(xp_total),
+        "xp": xp_total,
+        "level": auth_service.level_for_xp(xp_total),
+        "total": len(index),
+    }
+
+
 def create_app() -> FastAPI:
     """Create a FastAPI application with the XP router."""
     app = FastAPI()
@@ -0,0 +1,194 @@
+"""Tests for the async auth service mode (``AUTH_ASYNC_MODE``)."""
+
+import importlib
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from devonboarder import auth_service
+
+
+def setup_function(function):
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.init_db()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth_service, "ASYNC_MODE", True)
+    # conftest reloads auth_service per test; rebind the user router's
+    # dependency so the async override applies to it.
+    import routes.user
+
+    importlib.reload(routes.user)
+
+    async def fake_roles(token: str):
+        return {"guild": ["role1"]}
+
+    async def fake_profile(token: str):
+        return {"id": "99", "username": f"discord-{token}", "avatar": None}
+
+    monkeypatch.setattr(auth_service, "get_user_roles_async", fake_roles)
+    monkeypatch.setattr(auth_service, "get_user_profile_async", fake_profile)
+    monkeypatch.setattr(
+        auth_service,
+        "resolve_user_flags",
+        lambda roles: {"isAdmin": False, "isVerified": True, "verificationType": "x"},
+    )
+    with TestClient(auth_service.create_app()) as test_client:
+        yield test_client
+
+
+def _register(client: TestClient, username: str, password: str = "pw") -> str:
+    resp = client.post(
+        "/api/register",
+        json={"username": username, "password": password, "discord_token": "t"},
+    )
+    assert resp.status_code == 200
+    return resp.json()["token"]
+
+
+def test_async_engine_url_rewrites_drivers():
+    assert (
+        auth_service._async_db_url("sqlite:///./a.db") == "sqlite+aiosqlite:///./a.db"
+    )
+    assert (
+        auth_service._async_db_url("postgresql://u:p@h/db")
+        == "postgresql+asyncpg://u:p@h/db"
+    )
+    assert (
+        auth_service._async_db_url("postgresql+psycopg2://h/db")
+        == "postgresql+asyncpg://h/db"
+    )
+    assert auth_service._async_db_url("mysql://h/db") == "mysql://h/db"
+
+
+def test_async_mode_keeps_shared_routes(client):
+    assert client.get("/health").json() == {"status": "ok"}
+    assert "discord_cache" in client.get("/metrics").json()
+    resp = client.get("/login/discord", follow_redirects=False)
+    assert resp.status_code == 307
+    assert "/api/login" in client.app.openapi()["paths"]
+
+
+def test_async_register_login_and_user_info(client):
+    token = _register(client, "alice")
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "id": "99",
+        "username": "discord-t",
+        "avatar": None,
+        "isAdmin": False,
+        "isVerified": True,
+        "verificationType": "x",
+        "roles": {"guild": ["role1"]},
+    }
+
+    resp = client.post(
+        "/api/login",
+        json={"username": "alice", "password": "pw", "discord_token": "new"},
+    )
+    assert resp.status_code == 200
+    resp = client.get(
+        "/api/user", headers={"Authorization": f"Bearer {resp.json()['token']}"}
+    )
+    assert resp.json()["username"] == "discord-new"
+
+    resp = client.post("/api/login", json={"username": "alice", "password": "bad"})
+    assert resp.status_code == 400
+    resp = client.post("/api/register", json={"username": "alice", "password": "x"})
+    assert resp.json()["detail"] == "Username exists"
+
+
+def test_async_contributions_level_and_promote(client):
+    admin_token = _register(client, "admin")
+    bob_token = _register(client, "bob")
+    bob = {"Authorization": f"Bearer {bob_token}"}
+    admin = {"Authorization": f"Bearer {admin_token}"}
+
+    assert client.get("/api/user/onboarding-status", headers=bob).json() == {
+        "status": "pending"
+    }
+    for n in range(3):
+        resp = client.post(
+            "/api/user/contributions", json={"description": f"c{n}"}, headers=bob
+        )
+        assert resp.json() == {"recorded": f"c{n}"}
+
+    assert client.get("/api/user/contributions", headers=bob).json() == {
+        "contributions": ["c0", "c1", "c2"]
+    }
+    assert client.get("/api/user/level", headers=bob).json() == {"level": 2}
+    assert client.get("/api/user/onboarding-status", headers=bob).json() == {
+        "status": "complete"
+    }
+
+    resp = client.post(
+        "/api/user/contributions",
+        json={"username": "bob", "description": "x"},
+        headers=admin,
+    )
+    assert resp.status_code == 403
+    resp = client.post("/api/user/promote", json={"username": "bob"}, headers=admin)
+    assert resp.status_code == 403
+
+    resp = client.post("/api/user/promote", json={"username": "admin"}, headers=bob)
+    assert resp.status_code == 403
+
+
+def test_async_invalid_token_and_discord_timeout(client, monkeypatch):
+    resp = client.get("/api/user", headers={"Authorization": "Bearer nope"})
+    assert resp.status_code == 401
+
+    token = _register(client, "slow")
+
+    async def timeout(token: str):
+        raise httpx.TimeoutException("timeout")
+
+    monkeypatch.setattr(auth_service, "get_user_roles_async", timeout)
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 504
+
+
+def test_async_login_upgrades_stored_hash(client):
+    from devonboarder.password_hashing import configure_rounds
+
+    low = auth_service.CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4)
+    configure_rounds(auth_service.pwd_context, 5)
+    with auth_service.SessionLocal() as db:
+        db.add(auth_service.User(username="old", password_hash=low.hash("pw")))
+        db.commit()
+
+    resp = client.post("/api/login", json={"username": "old", "password": "pw"})
+    assert resp.status_code == 200
+    with auth_service.SessionLocal() as db:
+        stored = db.query(auth_service.User).filter_by(username="old").one()
+        assert stored.password_hash.startswith("$2b$05$")
+
+
+def test_async_reads_use_replica_and_pooled_engines(client, tmp_path):
+    auth_service.init_read_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    auth_service.Base.metadata.create_all(bind=auth_service.read_engine)
+    token = _register(client, "ann")
+    headers = {"Authorization": f"Bearer {token}"}
+    auth_service.recent_writers.clear()
+
+    assert client.get("/api/user/level", headers=headers).json() == {"level": 1}
+    assert auth_service.read_routing["replica"] == 1
+
+    resp = client.post(
+        "/api/user/contributions", json={"description": "docs"}, headers=headers
+    )
+    assert resp.status_code == 200
+    # The replica has not seen the contribution, but the writer reads the primary.
+    status = client.get("/api/user/onboarding-status", headers=headers).json()
+    assert status == {"status": "complete"}
+    assert auth_service.read_routing["read_after_write"] == 1
+
+    metrics = client.get("/metrics").json()
+    assert metrics["db_async_pool"]["checkouts"] >= 1
+    assert metrics["db_async_read_pool"]["checkouts"] == 1
+    async_pool = auth_service.async_engine.sync_engine.pool
+    assert async_pool.size() == auth_service.DB_POOL_SIZE
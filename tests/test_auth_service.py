@@ -3,6 +3,7 @@ import sqlalchemy
 import time
 import pytest
 import jwt
+from utils import discord as discord_utils
 from utils import roles as roles_utils
 from fastapi.middleware.cors import CORSMiddleware
 from devonboarder import auth_service
@@ -158,6 +159,63 @@ def test_oauth_token_updated_on_login(monkeypatch):
     assert resp.status_code == 200
 
 
+def test_discord_state_cached_between_requests(monkeypatch):
+    app = auth_service.create_app()
+    client = TestClient(app)
+
+    calls = {"roles": 0, "profile": 0}
+
+    def fake_roles(token: str):
+        calls["roles"] += 1
+        return {"guild": ["role1"]}
+
+    def fake_profile(token: str):
+        calls["profile"] += 1
+        return {"id": "7", "username": token, "avatar": None}
+
+    monkeypatch.setattr(auth_service, "get_user_roles", fake_roles)
+    monkeypatch.setattr(auth_service, "get_user_profile", fake_profile)
+
+    client.post(
+        "/api/register",
+        json={"username": "cache", "password": "pw", "discord_token": "first"},
+    )
+    token = _get_token(client, "cache", "pw", discord_token="first")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for _ in range(3):
+        resp = client.get("/api/user", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["username"] == "first"
+    assert calls == {"roles": 1, "profile": 1}
+
+    metrics = client.get("/metrics").json()
+    assert metrics["discord_cache"]["hits"] == 2
+    assert metrics["discord_cache"]["misses"] == 1
+    assert metrics["discord_scheduler"]["queue_depth"] == 0
+
+    # Logging in with a new Discord token invalidates the cached state
+    token = _get_token(client, "cache", "pw", discord_token="second")
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.json()["username"] == "second"
+    assert calls == {"roles": 2, "profile": 2}
+
+
+def test_discord_state_refetched_when_token_changes(monkeypatch):
+    monkeypatch.setattr(auth_service, "get_user_roles", lambda token: {})
+    monkeypatch.setattr(
+        auth_service,
+        "get_user_profile",
+        lambda token: {"id": "1", "username": token, "avatar": None},
+    )
+
+    first = auth_service._resolve_discord_state(1, "one")
+    assert auth_service._resolve_discord_state(1, "one") is first
+    # A token replaced outside this process still misses the cache
+    second = auth_service._resolve_discord_state(1, "two")
+    assert second["profile"]["username"] == "two"
+
+
 def test_user_levels_and_promote():
     app = auth_service.create_app()
     client = TestClient(app)
@@ -520,6 +578,41 @@ def test_expired_token_decode_fails(monkeypatch):
         )
 
 
+def test_verified_token_cached_until_expiry(monkeypatch):
+    user = auth_service.User(id=42, username="u", password_hash="x")
+    token = auth_service.create_token(user)
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth_service.jwt, "decode", counting_decode)
+
+    assert auth_service.decode_user_id(token) == 42
+    assert auth_service.decode_user_id(token) == 42
+    assert len(calls) == 1
+    stats = auth_service.token_cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    # Once the wall clock passes ``exp`` the cached entry is never served
+    expires_at = time.time() + auth_service.TOKEN_EXPIRE_SECONDS + 1
+    monkeypatch.setattr(auth_service.time, "time", lambda: expires_at)
+    auth_service.decode_user_id(token)
+    assert len(calls) == 2
+    assert len(auth_service.token_cache) == 0
+
+
+def test_invalid_token_not_cached():
+    with pytest.raises(auth_service.HTTPException):
+        auth_service.decode_user_id("not-a-jwt")
+    with pytest.raises(auth_service.HTTPException):
+        auth_service.decode_user_id("not-a-jwt")
+    assert len(auth_service.token_cache) == 0
+    assert auth_service.token_cache.stats()["misses"] == 2
+
+
 def test_discord_callback_timeout(monkeypatch):
     app = auth_service.create_app()
     client = TestClient(app)
@@ -556,6 +649,35 @@ def test_get_current_user_timeout(monkeypatch):
     assert resp.json()["detail"] == "Discord API timeout"
 
 
+def test_get_current_user_rate_limited(monkeypatch):
+    app = auth_service.create_app()
+    client = TestClient(app)
+
+    client.post("/api/register", json={"username": "t", "password": "pw"})
+    token = _get_token(client, "t", "pw")
+
+    def rate_limited(*args, **kwargs):
+        request = httpx.Request("GET", "https://discord.test/member")
+        response = httpx.Response(429, request=request)
+        raise httpx.HTTPStatusError("429", request=request, response=response)
+
+    monkeypatch.setattr(auth_service, "get_user_roles", rate_limited)
+    monkeypatch.setattr(
+        auth_service,
+        "get_user_profile",
+        lambda tok: {"id": "1", "username": "t", "avatar": None},
+    )
+
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 503
+    assert resp.json()["detail"] == "Discord API rate limited"
+    # The failed lookup is not cached; the next request asks Discord again.
+    assert len(auth_service.discord_cache) == 0
+    monkeypatch.setattr(auth_service, "get_user_roles", lambda tok: {"1": ["a"]})
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.json()["roles"] == {"1": ["a"]}
+
+
 def test_cors_allow_origins(monkeypatch):
     monkeypatch.setenv("CORS_ALLOW_ORIGINS", "https://a.com,https://b.com")
     app = auth_service.create_app()
@@ -947,7 +1069,7 @@ def test_discord_callback_with_unsafe_redirect_state():
                 return StubResponse(200, [{"id": "guild1", "name": "Test Guild"}])
 
         m.setattr(httpx, "post", mock_post)
-        m.setattr(httpx, "get", mock_get)
+        m.setattr(discord_utils.get_http_client(), "get", mock_get)
 
         # Test with unsafe state parameter that should be blocked
         callback_url = (
@@ -989,7 +1111,7 @@ def test_final_redirect_security_validation():
                 return StubResponse(200, [{"id": "guild1", "name": "Test Guild"}])
 
         m.setattr(httpx, "post", mock_post)
-        m.setattr(httpx, "get", mock_get)
+        m.setattr(discord_utils.get_http_client(), "get", mock_get)
 
         # This will trigger the final security validation
         response = client.get(
@@ -0,0 +1,87 @@
+"""Tests for the in-memory TTL cache."""
+
+from utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_and_set_counts_hits_and_misses():
+    cache = TTLCache(maxsize=2, ttl=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, timer=clock)
+    cache.set("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_is_capped_by_default():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, timer=clock)
+    cache.set("short", 1, ttl=2)
+    cache.set("long", 2, ttl=100)
+    clock.now = 5
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    clock.now = 11
+    assert cache.get("long") is None
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    cache.set("b", 2)
+    cache.get("b")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 0
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(maxsize=2, ttl=0)
+    assert not cache.enabled
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_purge_by_key():
+    cache = TTLCache(maxsize=4, ttl=10)
+    for key in [("a", 1), ("a", 2), ("b", 1)]:
+        cache.set(key, True)
+    assert cache.purge(lambda key: key[0] == "a") == 2
+    assert len(cache) == 1
+    assert cache.get(("b", 1)) is True
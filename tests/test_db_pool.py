@@ -0,0 +1,105 @@
+"""Tests for engine pool configuration and pool metrics."""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, create_mock_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from devonboarder import auth_service
+from utils.db_pool import (
+    configure_sqlite,
+    dialect_insert,
+    engine_options,
+    instrument,
+    pool_stats,
+)
+
+
+def _engine(url, **options):
+    engine = create_engine(url, **engine_options(url, **options))
+    instrument(engine)
+    return engine
+
+
+def test_pool_stats_track_in_use_and_waits(tmp_path):
+    engine = _engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=5,
+    )
+    first = engine.connect()
+    stats = pool_stats(engine)
+    assert stats["size"] == 1
+    assert stats["in_use"] == 1
+    assert stats["checked_out"] == 1
+
+    # A second checkout waits until the first connection is returned.
+    timer = threading.Timer(0.1, first.close)
+    timer.start()
+    with engine.connect():
+        pass
+    timer.join()
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0
+    assert stats["peak_in_use"] == 1
+    assert stats["wait_max_ms"] >= 50
+    engine.dispose()
+
+
+def test_pool_timeout_is_counted(tmp_path):
+    engine = _engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert pool_stats(engine)["timeouts"] == 1
+    engine.dispose()
+    # Metrics survive the pool being recreated by ``dispose()``.
+    assert pool_stats(engine)["timeouts"] == 1
+
+
+def test_configure_sqlite_enables_wal_and_busy_timeout(tmp_path):
+    engine = _engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    configure_sqlite(engine, busy_timeout_ms=1234)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+    engine.dispose()
+
+
+def test_memory_database_uses_thread_local_pool():
+    engine = _engine("sqlite://")
+    configure_sqlite(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+        assert pool_stats(engine)["in_use"] == 1
+    stats = pool_stats(engine)
+    assert "size" not in stats
+    assert stats["checkouts"] == 1
+
+
+def test_metrics_endpoint_reports_pool(monkeypatch, tmp_path):
+    engine = _engine(f"sqlite:///{tmp_path / 'metrics.db'}", pool_size=3)
+    monkeypatch.setattr(auth_service, "engine", engine)
+    client = TestClient(auth_service.create_app())
+    pool = client.get("/metrics").json()["db_pool"]
+    assert pool["size"] == 3
+    assert {"in_use", "wait_avg_ms", "timeouts"} <= pool.keys()
+    engine.dispose()
+
+
+def test_dialect_insert_rejects_unsupported_databases():
+    sqlite = create_engine("sqlite://")
+    assert dialect_insert(sqlite).__module__.startswith("sqlalchemy.dialects.sqlite")
+    mysql = create_mock_engine("mysql://", executor=None)
+    with pytest.raises(RuntimeError, match="SQLite or PostgreSQL"):
+        dialect_insert(mysql)
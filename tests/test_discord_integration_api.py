@@ -5,6 +5,8 @@ Tests for src/discord_integration/api.py module.
 This module provides Discord OAuth integration and role lookup endpoints.
 """
 
+import asyncio
+
 from fastapi.testclient import TestClient
 from fastapi import APIRouter
 import httpx
@@ -198,7 +200,7 @@ def test_router_creation():
     assert isinstance(router, APIRouter)
 
     routes = [route for route in router.routes]
-    assert len(routes) == 2  # oauth and roles endpoints
+    assert len(routes) == 3  # oauth, roles and roles/batch endpoints
 
     # Check oauth route
     oauth_route = next(
@@ -546,3 +548,92 @@ def test_oauth_exchange_user_creation_and_update_paths(monkeypatch):
 
     finally:
         monkeypatch.undo()
+
+
+def _batch_discord_client():
+    """Return a DiscordClient whose stub answers per token."""
+    from utils.discord import DiscordClient
+
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            state["in_flight"] -= 1
+        if token == "slow":
+            raise httpx.ReadTimeout("timeout", request=request)
+        if token == "broken":
+            return httpx.Response(500, json={})
+        if request.url.path.endswith("/guilds"):
+            return httpx.Response(200, json=[{"id": "1"}])
+        return httpx.Response(200, json={"roles": [f"role-{token}"]})
+
+    return DiscordClient(transport=httpx.MockTransport(handler)), state
+
+
+def test_get_roles_batch(monkeypatch):
+    """Batch lookups return roles and per-user errors from one query."""
+    from sqlalchemy import event
+
+    from utils.discord import set_client
+
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    with auth_service.SessionLocal() as db:
+        for name, token in [
+            ("a", "ta"),
+            ("b", "tb"),
+            ("slow", "slow"),
+            ("broken", "broken"),
+            ("unlinked", None),
+        ]:
+            db.add(
+                auth_service.User(username=name, password_hash="", discord_token=token)
+            )
+        db.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    discord_client, state = _batch_discord_client()
+    set_client(discord_client)
+    event.listen(auth_service.engine, "before_cursor_execute", count)
+    try:
+        client = TestClient(create_app())
+        response = client.post(
+            "/roles/batch",
+            json={"usernames": ["a", "b", "a", "slow", "broken", "unlinked", "nobody"]},
+        )
+    finally:
+        event.remove(auth_service.engine, "before_cursor_execute", count)
+        set_client(None)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "roles": {"a": {"1": ["role-ta"]}, "b": {"1": ["role-tb"]}},
+        "errors": {
+            "unlinked": "Discord token not found",
+            "nobody": "User not found",
+            "slow": "Discord API timeout",
+            "broken": "Discord API error",
+        },
+    }
+    assert len(statements) == 1
+    assert state["peak"] > 1
+
+
+def test_get_roles_batch_limits(monkeypatch):
+    """Empty and oversized batches are rejected."""
+    from src.discord_integration import api
+
+    monkeypatch.setattr(api, "ROLES_BATCH_MAX", 2)
+    client = TestClient(create_app())
+    assert client.post("/roles/batch", json={"usernames": []}).status_code == 422
+    response = client.post("/roles/batch", json={"usernames": ["a", "b", "c"]})
+    assert response.status_code == 422
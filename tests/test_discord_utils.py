@@ -1,13 +1,28 @@
+import asyncio
+
 import httpx
 import pytest
-from utils.discord import get_user_roles, get_user_profile
+from utils.discord import (
+    DiscordClient,
+    RateLimitScheduler,
+    get_client,
+    get_http_client,
+    get_user_profile,
+    get_user_profile_async,
+    get_user_roles,
+    get_user_roles_async,
+    set_client,
+    set_http_client,
+    set_scheduler,
+)
 from utils.roles import resolve_user_flags
 
 
 class StubResponse:
-    def __init__(self, status_code: int, json_data: object):
+    def __init__(self, status_code: int, json_data: object, headers=None):
         self.status_code = status_code
         self._json = json_data
+        self.headers = headers or {}
 
     def json(self):
         return self._json
@@ -37,7 +52,7 @@ def test_get_user_roles(monkeypatch):
             return StubResponse(200, {"roles": ["b", "c"]})
         return StubResponse(404, {})
 
-    monkeypatch.setattr(httpx, "get", fake_get)
+    monkeypatch.setattr(get_http_client(), "get", fake_get)
     roles = get_user_roles("token")
     assert roles == {"1": ["a"], "2": ["b", "c"]}
 
@@ -66,7 +81,7 @@ def test_get_user_profile(monkeypatch):
         assert url.endswith("/users/@me")
         return StubResponse(200, {"id": "42", "username": "foo", "avatar": "img"})
 
-    monkeypatch.setattr(httpx, "get", fake_get)
+    monkeypatch.setattr(get_http_client(), "get", fake_get)
     profile = get_user_profile("token")
     assert profile == {"id": "42", "username": "foo", "avatar": "img"}
 
@@ -88,7 +103,7 @@ def test_get_user_roles_multiple_guilds(monkeypatch):
             return StubResponse(200, {"roles": ["r3"]})
         return StubResponse(404, {})
 
-    monkeypatch.setattr(httpx, "get", fake_get)
+    monkeypatch.setattr(get_http_client(), "get", fake_get)
     roles = get_user_roles("token")
     # Only guilds 1 and 2 should be included since guild 3 is not in target_guild_ids
     assert roles == {"1": ["r1"], "2": ["r2"]}
@@ -151,10 +166,44 @@ def test_resolve_user_flags_combinations(monkeypatch, roles, expected):
     assert flags == expected
 
 
-def test_get_user_roles_rate_limited(monkeypatch):
-    """Test handling of rate limit responses."""
+class FakeClock:
+    """Monotonic clock whose sleeps advance time instantly."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+    def scheduler(self, **kwargs) -> RateLimitScheduler:
+        return RateLimitScheduler(
+            timer=self, sleep=self.sleep, async_sleep=self.async_sleep, **kwargs
+        )
+
+
+@pytest.fixture
+def fake_scheduler():
+    """Install a scheduler that records sleeps instead of blocking."""
+    clock = FakeClock()
+    scheduler = clock.scheduler(max_retries=2)
+    set_scheduler(scheduler)
+    yield scheduler, clock.sleeps
+    set_scheduler(None)
+
+
+def test_get_user_roles_rate_limited(monkeypatch, fake_scheduler):
+    """A 429 is retried after Retry-After instead of dropping the roles."""
     monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
     monkeypatch.setenv("DISCORD_PROD_GUILD_ID", "2")
+    scheduler, sleeps = fake_scheduler
 
     calls = []
 
@@ -162,21 +211,178 @@ def test_get_user_roles_rate_limited(monkeypatch):
         calls.append(url)
         if url.endswith("/users/@me/guilds"):
             return StubResponse(200, [{"id": "1"}, {"id": "2"}])
-        # Return 429 (rate limited) for first guild
+        # Rate limit the first member call for guild 1
         if url.endswith("/users/@me/guilds/1/member"):
-            return StubResponse(429, {})
-        # Normal response for second guild
+            if calls.count(url) == 1:
+                return StubResponse(429, {}, headers={"Retry-After": "0.5"})
+            return StubResponse(200, {"roles": ["role1"]})
         if url.endswith("/users/@me/guilds/2/member"):
             return StubResponse(200, {"roles": ["role2"]})
         return StubResponse(404, {})
 
-    monkeypatch.setattr(httpx, "get", mock_get)
+    monkeypatch.setattr(get_http_client(), "get", mock_get)
 
     roles = get_user_roles("token")
 
-    # Should get empty roles for rate limited guild, normal roles for other
-    assert roles == {"1": [], "2": ["role2"]}
-    assert len(calls) == 3  # guilds call + 2 member calls
+    assert roles == {"1": ["role1"], "2": ["role2"]}
+    assert len(calls) == 4  # guilds call + 2 member calls + 1 retry
+    assert sleeps == [0.5]
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["retries"] == 1
+    assert stats["delayed"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_get_user_roles_rate_limit_exhausted(monkeypatch, fake_scheduler):
+    """A 429 left after the retries raises instead of reporting no roles."""
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    monkeypatch.setenv("DISCORD_PROD_GUILD_ID", "2")
+    scheduler, _ = fake_scheduler
+
+    def mock_get(url: str, headers: dict[str, str], *, timeout=None):
+        if url.endswith("/users/@me/guilds"):
+            return StubResponse(200, [{"id": "1"}, {"id": "2"}])
+        if url.endswith("/users/@me/guilds/1/member"):
+            return StubResponse(429, {})
+        return StubResponse(200, {"roles": ["role2"]})
+
+    monkeypatch.setattr(get_http_client(), "get", mock_get)
+
+    with pytest.raises(httpx.HTTPStatusError) as exc_info:
+        get_user_roles("token")
+    assert exc_info.value.response.status_code == 429
+    assert scheduler.stats()["exhausted"] == 1
+
+
+def test_scheduler_waits_for_exhausted_bucket():
+    clock = FakeClock()
+    scheduler = clock.scheduler()
+    sleeps = clock.sleeps
+    headers = {
+        "X-RateLimit-Bucket": "abc",
+        "X-RateLimit-Remaining": "1",
+        "X-RateLimit-Reset-After": "2",
+    }
+
+    def send():
+        return StubResponse(200, {}, headers=headers)
+
+    scheduler.run("GET /a", send)
+    # The bucket reported one remaining slot; the next call consumes it
+    scheduler.run("GET /a", send)
+    assert sleeps == []
+    headers["X-RateLimit-Remaining"] = "0"
+    scheduler.run("GET /a", send)
+    # Bucket exhausted: the next call waits for the reset
+    scheduler.run("GET /a", send)
+    assert sleeps == [2.0]
+    assert scheduler.stats()["max_wait_seconds"] == 2.0
+
+
+def test_scheduler_buckets_are_per_token_and_pruned():
+    clock = FakeClock()
+    scheduler = clock.scheduler(prune_interval=10)
+
+    def response(status: int, remaining: str) -> StubResponse:
+        return StubResponse(
+            status,
+            {},
+            headers={
+                "X-RateLimit-Bucket": "shared",
+                "X-RateLimit-Remaining": remaining,
+                "X-RateLimit-Reset-After": "5",
+            },
+        )
+
+    # Token A exhausts the bucket; token B's fresh count must not reset it.
+    scheduler.run("GET /a", lambda: response(200, "0"), scope="A")
+    scheduler.run("GET /a", lambda: response(200, "4"), scope="B")
+    scheduler.run("GET /a", lambda: response(200, "3"), scope="A")
+    assert clock.sleeps == [5.0]
+
+    # A 429 for token A does not stall token B.
+    clock.sleeps.clear()
+    limited = [StubResponse(429, {}, headers={"Retry-After": "8"})]
+    scheduler = clock.scheduler(max_retries=0, prune_interval=10)
+    scheduler.run("GET /a", lambda: limited[0], scope="A")
+    scheduler.run("GET /a", lambda: response(200, "4"), scope="B")
+    assert clock.sleeps == []
+
+    clock.now += 20
+    scheduler.run("GET /b", lambda: StubResponse(200, {}), scope="C")
+    # Expired buckets were dropped; only C's fresh entry remains.
+    assert scheduler.stats()["buckets"] == 1
+
+
+def test_scheduler_global_limit_delays_all_routes():
+    clock = FakeClock()
+    scheduler = clock.scheduler()
+    limited = StubResponse(
+        429, {}, headers={"Retry-After": "3", "X-RateLimit-Global": "true"}
+    )
+    responses = [limited, StubResponse(200, {})]
+    assert scheduler.run("GET /a", lambda: responses.pop(0)).status_code == 200
+    assert clock.sleeps == [3.0]
+    clock.now = 0.0
+    scheduler.run("GET /a", lambda: limited)
+    # Another route is held back until the global limit resets
+    scheduler.run("GET /b", lambda: StubResponse(200, {}))
+    assert clock.sleeps[-1] == 3.0
+
+
+def test_scheduler_returns_429_when_wait_exceeds_cap():
+    sleeps: list[float] = []
+    scheduler = RateLimitScheduler(max_wait=5, sleep=sleeps.append)
+    resp = scheduler.run(
+        "GET /a", lambda: StubResponse(429, {}, headers={"Retry-After": "60"})
+    )
+    assert resp.status_code == 429
+    assert sleeps == []
+    assert scheduler.stats()["exhausted"] == 1
+
+
+async def test_async_client_retries_rate_limited_calls(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    monkeypatch.setenv("DISCORD_PROD_GUILD_ID", "2")
+    clock = FakeClock()
+    attempts = {"count": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/users/@me/guilds"):
+            return httpx.Response(200, json=[{"id": "1"}])
+        attempts["count"] += 1
+        if attempts["count"] == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.25"}, json={})
+        return httpx.Response(200, json={"roles": ["a"]})
+
+    client = DiscordClient(
+        transport=httpx.MockTransport(handler), scheduler=clock.scheduler()
+    )
+    assert await client.get_user_roles("token") == {"1": ["a"]}
+    assert clock.sleeps == [0.25]
+    await client.aclose()
+
+
+async def test_async_client_raises_when_rate_limit_persists(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    monkeypatch.setenv("DISCORD_PROD_GUILD_ID", "2")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/users/@me/guilds"):
+            return httpx.Response(200, json=[{"id": "1"}, {"id": "2"}])
+        if "/guilds/1/" in request.url.path:
+            return httpx.Response(429, headers={"Retry-After": "0.25"}, json={})
+        return httpx.Response(200, json={"roles": ["b"]})
+
+    client = DiscordClient(
+        transport=httpx.MockTransport(handler),
+        scheduler=FakeClock().scheduler(max_retries=1),
+    )
+    with pytest.raises(httpx.HTTPStatusError) as exc_info:
+        await client.get_user_roles("token")
+    assert exc_info.value.response.status_code == 429
+    await client.aclose()
 
 
 def test_get_user_roles_not_member(monkeypatch):
@@ -198,7 +404,7 @@ def test_get_user_roles_not_member(monkeypatch):
             return StubResponse(200, {"roles": ["role2"]})
         return StubResponse(404, {})
 
-    monkeypatch.setattr(httpx, "get", mock_get)
+    monkeypatch.setattr(get_http_client(), "get", mock_get)
 
     roles = get_user_roles("token")
 
@@ -226,13 +432,12 @@ def test_get_user_roles_timeout(monkeypatch):
             return StubResponse(200, {"roles": ["role2"]})
         return StubResponse(404, {})
 
-    monkeypatch.setattr(httpx, "get", mock_get)
-
-    roles = get_user_roles("token")
+    monkeypatch.setattr(get_http_client(), "get", mock_get)
 
-    # Should get empty roles for timeout guild, normal roles for other
-    assert roles == {"1": [], "2": ["role2"]}
-    assert len(calls) == 3  # guilds call + 2 member calls
+    # A timed-out guild is an error, not a guild without roles.
+    with pytest.raises(httpx.TimeoutException):
+        get_user_roles("token")
+    assert len(calls) == 2
 
 
 def test_get_user_roles_other_http_error(monkeypatch):
@@ -247,8 +452,114 @@ def test_get_user_roles_other_http_error(monkeypatch):
             return StubResponse(500, {})
         return StubResponse(404, {})
 
-    monkeypatch.setattr(httpx, "get", mock_get)
+    monkeypatch.setattr(get_http_client(), "get", mock_get)
 
     # Should re-raise server errors
     with pytest.raises(httpx.HTTPStatusError):
         get_user_roles("token")
+
+
+def _discord_stub(member_roles: dict[str, object], *, delay: float = 0.0):
+    """Return a transport emulating the Discord endpoints used by the client."""
+    state = {"in_flight": 0, "max_in_flight": 0, "requests": []}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request.url.path)
+        assert request.headers["Authorization"] == "Bearer token"
+        path = request.url.path.removeprefix("/api/v10")
+        if path == "/users/@me":
+            return httpx.Response(200, json={"id": "42", "username": "foo"})
+        if path == "/users/@me/guilds":
+            return httpx.Response(200, json=[{"id": gid} for gid in member_roles])
+        guild_id = path.split("/")[4]
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(delay)
+        state["in_flight"] -= 1
+        result = member_roles[guild_id]
+        if isinstance(result, int):
+            return httpx.Response(result, json={})
+        return httpx.Response(200, json={"roles": result})
+
+    return httpx.MockTransport(handler), state
+
+
+async def test_async_client_fetches_guild_members_concurrently(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    monkeypatch.setenv("DISCORD_PROD_GUILD_ID", "2")
+    transport, state = _discord_stub(
+        {"1": ["a"], "2": ["b", "c"], "3": ["x"]}, delay=0.05
+    )
+    client = DiscordClient(transport=transport)
+
+    roles = await client.get_user_roles("token")
+
+    assert roles == {"1": ["a"], "2": ["b", "c"]}
+    assert state["max_in_flight"] == 2
+    assert "/api/v10/users/@me/guilds/3/member" not in state["requests"]
+    await client.aclose()
+
+
+async def test_async_client_handles_member_errors(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    monkeypatch.setenv("DISCORD_PROD_GUILD_ID", "2")
+    transport, _ = _discord_stub({"1": 403, "2": ["b"]})
+    client = DiscordClient(transport=transport)
+    assert await client.get_user_roles("token") == {"2": ["b"]}
+
+    transport, _ = _discord_stub({"1": 500})
+    client = DiscordClient(transport=transport)
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_user_roles("token")
+
+
+async def test_async_module_helpers_use_shared_client():
+    transport, state = _discord_stub({})
+    client = DiscordClient(transport=transport)
+    set_client(client)
+    try:
+        assert get_client() is client
+        profile = await get_user_profile_async("token")
+        assert profile == {"id": "42", "username": "foo", "avatar": None}
+        assert await get_user_roles_async("token") == {}
+        # Both calls went through the same pooled AsyncClient
+        assert len(client._clients) == 1
+    finally:
+        await client.aclose()
+        set_client(None)
+    assert get_client() is not client
+
+
+def test_async_client_binds_one_pool_per_event_loop():
+    transport, _ = _discord_stub({})
+    client = DiscordClient(transport=transport)
+
+    async def pooled():
+        await client.get_user_profile("token")
+        return client._client(), list(client._clients.values())
+
+    first, _ = asyncio.run(pooled())
+    second, live = asyncio.run(pooled())
+    # A new loop gets its own client; the closed loop's client is dropped
+    # rather than reused on (or leaked into) the new loop.
+    assert first is not second
+    assert live == [second]
+
+
+def test_sync_helpers_share_pooled_client(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"id": "42", "username": "foo"})
+
+    http = httpx.Client(transport=httpx.MockTransport(handler))
+    set_http_client(http)
+    try:
+        assert get_http_client() is http
+        get_user_profile("token")
+        get_user_profile("token")
+        assert calls == ["/api/v10/users/@me", "/api/v10/users/@me"]
+    finally:
+        set_http_client(None)
+    assert get_http_client() is not http
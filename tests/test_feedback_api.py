@@ -1,5 +1,9 @@
+import json
+from datetime import datetime, timedelta
+
 from fastapi.testclient import TestClient
 
+from feedback_service import api as feedback_api
 from feedback_service import create_app
 from devonboarder import auth_service
 
@@ -60,6 +64,170 @@ def test_submit_and_analytics():
     assert resp.json()["breakdown"]["bug"]["closed"] >= 1
 
 
+def test_analytics_counters_follow_status_moves():
+    client = TestClient(create_app())
+    _seed(client, 3)
+    client.patch("/feedback/1", json={"status": "closed"})
+    client.patch("/feedback/1", json={"status": "closed"})
+    client.patch("/feedback/2", json={"status": "triaged"})
+
+    resp = client.get("/feedback/analytics").json()
+    assert resp == {
+        "total": 3,
+        "breakdown": {
+            "feature": {"closed": 1, "open": 1},
+            "bug": {"triaged": 1},
+        },
+    }
+
+
+def test_reconcile_feedback_counts_repairs_drift(caplog):
+    client = TestClient(create_app())
+    _seed(client, 2)
+    with auth_service.SessionLocal() as db:
+        # Rows written outside the endpoints do not update the counters.
+        db.add(feedback_api.Feedback(type="bug", status="open", description="raw"))
+        db.execute(feedback_api.feedback_count_upsert(db.get_bind(), "idea", "open", 4))
+        db.commit()
+        assert feedback_api.reconcile_feedback_counts(db) == 2
+        assert feedback_api.reconcile_feedback_counts(db) == 0
+    assert "feedback_counts drift" in caplog.text
+
+    resp = client.get("/feedback/analytics").json()
+    assert resp["breakdown"] == {"feature": {"open": 1}, "bug": {"open": 2}}
+    assert resp["total"] == 3
+
+
+def _at(monkeypatch, moment):
+    monkeypatch.setattr(feedback_api, "_utcnow", lambda: moment)
+
+
+def test_timeseries_from_rollups(monkeypatch):
+    client = TestClient(create_app())
+    day = datetime(2026, 3, 1, 9, 30)
+    _at(monkeypatch, day)
+    _seed(client, 4)  # bugs 2 and 4 open on day 1
+    _at(monkeypatch, day + timedelta(days=1))
+    client.patch("/feedback/2", json={"status": "closed"})
+    _at(monkeypatch, day + timedelta(days=3, hours=2))
+    client.post("/feedback", json={"type": "bug", "description": "late"})
+
+    params = {"type": "bug", "status": "open", "periods": 5}
+    resp = client.get("/feedback/analytics/timeseries", params=params).json()
+    assert [p["start"][:10] for p in resp["points"]] == [
+        "2026-02-28",
+        "2026-03-01",
+        "2026-03-02",
+        "2026-03-03",
+        "2026-03-04",
+    ]
+    assert [p["value"] for p in resp["points"]] == [0, 2, 1, 1, 2]
+
+    # A window ending in the past still walks back from the current counters.
+    params["end"] = "2026-03-02T12:00:00"
+    params["periods"] = 2
+    resp = client.get("/feedback/analytics/timeseries", params=params).json()
+    assert [p["value"] for p in resp["points"]] == [2, 1]
+
+    params = {"interval": "hour", "periods": 3, "metric": "entered"}
+    resp = client.get("/feedback/analytics/timeseries", params=params).json()
+    assert [p["value"] for p in resp["points"]] == [0, 0, 1]
+    assert resp["points"][-1]["start"] == "2026-03-04T11:00:00"
+
+
+def test_rebuild_rollups_matches_live_updates(monkeypatch):
+    client = TestClient(create_app())
+    day = datetime(2026, 3, 1, 9, 30)
+    _at(monkeypatch, day)
+    _seed(client, 3)
+    _at(monkeypatch, day + timedelta(days=2))
+    client.patch("/feedback/1", json={"status": "closed"})
+
+    def snapshot():
+        with auth_service.SessionLocal() as db:
+            return {
+                interval: sorted(
+                    (r.bucket, r.type, r.status, r.entered, r.exited)
+                    for r in db.query(model)
+                )
+                for interval, model in feedback_api.ROLLUPS.items()
+            }
+
+    live = snapshot()
+    with auth_service.SessionLocal() as db:
+        assert feedback_api.rebuild_feedback_rollups(db) == 3
+    assert snapshot() == live
+
+
+def _seed(client, count):
+    for i in range(count):
+        kind = "bug" if i % 2 else "feature"
+        client.post("/feedback", json={"type": kind, "description": f"item {i}"})
+
+
+def test_list_feedback_keyset_pages_and_filters():
+    client = TestClient(create_app())
+    _seed(client, 7)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3, "type": "bug"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get("/feedback", params=params).json()
+        seen.extend(item["description"] for item in page["feedback"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["item 1", "item 3", "item 5"]
+
+    page = client.get("/feedback", params={"status": "closed"}).json()
+    assert page == {"feedback": [], "next_cursor": None}
+
+
+def test_list_feedback_without_paging_returns_every_item(monkeypatch):
+    client = TestClient(create_app())
+    _seed(client, 5)
+    monkeypatch.setattr(feedback_api, "DEFAULT_PAGE_SIZE", 2)
+
+    page = client.get("/feedback").json()
+    assert len(page["feedback"]) == 5
+    assert page["next_cursor"] is None
+
+    # A cursor alone opts in to pagination with the default page size.
+    page = client.get("/feedback", params={"cursor": 1}).json()
+    assert [item["id"] for item in page["feedback"]] == [2, 3]
+    assert page["next_cursor"] == 3
+
+
+def test_list_feedback_field_projection():
+    client = TestClient(create_app())
+    _seed(client, 2)
+
+    page = client.get("/feedback", params={"fields": "type,status"}).json()
+    assert page["feedback"] == [
+        {"type": "feature", "status": "open"},
+        {"type": "bug", "status": "open"},
+    ]
+    resp = client.get("/feedback", params={"fields": "id,secret"})
+    assert resp.status_code == 422
+
+
+def test_list_feedback_ndjson_export(monkeypatch):
+    monkeypatch.setattr(feedback_api, "EXPORT_BATCH_SIZE", 2)
+    client = TestClient(create_app())
+    _seed(client, 5)
+
+    resp = client.get("/feedback", params={"format": "ndjson", "fields": "id"})
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["id"] for line in lines] == [1, 2, 3, 4, 5]
+
+    resp = client.get("/feedback", params={"format": "ndjson", "cursor": 3})
+    assert [json.loads(line)["id"] for line in resp.text.splitlines()] == [4, 5]
+
+
 def test_update_nonexistent_feedback():
     """Test updating feedback item that doesn't exist."""
     app = create_app()
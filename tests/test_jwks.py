@@ -0,0 +1,280 @@
+"""Tests for asymmetric JWT signing, JWKS publishing and local verification."""
+
+import time
+
+import httpx
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from devonboarder import auth_service
+from utils.jwks import KeySet, SigningKey, TokenVerifier, bearer_claims
+
+
+def setup_function(function):
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.init_db()
+
+
+def _claims(sub="1", ttl=60):
+    now = int(time.time())
+    return {"sub": sub, "iat": now, "exp": now + ttl}
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+def test_key_set_signs_with_kid_and_verifies(algorithm):
+    keys = KeySet.generate(algorithm)
+    token = keys.sign(_claims())
+
+    header = jwt.get_unverified_header(token)
+    assert header["kid"] == keys.active_kid
+    assert header["alg"] == algorithm
+    assert keys.decode(token)["sub"] == "1"
+
+    (jwk,) = keys.jwks()["keys"]
+    assert jwk["kid"] == keys.active_kid
+    assert jwk["alg"] == algorithm
+    assert "d" not in jwk  # private material is never published
+
+
+def test_rotation_keeps_old_tokens_valid_until_retired():
+    keys = KeySet.generate("EdDSA")
+    old_kid = keys.active_kid
+    old_token = keys.sign(_claims())
+
+    keys.rotate()
+    new_token = keys.sign(_claims())
+    assert jwt.get_unverified_header(new_token)["kid"] != old_kid
+    assert keys.decode(old_token)["sub"] == "1"
+    assert len(keys.jwks()["keys"]) == 2
+
+    keys.retire(old_kid)
+    with pytest.raises(jwt.InvalidTokenError):
+        keys.decode(old_token)
+    with pytest.raises(ValueError):
+        keys.retire(keys.active_kid)
+
+
+def test_key_set_from_directory_uses_newest_key(tmp_path):
+    for kid in ("2026-01", "2026-02"):
+        key = SigningKey.generate(kid, "EdDSA")
+        (tmp_path / f"{kid}.pem").write_bytes(key.to_pem())
+
+    assert KeySet.from_directory(tmp_path).active_kid == "2026-02"
+    pinned = KeySet.from_directory(tmp_path, "2026-01")
+    assert pinned.active_kid == "2026-01"
+    assert pinned.active.algorithm == "EdDSA"
+
+
+def test_verifier_refetches_jwks_for_unknown_kid(monkeypatch):
+    keys = KeySet.generate("RS256")
+    clock = [0.0]
+    calls = []
+
+    def fake_get(url, timeout):
+        calls.append(url)
+        return httpx.Response(200, json=keys.jwks(), request=httpx.Request("GET", url))
+
+    monkeypatch.setattr(httpx, "get", fake_get)
+    verifier = TokenVerifier(
+        "http://auth/.well-known/jwks.json",
+        min_refresh_interval=30,
+        timer=lambda: clock[0],
+    )
+
+    assert verifier.verify(keys.sign(_claims()))["sub"] == "1"
+    assert verifier.verify(keys.sign(_claims(sub="2")))["sub"] == "2"
+    assert len(calls) == 1
+
+    # A rotated key is picked up, but unknown kids cannot force a refetch
+    # more than once per refresh interval.
+    keys.rotate()
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(keys.sign(_claims()))
+    assert len(calls) == 1
+    clock[0] = 31
+    assert verifier.verify(keys.sign(_claims()))["sub"] == "1"
+    assert len(calls) == 2
+
+
+def test_verifier_throttles_failed_fetches_without_holding_lock(monkeypatch):
+    keys = KeySet.generate("EdDSA")
+    clock = [0.0]
+    calls = []
+    verifier = TokenVerifier(
+        "http://auth/.well-known/jwks.json",
+        min_refresh_interval=30,
+        timer=lambda: clock[0],
+    )
+
+    def failing_get(url, timeout):
+        # Other verifications can proceed while the fetch is in flight.
+        assert verifier._lock.acquire(blocking=False)
+        verifier._lock.release()
+        calls.append(url)
+        raise httpx.ConnectError("auth service down")
+
+    monkeypatch.setattr(httpx, "get", failing_get)
+    token = keys.sign(_claims())
+    with pytest.raises(httpx.ConnectError):
+        verifier.verify(token)
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(token)
+    assert len(calls) == 1
+
+    clock[0] = 31
+    with pytest.raises(httpx.ConnectError):
+        verifier.verify(token)
+    assert len(calls) == 2
+
+
+def test_bearer_claims_dependency():
+    keys = KeySet.generate("EdDSA")
+    app = FastAPI()
+    claims_dep = bearer_claims(TokenVerifier(jwks=keys.jwks()))
+
+    @app.get("/whoami")
+    def whoami(claims: dict = Depends(claims_dep)) -> dict:
+        return {"sub": claims["sub"]}
+
+    client = TestClient(app)
+    token = keys.sign(_claims(sub="7"))
+    resp = client.get("/whoami", headers={"Authorization": f"Bearer {token}"})
+    assert resp.json() == {"sub": "7"}
+
+    expired = keys.sign(_claims(ttl=-10))
+    resp = client.get("/whoami", headers={"Authorization": f"Bearer {expired}"})
+    assert resp.status_code == 401
+
+
+def test_auth_service_issues_asymmetric_tokens(monkeypatch):
+    keys = KeySet.generate("EdDSA")
+    monkeypatch.setattr(auth_service, "signing_keys", keys)
+    monkeypatch.setattr(auth_service, "get_user_roles", lambda token: {})
+    monkeypatch.setattr(
+        auth_service,
+        "get_user_profile",
+        lambda token: {"id": "1", "username": "u", "avatar": None},
+    )
+    client = TestClient(auth_service.create_app())
+
+    resp = client.post("/api/register", json={"username": "u", "password": "pw"})
+    token = resp.json()["token"]
+    assert jwt.get_unverified_header(token)["kid"] == keys.active_kid
+
+    published = client.get("/.well-known/jwks.json").json()
+    verifier = TokenVerifier(jwks=published)
+    assert verifier.verify(token)["sub"] == "1"
+
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+
+    hmac_token = jwt.encode(_claims(), "x" * 32)
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {hmac_token}"})
+    assert resp.status_code == 401
+
+
+def test_token_cache_drops_tokens_of_retired_keys(monkeypatch):
+    keys = KeySet.generate("EdDSA")
+    monkeypatch.setattr(auth_service, "signing_keys", keys)
+    monkeypatch.setattr(auth_service, "token_cache", auth_service.TTLCache(8, 60))
+    old_kid = keys.active_kid
+    token = keys.sign(_claims())
+
+    assert auth_service.decode_user_id(token) == 1
+    keys.rotate()
+    assert auth_service.decode_user_id(token) == 1
+    assert auth_service.token_cache.stats()["hits"] == 1
+
+    keys.retire(old_kid)
+    with pytest.raises(auth_service.HTTPException) as exc_info:
+        auth_service.decode_user_id(token)
+    assert exc_info.value.status_code == 401
+    assert len(auth_service.token_cache) == 0
+
+
+def test_jwks_empty_for_hmac_tokens():
+    client = TestClient(auth_service.create_app())
+    assert client.get("/.well-known/jwks.json").json() == {"keys": []}
+
+
+def test_load_signing_keys(monkeypatch, tmp_path):
+    assert auth_service.load_signing_keys() is None
+
+    monkeypatch.setattr(auth_service, "ASYMMETRIC_JWT", True)
+    monkeypatch.setattr(auth_service, "ALGORITHM", "RS256")
+    key = SigningKey.generate("k1", "RS256")
+    (tmp_path / "k1.pem").write_bytes(key.to_pem())
+    monkeypatch.setenv("JWT_KEYS_DIR", str(tmp_path))
+    assert auth_service.load_signing_keys().active_kid == "k1"
+
+    monkeypatch.delenv("JWT_KEYS_DIR")
+    monkeypatch.setattr(auth_service, "APP_ENV", "production")
+    with pytest.raises(RuntimeError, match="JWT_KEYS_DIR"):
+        auth_service.load_signing_keys()
+
+
+def test_other_services_verify_against_jwks_without_private_keys(monkeypatch):
+    from xp import api as xp_api
+
+    keys = KeySet.generate("EdDSA")
+    published = keys.jwks()
+    fetches = []
+
+    def fake_get(url, timeout):
+        fetches.append(url)
+        return httpx.Response(200, json=published, request=httpx.Request("GET", url))
+
+    def no_private_keys():
+        raise AssertionError("only the auth service loads signing keys")
+
+    monkeypatch.setattr(httpx, "get", fake_get)
+    monkeypatch.setattr(auth_service, "ASYMMETRIC_JWT", True)
+    monkeypatch.setattr(auth_service, "signing_keys", None)
+    monkeypatch.setattr(auth_service, "jwks_verifier", None)
+    monkeypatch.setattr(auth_service, "load_signing_keys", no_private_keys)
+    monkeypatch.setattr(auth_service, "get_user_roles", lambda token: {})
+    monkeypatch.setattr(
+        auth_service,
+        "get_user_profile",
+        lambda token: {"id": "1", "username": "u", "avatar": None},
+    )
+    monkeypatch.setenv("JWT_JWKS_URL", "http://auth/.well-known/jwks.json")
+    with auth_service.SessionLocal() as db:
+        db.add(auth_service.User(username="u", password_hash="x"))
+        db.commit()
+    client = TestClient(xp_api.create_app())
+
+    token = keys.sign(_claims(sub="1"))
+    resp = client.post(
+        "/api/user/contribute",
+        json={"description": "docs"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert resp.status_code == 200
+    assert fetches == ["http://auth/.well-known/jwks.json"]
+
+    forged = KeySet.generate("EdDSA").sign(_claims(sub="1"))
+    resp = client.post(
+        "/api/user/contribute",
+        json={"description": "docs"},
+        headers={"Authorization": f"Bearer {forged}"},
+    )
+    assert resp.status_code == 401
+
+
+def test_jwks_fetch_failure_is_service_unavailable(monkeypatch):
+    def failing_get(url, timeout):
+        raise httpx.ConnectError("auth service down")
+
+    monkeypatch.setattr(httpx, "get", failing_get)
+    monkeypatch.setattr(auth_service, "ASYMMETRIC_JWT", True)
+    monkeypatch.setattr(auth_service, "signing_keys", None)
+    monkeypatch.setattr(auth_service, "jwks_verifier", None)
+    monkeypatch.setattr(auth_service, "token_cache", auth_service.TTLCache(8, 60))
+
+    token = KeySet.generate("EdDSA").sign(_claims())
+    with pytest.raises(auth_service.HTTPException) as exc_info:
+        auth_service.decode_user_id(token)
+    assert exc_info.value.status_code == 503
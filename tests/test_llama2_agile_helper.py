@@ -1,52 +1,81 @@
+import asyncio
 import importlib
+import json
+import os
+import re
+
 import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
 
 import llama2_agile_helper.api as agile_api
+from llama2_agile_helper.client import (
+    LlamaBusyError,
+    LlamaClient,
+    LlamaResponseError,
+    LlamaTimeoutError,
+)
+from llama2_agile_helper.grooming import RateLimiter
+from llama2_agile_helper.prompts import PromptError, PromptRegistry
 
+LLM_URL = "http://llm.test/generate"
 
-def _stub_response(text: str):
-    class StubResponse:
-        def __init__(self) -> None:
-            self.status_code = 200
 
-        def json(self) -> dict[str, str]:
-            return {"text": text}
+def _fake_llm(text: str = "summary", *, delay: float = 0.0, tokens=None):
+    """Return a local fake Llama2 server and the state it records."""
+    app = FastAPI()
+    state = {"active": 0, "peak": 0, "requests": []}
+
+    @app.post("/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        state["requests"].append((request.headers.get("authorization"), body))
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            state["active"] -= 1
+        if body.get("stream"):
+            chunks = [json.dumps({"text": t}) + "\n" for t in tokens or [text]]
+            chunks.append(json.dumps({"done": True}) + "\n")
+            return StreamingResponse(iter(chunks), media_type="application/x-ndjson")
+        return {"text": text}
+
+    return app, state
 
-        def raise_for_status(self) -> None:
-            pass
 
-    return StubResponse()
+def _llm_client(fake: FastAPI, **kwargs) -> LlamaClient:
+    kwargs.setdefault("api_key", "key")
+    return LlamaClient(LLM_URL, transport=httpx.ASGITransport(app=fake), **kwargs)
 
 
-def _reload(monkeypatch):
+def _reload(monkeypatch, fake=None, **kwargs):
     importlib.reload(agile_api)
+    if fake is not None:
+        monkeypatch.setattr(agile_api, "llm_client", _llm_client(fake, **kwargs))
     return agile_api.create_app()
 
 
 def test_sprint_summary(monkeypatch):
     monkeypatch.setenv("LLAMA2_API_KEY", "key")
-    app = _reload(monkeypatch)
-    client = TestClient(app)
-
-    def fake_post(url: str, json: dict, headers: dict, *, timeout=None):
-        assert headers["Authorization"] == "Bearer key"
-        assert "prompt" in json
-        return _stub_response("summary")
-
-    monkeypatch.setattr(httpx, "post", fake_post)
+    fake, state = _fake_llm("summary")
+    client = TestClient(_reload(monkeypatch, fake))
 
     resp = client.post("/sprint-summary", json={"notes": "done"})
     assert resp.status_code == 200
     assert resp.json() == {"summary": "summary"}
+    ((auth, body),) = state["requests"]
+    assert auth == "Bearer key"
+    assert "prompt" in body
 
 
 def test_groom_backlog(monkeypatch):
     monkeypatch.setenv("LLAMA2_API_KEY", "key")
-    app = _reload(monkeypatch)
-    client = TestClient(app)
-
-    monkeypatch.setattr(httpx, "post", lambda *a, **kw: _stub_response("tips"))
+    fake, _ = _fake_llm("tips")
+    client = TestClient(_reload(monkeypatch, fake))
 
     resp = client.post("/groom-backlog", json={"tickets": ["bug", "feature"]})
     assert resp.status_code == 200
@@ -55,16 +84,14 @@ def test_groom_backlog(monkeypatch):
 
 def test_timeout(monkeypatch):
     monkeypatch.setenv("LLAMA2_API_KEY", "key")
-    app = _reload(monkeypatch)
-    client = TestClient(app)
-
-    def raise_timeout(*args, **kwargs):
-        raise httpx.TimeoutException("timeout")
-
-    monkeypatch.setattr(httpx, "post", raise_timeout)
+    fake, _ = _fake_llm(delay=0.5)
+    client = TestClient(_reload(monkeypatch, fake, timeout=0.05))
 
     resp = client.post("/sprint-summary", json={"notes": "x"})
     assert resp.status_code == 504
+    stats = client.get("/metrics").json()["llama2_client"]
+    assert stats["timeouts"] == 1
+    assert stats["in_flight"] == 0
 
 
 def test_health_and_missing_key(monkeypatch):
@@ -77,3 +104,372 @@ def test_health_and_missing_key(monkeypatch):
 
     resp = client.post("/sprint-summary", json={"notes": "x"})
     assert resp.status_code == 503
+
+
+def test_api_error_maps_to_bad_gateway(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake = FastAPI()
+    fake.post("/generate")(lambda: StreamingResponse(iter([""]), status_code=500))
+    client = TestClient(_reload(monkeypatch, fake))
+
+    assert client.post("/sprint-summary", json={"notes": "x"}).status_code == 502
+    resp = client.post("/groom-backlog?stream=true", json={"tickets": ["x"]})
+    assert resp.status_code == 502
+
+
+def test_streamed_responses(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm(tokens=["Sprint ", "went ", "well"])
+    client = TestClient(_reload(monkeypatch, fake))
+
+    resp = client.post("/sprint-summary?stream=true", json={"notes": "x"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert resp.text == "Sprint went well"
+
+    resp = client.post("/groom-backlog?stream=true", json={"tickets": ["a"]})
+    assert resp.text == "Sprint went well"
+    assert all(body["stream"] for _, body in state["requests"])
+
+
+async def test_client_caps_concurrency():
+    fake, state = _fake_llm(delay=0.05)
+    llm = _llm_client(fake, max_concurrency=2)
+
+    results = await asyncio.gather(*(llm.generate("p") for _ in range(6)))
+
+    assert results == ["summary"] * 6
+    assert state["peak"] == 2
+    assert llm.stats()["completed"] == 6
+    await llm.aclose()
+
+
+async def test_client_kept_per_event_loop():
+    fake, _ = _fake_llm()
+    llm = _llm_client(fake)
+    loop = asyncio.get_running_loop()
+
+    assert await llm.generate("here") == "summary"
+    own, _ = llm._pools[loop]
+    # A call from another event loop gets its own client and leaves ours open.
+    other = await asyncio.to_thread(asyncio.run, llm.generate("there"))
+    assert other == "summary"
+    assert llm._pools[loop][0] is own
+    assert not own.is_closed
+
+    await llm.aclose()
+    assert own.is_closed
+    assert loop not in llm._pools
+
+
+def test_app_shutdown_closes_llm_client(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, _ = _fake_llm()
+    app = _reload(monkeypatch, fake)
+    with TestClient(app) as client:
+        resp = client.post("/sprint-summary", json={"notes": "n"})
+        assert resp.status_code == 200
+        assert len(agile_api.llm_client._pools) == 1
+    assert len(agile_api.llm_client._pools) == 0
+
+
+async def test_queued_call_dropped_at_deadline():
+    fake, state = _fake_llm(delay=0.3)
+    llm = _llm_client(fake, max_concurrency=1)
+
+    slow = asyncio.create_task(llm.generate("first"))
+    await asyncio.sleep(0.01)
+    with pytest.raises(LlamaBusyError):
+        await llm.generate("second", timeout=0.05)
+    assert await slow == "summary"
+
+    # The dropped call never reached the server.
+    assert [body["prompt"] for _, body in state["requests"]] == ["first"]
+    assert llm.stats()["rejected"] == 1
+    assert llm.stats()["queued"] == 0
+    await llm.aclose()
+
+
+async def test_stream_deadline():
+    fake, _ = _fake_llm(delay=0.5)
+    llm = _llm_client(fake, max_concurrency=1)
+
+    with pytest.raises(LlamaTimeoutError):
+        async for _ in llm.stream("p", timeout=0.05):
+            pass
+    assert llm.stats()["in_flight"] == 0
+    await llm.aclose()
+
+
+async def test_malformed_stream_line_is_an_upstream_error():
+    fake = FastAPI()
+    fake.post("/generate")(
+        lambda: StreamingResponse(iter(['{"text": "a"}\n', "not json\n"]))
+    )
+    llm = _llm_client(fake)
+
+    tokens = []
+    with pytest.raises(LlamaResponseError):
+        async for token in llm.stream("p"):
+            tokens.append(token)
+    assert tokens == ["a"]
+    assert llm.stats()["in_flight"] == 0
+    await llm.aclose()
+
+
+def test_identical_requests_served_from_cache(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm("summary")
+    client = TestClient(_reload(monkeypatch, fake))
+
+    first = client.post("/sprint-summary", json={"notes": "done"})
+    second = client.post("/sprint-summary", json={"notes": "done"})
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == {"summary": "summary"}
+    streamed = client.post("/sprint-summary?stream=true", json={"notes": "done"})
+    assert streamed.text == "summary"
+    assert streamed.headers["X-Cache"] == "HIT"
+    client.post("/sprint-summary", json={"notes": "other"})
+    assert len(state["requests"]) == 2
+
+    stats = client.get("/metrics").json()["response_cache"]
+    assert stats["hits"] == 2
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cache_control_directives(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm("tips")
+    client = TestClient(_reload(monkeypatch, fake))
+    payload = {"tickets": ["a"]}
+
+    client.post("/groom-backlog", json=payload, headers={"Cache-Control": "no-store"})
+    resp = client.post("/groom-backlog", json=payload)
+    assert resp.headers["X-Cache"] == "MISS"
+    resp = client.post(
+        "/groom-backlog", json=payload, headers={"Cache-Control": "no-cache"}
+    )
+    assert resp.headers["X-Cache"] == "MISS"
+    assert len(state["requests"]) == 3
+    assert client.post("/groom-backlog", json=payload).headers["X-Cache"] == "HIT"
+
+
+def test_streamed_response_is_cached(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm(tokens=["a", "b"])
+    client = TestClient(_reload(monkeypatch, fake))
+
+    client.post("/sprint-summary?stream=true", json={"notes": "x"})
+    resp = client.post("/sprint-summary", json={"notes": "x"})
+    assert resp.json() == {"summary": "ab"}
+    assert len(state["requests"]) == 1
+
+
+def test_disk_cache_survives_restart(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    monkeypatch.setenv("LLAMA2_CACHE_DIR", str(tmp_path))
+    fake, state = _fake_llm("summary")
+    client = TestClient(_reload(monkeypatch, fake))
+    client.post("/sprint-summary", json={"notes": "x"})
+    assert list((tmp_path / "retro_analysis.prompt").glob("*.json"))
+
+    client = TestClient(_reload(monkeypatch, fake))
+    resp = client.post("/sprint-summary", json={"notes": "x"})
+    assert resp.headers["X-Cache"] == "HIT"
+    assert len(state["requests"]) == 1
+    assert client.get("/metrics").json()["response_cache"]["disk_hits"] == 1
+
+
+def _prompts(monkeypatch, directory, **files):
+    """Point the service at a registry of ``files`` in ``directory``."""
+    for name, text in files.items():
+        _write_prompt(directory / name, text)
+    registry = PromptRegistry(directory, poll_interval=0)
+    registry.load()
+    monkeypatch.setattr(agile_api, "prompt_registry", registry)
+    return registry
+
+
+def _write_prompt(path, text, mtime_offset=0):
+    path.write_text(text)
+    # Coarse filesystem timestamps could hide a quick rewrite.
+    stamp = path.stat().st_mtime_ns + mtime_offset * 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_prompt_change_invalidates_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    monkeypatch.setenv("LLAMA2_CACHE_DIR", str(tmp_path / "cache"))
+    fake, state = _fake_llm("summary")
+    client = TestClient(_reload(monkeypatch, fake))
+    prompt = tmp_path / "retro_analysis.prompt"
+    _prompts(monkeypatch, tmp_path, **{prompt.name: "Summarize v1"})
+
+    first = client.post("/sprint-summary", json={"notes": "x"})
+    _write_prompt(prompt, "Summarize v2", mtime_offset=1)
+    resp = client.post("/sprint-summary", json={"notes": "x"})
+    assert resp.headers["X-Cache"] == "MISS"
+    assert resp.headers["X-Prompt-Version"] != first.headers["X-Prompt-Version"]
+    assert state["requests"][-1][1]["prompt"].startswith("Summarize v2")
+    assert len(list((tmp_path / "cache").rglob("*.json"))) == 1
+    metrics = client.get("/metrics").json()
+    assert metrics["response_cache"]["invalidations"] == 1
+    assert metrics["prompts"]["reloads"] == 1
+
+
+def test_prompts_loaded_once(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, _ = _fake_llm("summary")
+    client = TestClient(_reload(monkeypatch, fake))
+    registry = agile_api.prompt_registry
+    version = registry.versions()["retro_analysis.prompt"]
+
+    reads = []
+    monkeypatch.setattr(registry, "_read", lambda *a: reads.append(a))
+    resp = client.post("/sprint-summary", json={"notes": "x"})
+    assert resp.headers["X-Prompt-Version"] == version
+    assert reads == []
+    assert (
+        "ticket_classifier.prompt"
+        in client.get("/metrics").json()["prompts"]["versions"]
+    )
+
+
+def test_invalid_prompt_edit_keeps_previous_version(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm("summary")
+    client = TestClient(_reload(monkeypatch, fake))
+    prompt = tmp_path / "retro_analysis.prompt"
+    _prompts(monkeypatch, tmp_path, **{prompt.name: "Summarize"})
+
+    _write_prompt(prompt, "  \n", mtime_offset=1)
+    resp = client.post("/sprint-summary", json={"notes": "x"})
+    assert resp.status_code == 200
+    assert state["requests"][-1][1]["prompt"].startswith("Summarize")
+    errors = client.get("/metrics").json()["prompts"]["errors"]
+    assert errors == {prompt.name: f"{prompt.name} is empty"}
+
+    resp = client.post("/groom-backlog", json={"tickets": ["a"]})
+    assert resp.status_code == 500
+
+
+def test_invalid_prompt_fails_at_startup(tmp_path):
+    (tmp_path / "bad.prompt").write_bytes(b"\xff\xfe")
+    (tmp_path / "notes.md").write_text("")
+    registry = PromptRegistry(tmp_path)
+    with pytest.raises(PromptError, match="not valid UTF-8"):
+        registry.load()
+    registry.load(strict=False)
+    assert registry.stats()["templates"] == 0
+
+
+def _long_notes(sections: int = 4) -> str:
+    return "\n\n".join(f"# Topic {s}\n" + "detail " * 40 for s in range(sections))
+
+
+def test_long_notes_summarized_in_chunks(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm("summary", delay=0.01)
+    client = TestClient(_reload(monkeypatch, fake))
+    monkeypatch.setattr(agile_api, "CHUNK_TOKENS", 80)
+
+    resp = client.post("/sprint-summary", json={"notes": _long_notes()})
+    assert resp.status_code == 200
+    assert resp.json() == {"summary": "summary"}
+    prompts = [body["prompt"] for _, body in state["requests"]]
+    assert len(prompts) == 5
+    assert state["peak"] <= agile_api.CHUNK_CONCURRENCY
+    assert "## Part 4\nsummary" in prompts[-1]
+
+
+def test_progress_stream(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, state = _fake_llm(tokens=["All ", "good"])
+    client = TestClient(_reload(monkeypatch, fake))
+    monkeypatch.setattr(agile_api, "CHUNK_TOKENS", 80)
+
+    resp = client.post("/sprint-summary?progress=true", json={"notes": _long_notes(3)})
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert events[0] == {"stage": "split", "round": 1, "chunks": 3}
+    assert [e["completed"] for e in events if e.get("stage") == "map"] == [1, 2, 3]
+    assert events[4] == {"stage": "reduce", "partials": 3}
+    assert events[5:] == [{"text": "All "}, {"text": "good"}, {"done": True}]
+
+    # The combined summary is cached.
+    resp = client.post("/sprint-summary?progress=true", json={"notes": _long_notes(3)})
+    assert resp.headers["X-Cache"] == "HIT"
+    assert [json.loads(line) for line in resp.text.splitlines()] == [
+        {"text": "All good"},
+        {"done": True},
+    ]
+    assert len(state["requests"]) == 4
+
+
+def test_progress_stream_reports_errors(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake = FastAPI()
+    fake.post("/generate")(lambda: StreamingResponse(iter([""]), status_code=500))
+    client = TestClient(_reload(monkeypatch, fake))
+    monkeypatch.setattr(agile_api, "CHUNK_TOKENS", 80)
+
+    resp = client.post("/sprint-summary?progress=true", json={"notes": _long_notes(3)})
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert events[-1] == {"error": "Llama2 API error"}
+    assert (
+        client.post("/sprint-summary", json={"notes": _long_notes(3)}).status_code
+        == 502
+    )
+
+
+def _fake_classifier():
+    """Return a fake Llama2 server that classifies numbered tickets."""
+    app = FastAPI()
+    prompts = []
+
+    @app.post("/generate")
+    async def generate(request: Request):
+        prompt = (await request.json())["prompt"]
+        prompts.append(prompt)
+        tickets = re.findall(r"^(\d+)\. (.*)$", prompt, re.MULTILINE)
+        if any("explode" in text for _, text in tickets):
+            return StreamingResponse(iter([""]), status_code=500)
+        items = [
+            {"ticket": int(n), "priority": "high" if "bug" in text else "low"}
+            for n, text in tickets
+        ]
+        return {"text": json.dumps(items)}
+
+    return app, prompts
+
+
+def test_batch_grooming(monkeypatch):
+    monkeypatch.setenv("LLAMA2_API_KEY", "key")
+    fake, prompts = _fake_classifier()
+    client = TestClient(_reload(monkeypatch, fake))
+    monkeypatch.setattr(agile_api, "GROOM_SHARD_SIZE", 2)
+    monkeypatch.setattr(agile_api, "groom_limiter", RateLimiter(0))
+
+    tickets = ["bug: crash", "Docs", "explode", "BUG:  crash", "Theme"]
+    resp = client.post("/groom-backlog/batch", json={"tickets": tickets})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [r.get("priority") for r in data["results"]] == [
+        "high",
+        "low",
+        None,
+        "high",
+        None,
+    ]
+    assert data["results"][2]["error"] == "Llama2 API error"
+    assert data["duplicates"] == 1
+    assert len(prompts) == 2
+    assert [s.get("error") for s in data["shards"]] == [None, "Llama2 API error"]
+    assert all(s["latency_ms"] >= 0 for s in data["shards"])
+
+    # Classified tickets come from the cache; only the failed shard is retried.
+    data = client.post("/groom-backlog/batch", json={"tickets": tickets}).json()
+    assert data["cached"] == 2
+    assert len(prompts) == 3
+    assert client.get("/metrics").json()["ticket_cache"]["hits"] == 2
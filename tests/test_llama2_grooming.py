@@ -0,0 +1,93 @@
+import asyncio
+import json
+import re
+import time
+
+import pytest
+
+from llama2_agile_helper.grooming import (
+    RateLimiter,
+    groom,
+    parse_classification,
+    shard_tickets,
+)
+from utils.cache import TTLCache
+
+
+def test_shard_tickets_respects_size_and_budget():
+    assert shard_tickets(["a"] * 5, 100, 2) == [[0, 1], [2, 3], [4]]
+    # Each long ticket alone fills the token budget.
+    assert shard_tickets(["x" * 40, "y" * 40, "z"], 12, 10) == [[0], [1], [2]]
+
+
+def test_parse_classification():
+    reply = 'Sure:\n```json\n[{"ticket": 2, "priority": "low", "labels": ["ui"]},\n'
+    reply += '{"ticket": 1, "priority": "high", "labels": "bug"}, {"ticket": 9}]\n```'
+    assert parse_classification(reply, 2) == {
+        0: {"priority": "high", "labels": ["bug"]},
+        1: {"priority": "low", "labels": ["ui"]},
+    }
+    with pytest.raises(ValueError):
+        parse_classification("no idea", 2)
+
+
+async def test_rate_limiter_spaces_acquisitions():
+    limiter = RateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire()
+    assert time.monotonic() - started >= 0.09
+    assert limiter.waited > 0
+
+
+async def test_groom_dedupes_and_caches():
+    prompts = []
+
+    async def generate(prompt: str) -> str:
+        prompts.append(prompt)
+        count = len(re.findall(r"^\d+\. ", prompt, re.MULTILINE))
+        return json.dumps(
+            [{"ticket": n, "priority": "low"} for n in range(1, count + 1)]
+        )
+
+    cache = TTLCache(maxsize=100, ttl=60)
+    kwargs = dict(
+        cache=cache,
+        cache_scope="v1",
+        limiter=RateLimiter(0),
+        max_tokens=1000,
+        shard_size=2,
+        concurrency=2,
+    )
+    tickets = ["Fix login", "fix  LOGIN", "Add docs", "Dark mode"]
+    result = await groom(generate, "T", tickets, **kwargs)
+    assert result["duplicates"] == 1
+    assert len(result["shards"]) == 2
+    assert [r["priority"] for r in result["results"]] == ["low"] * 4
+    assert result["results"][1]["ticket"] == "fix  LOGIN"
+
+    result = await groom(generate, "T", ["Add docs", "New one"], **kwargs)
+    assert result["cached"] == 1
+    assert [r["cached"] for r in result["results"]] == [True, False]
+    assert len(prompts) == 3
+
+
+async def test_groom_wait_includes_queue_for_a_shard_slot():
+    async def generate(prompt: str) -> str:
+        await asyncio.sleep(0.05)
+        return json.dumps([{"ticket": 1, "priority": "low"}])
+
+    result = await groom(
+        generate,
+        "T",
+        ["one", "two"],
+        cache=TTLCache(maxsize=10, ttl=60),
+        cache_scope="v1",
+        limiter=RateLimiter(0),
+        max_tokens=1000,
+        shard_size=1,
+        concurrency=1,
+    )
+    waits = sorted(shard["wait_ms"] for shard in result["shards"])
+    # The second shard waited for the first to release the only slot.
+    assert waits[0] < 25 <= waits[1]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from llama2_agile_helper.summarize import condense, estimate_tokens, split_notes
+
+
+def _notes(sections: int, lines: int = 5) -> str:
+    return "\n\n".join(
+        f"# Section {s}\n" + "\n".join(f"note {s}.{n} " * 4 for n in range(lines))
+        for s in range(sections)
+    )
+
+
+def test_short_notes_are_one_chunk():
+    assert split_notes("# Retro\nAll good.", 100) == ["# Retro\nAll good."]
+
+
+def test_split_prefers_section_boundaries():
+    chunks = split_notes(_notes(4), 120)
+    assert all(estimate_tokens(chunk) <= 120 for chunk in chunks)
+    assert all(chunk.startswith("# Section") for chunk in chunks)
+    assert "".join(chunks).count("# Section") == 4
+
+
+def test_split_oversized_line():
+    chunks = split_notes("x" * 1000, 50)
+    assert [len(chunk) for chunk in chunks] == [200] * 5
+
+
+async def test_condense_maps_chunks_concurrently_and_reduces():
+    active = peak = 0
+    prompts = []
+
+    async def generate(prompt: str) -> str:
+        nonlocal active, peak
+        prompts.append(prompt)
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f"partial {len(prompts)}"
+
+    events = []
+    prompt = await condense(
+        generate,
+        "Summarize",
+        _notes(6),
+        max_tokens=120,
+        concurrency=2,
+        on_progress=events.append,
+    )
+
+    chunks = len(split_notes(_notes(6), 120))
+    assert len(prompts) == chunks
+    assert peak == 2
+    assert all(p.startswith("Summarize\n\nPart ") for p in prompts)
+    assert prompt.startswith("Summarize\n\nThe notes were summarized")
+    assert "## Part 1\npartial" in prompt
+    assert events[0] == {"stage": "split", "round": 1, "chunks": chunks}
+    assert events[-2]["completed"] == chunks
+    assert events[-1] == {"stage": "reduce", "partials": chunks}
+
+
+async def test_condense_short_notes_skip_generation():
+    async def generate(prompt: str) -> str:
+        raise AssertionError("no generation expected")
+
+    assert await condense(generate, "T", "notes", max_tokens=10) == "T\nnotes"
+
+
+async def test_condense_failure_cancels_remaining_chunks():
+    started = []
+
+    async def generate(prompt: str) -> str:
+        started.append(prompt)
+        if len(started) == 1:
+            raise RuntimeError("boom")
+        await asyncio.sleep(1)
+        return "late"
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await condense(generate, "T", _notes(6), max_tokens=120, concurrency=3)
+    assert len(started) <= 3
@@ -0,0 +1,139 @@
+"""Tests for the bounded password hashing pool."""
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from devonboarder import auth_service
+from devonboarder.password_hashing import (
+    HashQueueFull,
+    PasswordHasher,
+    calibrate_rounds,
+    configure_rounds,
+)
+
+FAST_CONTEXT = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4)
+
+
+def setup_function(function):
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.init_db()
+
+
+def test_inline_hash_and_verify_record_latency():
+    hasher = PasswordHasher(FAST_CONTEXT, workers=0, queue_size=2)
+    hashed = hasher.hash("pw")
+    assert hasher.verify("pw", hashed)
+    assert not hasher.verify("other", hashed)
+
+    stats = hasher.stats()
+    assert stats["hash_count"] == 1
+    assert stats["verify_count"] == 2
+    assert stats["hash_max_ms"] > 0
+    assert stats["in_flight"] == 0
+    assert stats["rejected"] == 0
+
+
+def test_full_queue_rejects_with_retry_after():
+    hasher = PasswordHasher(FAST_CONTEXT, queue_size=1, retry_after=7)
+    hasher._slots.acquire()  # occupy the only slot
+    with pytest.raises(HashQueueFull) as excinfo:
+        hasher.hash("pw")
+    assert excinfo.value.retry_after == 7
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_process_pool_hash_and_verify():
+    hasher = PasswordHasher(FAST_CONTEXT, workers=1, queue_size=4)
+    try:
+        hashed = hasher.hash("pw")
+        assert FAST_CONTEXT.verify("pw", hashed)
+        assert hasher.verify("pw", hashed)
+        assert hasher.stats()["in_flight"] == 0
+    finally:
+        hasher.shutdown()
+
+
+async def test_async_hash_and_verify():
+    hasher = PasswordHasher(FAST_CONTEXT, workers=0)
+    hashed = await hasher.hash_async("pw")
+    assert await hasher.verify_async("pw", hashed)
+
+    pooled = PasswordHasher(FAST_CONTEXT, workers=1)
+    try:
+        hashed = await pooled.hash_async("pw")
+        assert await pooled.verify_async("pw", hashed)
+    finally:
+        pooled.shutdown()
+
+
+def test_login_returns_503_when_hashing_saturated(monkeypatch):
+    client = TestClient(auth_service.create_app())
+    resp = client.post("/api/register", json={"username": "u", "password": "pw"})
+    assert resp.status_code == 200
+
+    monkeypatch.setattr(
+        auth_service,
+        "password_hasher",
+        PasswordHasher(FAST_CONTEXT, queue_size=1, retry_after=3),
+    )
+    auth_service.password_hasher._slots.acquire()
+    resp = client.post("/api/login", json={"username": "u", "password": "pw"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "3"
+
+    metrics = client.get("/metrics").json()["password_hashing"]
+    assert metrics["rejected"] == 1
+
+
+def test_verify_and_update_rehashes_weaker_hashes():
+    context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4)
+    old_hash = context.hash("pw")
+    configure_rounds(context, 5, max_rounds=6)
+    hasher = PasswordHasher(context)
+
+    verified, new_hash = hasher.verify_and_update("pw", old_hash)
+    assert verified
+    assert new_hash is not None and new_hash.startswith("$2b$05$")
+    assert hasher.verify_and_update("pw", new_hash) == (True, None)
+    assert hasher.verify_and_update("other", old_hash) == (False, None)
+
+    stats = hasher.stats()
+    assert stats["rehashed"] == 1
+    assert stats["rounds"] == 5
+
+
+def test_calibrate_rounds_extrapolates_and_clamps():
+    def probe(rounds):
+        return 50.0  # ms at the probe rounds; each extra round doubles it
+
+    assert calibrate_rounds(250, min_rounds=10, max_rounds=14, measure=probe) == 12
+    assert calibrate_rounds(10, min_rounds=10, max_rounds=14, measure=probe) == 10
+    assert calibrate_rounds(10_000, min_rounds=10, max_rounds=14, measure=probe) == 14
+
+
+def test_login_upgrades_stored_hash(monkeypatch):
+    configure_rounds(auth_service.pwd_context, 5)
+    with auth_service.SessionLocal() as db:
+        db.add(auth_service.User(username="old", password_hash=FAST_CONTEXT.hash("pw")))
+        db.commit()
+
+    client = TestClient(auth_service.create_app())
+    resp = client.post("/api/login", json={"username": "old", "password": "pw"})
+    assert resp.status_code == 200
+
+    with auth_service.SessionLocal() as db:
+        stored = db.query(auth_service.User).filter_by(username="old").one()
+        assert stored.password_hash.startswith("$2b$05$")
+    assert client.get("/metrics").json()["password_hashing"]["rehashed"] == 1
+
+    resp = client.post("/api/login", json={"username": "old", "password": "pw"})
+    assert resp.status_code == 200
+    assert client.get("/metrics").json()["password_hashing"]["rehashed"] == 1
+
+
+def test_create_app_calibrates_rounds(monkeypatch):
+    monkeypatch.setattr(auth_service, "BCRYPT_TARGET_MS", 100.0)
+    monkeypatch.setattr(auth_service, "calibrate_rounds", lambda *a, **kw: 11)
+    auth_service.create_app()
+    assert auth_service.pwd_context.to_dict()["bcrypt__default_rounds"] == 11
@@ -0,0 +1,74 @@
+"""Query-plan regression tests for the hot lookup indexes.
+
+SQLite plans are always checked. Set ``TEST_POSTGRES_URL`` to a scratch
+database to check the same queries against PostgreSQL.
+"""
+
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from devonboarder import auth_service
+from feedback_service.api import Feedback
+
+
+def _queries():
+    return [
+        (
+            select(auth_service.User.id).where(auth_service.User.username == "x"),
+            {"sqlite": "sqlite_autoindex_users_1", "postgresql": "users_username_key"},
+        ),
+        (auth_service.has_contribution_query(1), "ix_contributions_user_id"),
+        (auth_service.contribution_descriptions_query(1), "ix_contributions_user_id"),
+        (
+            select(auth_service.XPEvent.xp).where(auth_service.XPEvent.user_id == 1),
+            "ix_xp_events_user_id",
+        ),
+        (
+            select(Feedback.id).where(
+                Feedback.type == "bug", Feedback.status == "open"
+            ),
+            "ix_feedback_type_status",
+        ),
+    ]
+
+
+def _plan(engine, statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+            return "\n".join(row[-1] for row in rows)
+        # Tiny test tables would otherwise always be scanned sequentially.
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        return json.dumps(plan)
+
+
+def _assert_indexes_used(engine):
+    for statement, expected in _queries():
+        if isinstance(expected, dict):
+            expected = expected[engine.dialect.name]
+        plan = _plan(engine, statement)
+        assert expected in plan, f"{expected} not used:\n{statement}\n{plan}"
+
+
+def test_sqlite_query_plans_use_indexes():
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.Base.metadata.create_all(bind=auth_service.engine)
+    _assert_indexes_used(auth_service.engine)
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set"
+)
+def test_postgres_query_plans_use_indexes():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    auth_service.Base.metadata.create_all(bind=engine)
+    try:
+        _assert_indexes_used(engine)
+    finally:
+        auth_service.Base.metadata.drop_all(bind=engine)
+        engine.dispose()
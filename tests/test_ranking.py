@@ -0,0 +1,59 @@
+"""Tests for the in-memory XP ranking index."""
+
+import random
+from bisect import bisect_left
+
+from utils.ranking import RankingIndex, _SortedKeys
+
+
+def test_update_moves_user_and_keeps_order():
+    index = RankingIndex()
+    index.load([(1, "a", 10), (2, "b", 30), (3, "c", 20)])
+    assert [row[2] for row in index.page(0, 10)] == ["b", "c", "a"]
+
+    index.update(1, "a", 40)
+    index.update(4, "d", 5)
+    assert [row[2] for row in index.page(0, 10)] == ["a", "b", "c", "d"]
+    assert len(index) == 4
+    assert index.get(1) == ("a", 40)
+    assert index.get(99) is None
+
+
+def test_ties_share_rank_across_pages():
+    index = RankingIndex()
+    index.load([(1, "a", 50), (2, "b", 50), (3, "c", 50), (4, "d", 10)])
+    assert index.page(2, 2) == [(1, 3, "c", 50), (4, 4, "d", 10)]
+    assert index.rank_for_xp(50) == 1
+    assert index.rank_for_xp(10) == 4
+    assert index.rank_for_xp(0) == 5
+    assert index.page(10, 5) == []
+
+
+def test_is_stale():
+    index = RankingIndex()
+    assert index.is_stale(60)
+    index.load([])
+    assert not index.is_stale(60)
+    assert not index.is_stale(0)
+
+
+def test_sorted_keys_match_sorted_list_across_blocks():
+    rng = random.Random(7)
+    keys = {(-rng.randrange(50), user_id) for user_id in range(60)}
+    blocked = _SortedKeys(keys, load=4)
+    for step in range(400):
+        if keys and step % 3 == 0:
+            key = rng.choice(sorted(keys))
+            keys.remove(key)
+            blocked.remove(key)
+        else:
+            key = (-rng.randrange(50), rng.randrange(1000))
+            if key not in keys:
+                keys.add(key)
+                blocked.add(key)
+        expected = sorted(keys)
+        assert len(blocked) == len(expected)
+        start = rng.randrange(len(expected) + 2)
+        assert list(blocked.islice(start, start + 7)) == expected[start : start + 7]
+        probe = (-rng.randrange(50),)
+        assert blocked.bisect_left(probe) == bisect_left(expected, probe)
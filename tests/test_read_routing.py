@@ -0,0 +1,88 @@
+"""Tests for routing read-only endpoints to a database replica."""
+
+from fastapi.testclient import TestClient
+
+from devonboarder import auth_service
+from feedback_service import create_app as create_feedback_app
+from feedback_service.api import Feedback, reconcile_feedback_counts
+
+
+def setup_function(function):
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.Base.metadata.create_all(bind=auth_service.engine)
+    auth_service.get_user_roles = lambda token: {}
+    auth_service.get_user_profile = lambda token: {
+        "id": "0",
+        "username": "",
+        "avatar": None,
+    }
+
+
+def _replica(tmp_path):
+    auth_service.init_read_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    auth_service.Base.metadata.create_all(bind=auth_service.read_engine)
+    return auth_service.ReadSessionLocal
+
+
+def test_reads_without_replica_use_primary():
+    client = TestClient(create_feedback_app())
+    client.post("/feedback", json={"type": "bug", "description": "primary"})
+    assert len(client.get("/feedback").json()["feedback"]) == 1
+    assert auth_service.read_routing["primary"] == 1
+
+
+def test_read_only_endpoints_use_replica(tmp_path):
+    ReplicaSession = _replica(tmp_path)
+    with ReplicaSession() as db:
+        db.add(Feedback(type="idea", description="replica", status="open"))
+        db.commit()
+        reconcile_feedback_counts(db)
+
+    client = TestClient(create_feedback_app())
+    client.post("/feedback", json={"type": "bug", "description": "primary"})
+    items = client.get("/feedback").json()["feedback"]
+    assert [item["description"] for item in items] == ["replica"]
+    assert client.get("/feedback/analytics").json()["total"] == 1
+    assert auth_service.read_routing["replica"] == 2
+
+
+def test_recent_writer_reads_from_primary(tmp_path):
+    _replica(tmp_path)
+    client = TestClient(auth_service.create_app())
+    client.post("/api/register", json={"username": "ann", "password": "pw"})
+    token = client.post(
+        "/api/login", json={"username": "ann", "password": "pw"}
+    ).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    status = client.get("/api/user/onboarding-status", headers=headers).json()
+    assert status == {"status": "pending"}
+
+    resp = client.post(
+        "/api/user/contributions", json={"description": "docs"}, headers=headers
+    )
+    assert resp.status_code == 200
+    # The replica has not seen the contribution, but the writer reads the primary.
+    status = client.get("/api/user/onboarding-status", headers=headers).json()
+    assert status == {"status": "complete"}
+    assert auth_service.read_routing["read_after_write"] == 1
+
+    auth_service.recent_writers.clear()
+    status = client.get("/api/user/onboarding-status", headers=headers).json()
+    assert status == {"status": "pending"}
+
+
+def test_unreachable_replica_falls_back_to_primary(tmp_path):
+    auth_service.init_read_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    client = TestClient(create_feedback_app())
+    client.post("/feedback", json={"type": "bug", "description": "primary"})
+
+    assert len(client.get("/feedback").json()["feedback"]) == 1
+    assert len(client.get("/feedback").json()["feedback"]) == 1
+    # The replica is not retried until READ_REPLICA_RETRY_SECONDS pass.
+    assert auth_service.read_routing["fallback"] == 1
+    assert auth_service.read_routing["primary"] == 2
+
+    metrics = TestClient(auth_service.create_app()).get("/metrics").json()
+    assert metrics["read_routing"]["fallback"] == 1
+    assert "db_read_pool" in metrics
@@ -0,0 +1,211 @@
+"""Tests for the Discord role-sync worker and the snapshot read path."""
+
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from devonboarder import auth_service
+from discord_integration import role_sync
+from discord_integration.api import create_app
+from utils.discord import DiscordClient
+
+
+def setup_function(function):
+    auth_service.Base.metadata.drop_all(bind=auth_service.engine)
+    auth_service.init_db()
+    auth_service.discord_cache.clear()
+
+
+def _add_users(*users):
+    with auth_service.SessionLocal() as db:
+        for name, token in users:
+            db.add(
+                auth_service.User(username=name, password_hash="", discord_token=token)
+            )
+        db.commit()
+        return {u.username: u.id for u in db.query(auth_service.User)}
+
+
+def _discord_client():
+    """Return a DiscordClient answering with roles named after the token."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        if token == "broken":
+            return httpx.Response(500, json={})
+        path = request.url.path.removeprefix("/api/v10")
+        if path == "/users/@me":
+            return httpx.Response(200, json={"id": token, "username": token})
+        if path == "/users/@me/guilds":
+            return httpx.Response(200, json=[{"id": "1"}])
+        if token == "limited":
+            return httpx.Response(429, headers={"Retry-After": "60"}, json={})
+        return httpx.Response(200, json={"roles": [f"role-{token}"]})
+
+    return DiscordClient(transport=httpx.MockTransport(handler))
+
+
+def _snapshot(user_id):
+    with auth_service.SessionLocal() as db:
+        return db.get(auth_service.DiscordRoleSnapshot, user_id)
+
+
+async def test_worker_refreshes_snapshots_paced_over_interval(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    ids = _add_users(("a", "ta"), ("b", "tb"), ("c", None), ("d", "broken"))
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    worker = role_sync.RoleSyncWorker(
+        interval=30, batch_size=10, client=_discord_client(), sleep=sleep
+    )
+    assert await worker.run_once() == 3
+
+    assert sleeps == [10.0, 10.0, 10.0]
+    assert _snapshot(ids["a"]).roles == {"1": ["role-ta"]}
+    assert _snapshot(ids["b"]).profile["username"] == "tb"
+    assert _snapshot(ids["d"]) is None
+    assert worker.stats()["synced"] == 2
+    assert worker.stats()["failed"] == 1
+
+    # Ordered by last attempt; the failed user went to the back of the queue.
+    assert [user_id for user_id, _ in role_sync.due_users(10)] == [
+        ids["a"],
+        ids["b"],
+        ids["d"],
+    ]
+
+
+async def test_failing_users_do_not_starve_the_rest(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    ids = _add_users(("x", "broken"), ("y", "broken"), ("z", "tz"))
+
+    async def sleep(seconds):
+        pass
+
+    worker = role_sync.RoleSyncWorker(
+        interval=0, batch_size=2, client=_discord_client(), sleep=sleep
+    )
+    await worker.run_once()
+    assert _snapshot(ids["z"]) is None
+    await worker.run_once()
+    assert _snapshot(ids["z"]).roles == {"1": ["role-tz"]}
+    with auth_service.SessionLocal() as db:
+        failures = {
+            name: db.get(auth_service.DiscordRoleSyncFailure, ids[name]).failures
+            for name in ("x", "y")
+        }
+    assert failures == {"x": 2, "y": 1}
+
+
+async def test_unexpected_errors_only_fail_that_user(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    ids = _add_users(("bad", "tbad"), ("ok", "tok"))
+    store = auth_service.store_role_snapshot
+
+    def flaky_store(db, user_id, token, roles, profile):
+        if token == "tbad":
+            raise KeyError("roles")
+        store(db, user_id, token, roles, profile)
+
+    async def sleep(seconds):
+        pass
+
+    monkeypatch.setattr(auth_service, "store_role_snapshot", flaky_store)
+    worker = role_sync.RoleSyncWorker(
+        interval=0, batch_size=10, client=_discord_client(), sleep=sleep
+    )
+    assert await worker.run_once() == 2
+    assert worker.stats()["failed"] == 1
+    assert _snapshot(ids["bad"]) is None
+    assert _snapshot(ids["ok"]).roles == {"1": ["role-tok"]}
+
+
+async def test_rate_limited_lookup_keeps_previous_snapshot(monkeypatch):
+    monkeypatch.setenv("DISCORD_DEV_GUILD_ID", "1")
+    ids = _add_users(("admin", "limited"))
+    _store(ids["admin"], "limited", {"1": ["admin-role"]}, age=600)
+
+    worker = role_sync.RoleSyncWorker(client=_discord_client())
+    assert not await worker.sync_user(ids["admin"], "limited")
+
+    snapshot = _snapshot(ids["admin"])
+    assert snapshot.roles == {"1": ["admin-role"]}
+    assert time.time() - snapshot.refreshed_at >= 600
+    with auth_service.SessionLocal() as db:
+        failure = db.get(auth_service.DiscordRoleSyncFailure, ids["admin"])
+        assert failure.failures == 1
+
+
+def _store(user_id, token, roles, *, age=0.0):
+    with auth_service.SessionLocal() as db:
+        auth_service.store_role_snapshot(db, user_id, token, roles, {})
+        db.commit()
+        snapshot = db.get(auth_service.DiscordRoleSnapshot, user_id)
+        snapshot.refreshed_at = time.time() - age
+        db.commit()
+
+
+def test_roles_read_snapshot_before_discord(monkeypatch):
+    ids = _add_users(("fresh", "t1"), ("stale", "t2"), ("relinked", "t3"))
+    _store(ids["fresh"], "t1", {"1": ["synced"]})
+    _store(ids["stale"], "t2", {"1": ["old"]}, age=10_000)
+    _store(ids["relinked"], "previous-token", {"1": ["old"]})
+    calls = []
+
+    def live_roles(token):
+        calls.append(token)
+        return {"1": ["live"]}
+
+    monkeypatch.setattr("discord_integration.api.get_user_roles", live_roles)
+    client = TestClient(create_app())
+
+    assert client.get("/roles?username=fresh").json() == {"roles": {"1": ["synced"]}}
+    assert client.get("/roles?username=stale").json() == {"roles": {"1": ["live"]}}
+    assert client.get("/roles?username=relinked").json() == {"roles": {"1": ["live"]}}
+    assert calls == ["t2", "t3"]
+
+
+def test_batch_roles_use_snapshots(monkeypatch):
+    ids = _add_users(("fresh", "t1"), ("new", "t2"))
+    _store(ids["fresh"], "t1", {"1": ["synced"]})
+    looked_up = []
+
+    async def live_roles(token):
+        looked_up.append(token)
+        return {"1": ["live"]}
+
+    monkeypatch.setattr("discord_integration.api.get_user_roles_async", live_roles)
+    client = TestClient(create_app())
+    resp = client.post("/roles/batch", json={"usernames": ["fresh", "new"]})
+    assert resp.json()["roles"] == {"fresh": {"1": ["synced"]}, "new": {"1": ["live"]}}
+    assert looked_up == ["t2"]
+
+
+def test_current_user_uses_snapshot(monkeypatch):
+    ids = _add_users(("synced", "dtoken"))
+    with auth_service.SessionLocal() as db:
+        auth_service.store_role_snapshot(
+            db,
+            ids["synced"],
+            "dtoken",
+            {"1": ["r"]},
+            {"id": "9", "username": "synced", "avatar": None},
+        )
+        db.commit()
+        user = db.get(auth_service.User, ids["synced"])
+        token = auth_service.create_token(user)
+
+    def unavailable(discord_token):
+        raise httpx.ConnectTimeout("Discord unavailable")
+
+    monkeypatch.setattr(auth_service, "get_user_roles", unavailable)
+    monkeypatch.setattr(auth_service, "get_user_profile", unavailable)
+    client = TestClient(auth_service.create_app())
+    resp = client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert resp.json()["id"] == "9"
+    assert client.get("/metrics").json()["role_snapshots"]["hits"] == 1
@@ -1,6 +1,7 @@
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
 from devonboarder import auth_service
+from xp import api as xp_api
 from xp.api import create_app
 import os
 
@@ -12,6 +13,7 @@ os.environ.setdefault("JWT_SECRET_KEY", "devsecret")
 def setup_function(function):
     auth_service.Base.metadata.drop_all(bind=auth_service.engine)
     auth_service.init_db()
+    xp_api.ranking.loaded_at = None  # reload the leaderboard from the fresh DB
     auth_service.get_user_roles = lambda token: {}
     auth_service.resolve_user_flags = lambda roles: {
         "isAdmin": False,
@@ -89,6 +91,191 @@ def test_contribute_endpoint_awards_xp():
     assert resp.json() == {"level": 2}
 
 
+def test_level_and_onboarding_avoid_loading_rows():
+    from sqlalchemy import event, insert
+
+    with auth_service.SessionLocal() as db:
+        user = auth_service.User(username="busy", password_hash="x")
+        db.add(user)
+        db.flush()
+        db.execute(insert(auth_service.XPEvent), [{"user_id": user.id, "xp": 1}] * 250)
+        db.commit()
+        # Bulk inserts bypass the ledger until it is reconciled
+        assert auth_service.reconcile_xp_totals(db) == 1
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.lower())
+
+    event.listen(auth_service.engine, "before_cursor_execute", record)
+    try:
+        client = TestClient(create_app())
+        resp = client.get("/api/user/level", params={"username": "busy"})
+        assert resp.json() == {"level": 3}
+        resp = client.get("/api/user/onboarding-status", params={"username": "busy"})
+        assert resp.json() == {"status": "pending"}
+    finally:
+        event.remove(auth_service.engine, "before_cursor_execute", record)
+
+    assert not [s for s in statements if "xp_events" in s]
+    level_reads = [s for s in statements if "user_xp_totals" in s]
+    assert len(level_reads) == 1
+    contribution_reads = [s for s in statements if "contributions" in s]
+    assert len(contribution_reads) == 1 and "exists" in contribution_reads[0]
+
+
+def test_contributions_maintain_xp_totals():
+    token = _create_token("carol")
+    client = TestClient(create_app())
+    headers = {"Authorization": f"Bearer {token}"}
+    for description in ("a", "b", "c"):
+        client.post(
+            "/api/user/contribute", json={"description": description}, headers=headers
+        )
+
+    with auth_service.SessionLocal() as db:
+        user = db.query(auth_service.User).filter_by(username="carol").one()
+        totals = db.get(auth_service.UserXPTotal, user.id)
+        assert totals.xp_total == 3 * auth_service.CONTRIBUTION_XP
+        assert totals.level == 2
+        assert auth_service.reconcile_xp_totals(db) == 0
+
+        # Drifted and orphaned rows are repaired
+        totals.xp_total = 1
+        db.add(auth_service.UserXPTotal(user_id=999, xp_total=5, level=1))
+        db.commit()
+        assert auth_service.reconcile_xp_totals(db) == 2
+        assert db.get(auth_service.UserXPTotal, user.id).xp_total == 150
+        assert db.get(auth_service.UserXPTotal, 999) is None
+
+
+def _seed_xp(totals: dict[str, int]) -> None:
+    with auth_service.SessionLocal() as db:
+        for username, xp in totals.items():
+            user = auth_service.User(username=username, password_hash="x")
+            db.add(user)
+            db.flush()
+            db.add(auth_service.XPEvent(user_id=user.id, xp=xp))
+        db.commit()
+
+
+def test_leaderboard_pages_and_ties():
+    _seed_xp({"ann": 300, "ben": 120, "cat": 300, "dan": 50})
+    client = TestClient(create_app())
+
+    resp = client.get("/api/leaderboard", params={"limit": 3})
+    body = resp.json()
+    assert body["total"] == 4
+    assert [(e["rank"], e["username"], e["xp"]) for e in body["entries"]] == [
+        (1, "ann", 300),
+        (1, "cat", 300),
+        (3, "ben", 120),
+    ]
+    assert body["entries"][0]["level"] == 4
+
+    resp = client.get("/api/leaderboard", params={"offset": 1, "limit": 2})
+    assert [(e["rank"], e["username"]) for e in resp.json()["entries"]] == [
+        (1, "cat"),
+        (3, "ben"),
+    ]
+    assert client.get("/api/leaderboard", params={"limit": 500}).status_code == 422
+
+
+def test_user_rank_follows_contributions():
+    _seed_xp({"ann": 120, "ben": 60})
+    token = _create_token("zoe")
+    client = TestClient(create_app())
+
+    resp = client.get("/api/user/rank", params={"username": "zoe"})
+    assert resp.json() == {
+        "username": "zoe",
+        "rank": 3,
+        "xp": 0,
+        "level": 1,
+        "total": 2,
+    }
+
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(3):
+        client.post("/api/user/contribute", json={"description": "x"}, headers=headers)
+
+    resp = client.get("/api/user/rank", params={"username": "zoe"})
+    assert resp.json()["rank"] == 1
+    assert resp.json()["xp"] == 3 * auth_service.CONTRIBUTION_XP
+    assert client.get("/api/leaderboard").json()["entries"][0]["username"] == "zoe"
+    assert (
+        client.get("/api/user/rank", params={"username": "nobody"}).status_code == 404
+    )
+
+
+def test_contribution_batch_reports_each_item():
+    token = _create_token("amy")
+    _seed_xp({"ben": 10})
+    client = TestClient(create_app())
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = client.post(
+        "/api/user/contributions/batch",
+        json={
+            "contributions": [
+                {"description": "docs"},
+                {"description": "tests", "username": "amy"},
+                {"description": "for ben", "username": "ben"},
+                {"description": "ghost", "username": "nobody"},
+                {"username": "amy"},
+                "not an item",
+                {"description": "unhashable", "username": ["amy"]},
+                {"description": "numeric", "username": 7},
+            ]
+        },
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["recorded"] == 2
+    assert [r["status"] for r in body["results"]] == [200, 200, 403, 404] + [422] * 4
+
+    with auth_service.SessionLocal() as db:
+        user = db.query(auth_service.User).filter_by(username="amy").one()
+        assert db.get(auth_service.UserXPTotal, user.id).xp_total == 100
+        assert (
+            db.query(auth_service.Contribution).filter_by(user_id=user.id).count() == 2
+        )
+    resp = client.get("/api/user/rank", params={"username": "amy"})
+    assert resp.json()["rank"] == 1
+
+
+def test_contribution_batch_admin_and_limits(monkeypatch):
+    _seed_xp({"ben": 10})
+    token = _create_token("root")
+    with auth_service.SessionLocal() as db:
+        db.query(auth_service.User).filter_by(username="root").update(
+            {"is_admin": True}
+        )
+        db.commit()
+    client = TestClient(create_app())
+    headers = {"Authorization": f"Bearer {token}"}
+
+    items = [{"description": str(i), "username": "ben"} for i in range(4)]
+    resp = client.post(
+        "/api/user/contributions/batch", json={"contributions": items}, headers=headers
+    )
+    assert resp.json()["recorded"] == 4
+    resp = client.get("/api/user/level", params={"username": "ben"})
+    assert resp.json() == {"level": 3}
+
+    monkeypatch.setattr(xp_api, "CONTRIBUTION_BATCH_LIMIT", 3)
+    resp = client.post(
+        "/api/user/contributions/batch", json={"contributions": items}, headers=headers
+    )
+    assert resp.status_code == 413
+    resp = client.post(
+        "/api/user/contributions/batch", json={"contributions": {}}, headers=headers
+    )
+    assert resp.status_code == 422
+
+
 def test_cors_allow_origins(monkeypatch):
     monkeypatch.setenv("CORS_ALLOW_ORIGINS", "https://a.com,https://b.com")
     app = create_app()